@@ -1,34 +1,100 @@
-import html
 import io
 import json
 import pathlib
+import re
 from collections import OrderedDict
-from collections.abc import Generator, Hashable
-from dataclasses import dataclass
+from collections.abc import Generator, Iterator
+from dataclasses import dataclass, field
 from itertools import product
 
 import pandas as pd
-from _templates import (
-    delivery_format_preview_template,
-    delivery_format_setting_template,
-)
-from excel_helpers import export_excel, load_excel
+from _templates import delivery_format_setting_template
+from excel_helpers import export_excel_archive, export_excel_bytes, load_excel
+from file_transfer import ZIP_MIME_TYPE, download_bytes, read_file_bytes
 from jinja2 import Template
-from js import URL, File, Uint8Array, alert, confirm
-from merge_order import merge_orders, translated_first_rows
+from js import alert, confirm
+from merge_order import mask_preview_cell, merge_orders, translated_first_rows
+from order_settings import PLATFORM_NAME_COLUMN_NAME
 from pyscript import document, window
+from windowed_table import WindowedTable
 
 DELIVERY_AGENCY_NAME_COLUMN_NAME = "DeliveryAgency"
+ROUTE_PLATFORMS_COLUMN_NAME = "RoutePlatforms"
+"""Comma separated platform names of the orders for the agency."""
+ROUTE_PRODUCT_PATTERN_COLUMN_NAME = "RouteProductPattern"
+"""Regular expression of the product names of the orders for the agency."""
+ROUTE_REGION_PATTERN_COLUMN_NAME = "RouteRegionPattern"
+"""Regular expression of the addresses of the orders for the agency."""
+ROUTING_RULE_COLUMN_NAMES = (
+    ROUTE_PLATFORMS_COLUMN_NAME,
+    ROUTE_PRODUCT_PATTERN_COLUMN_NAME,
+    ROUTE_REGION_PATTERN_COLUMN_NAME,
+)
+ROUTE_PRODUCT_COLUMN_NAME = "product_name"
+ROUTE_REGION_COLUMN_NAME = "long_address"
+UNROUTED_AGENCY_NAME = "미배정"
 
 
-def _render_template(
-    i_row: Hashable, row: pd.Series, templates: OrderedDict[str, Template]
-) -> pd.DataFrame:
-    variables = {col: str(row.get(col, '')) for col in row.index}
-    return pd.DataFrame(
-        {col: template.render(variables) for col, template in templates.items()},
-        index=[i_row],
-    )
+def _render_templates(
+    target_df: pd.DataFrame, templates: OrderedDict[str, Template]
+) -> dict[str, list[str]]:
+    """Render the templates of every row into a list per column.
+
+    Rows are read as plain tuples and rendered straight into the columns
+    instead of building a data frame per row.
+    """
+    rendered: dict[str, list[str]] = {col: [] for col in templates}
+    for values in target_df.itertuples(index=False, name=None):
+        variables = dict(zip(target_df.columns, map(str, values), strict=True))
+        for col, template in templates.items():
+            rendered[col].append(template.render(variables))
+    return rendered
+
+
+def _is_empty_setting(value) -> bool:
+    return value is None or pd.isna(value) or str(value).strip() == ''
+
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """Which orders should be delivered by an agency.
+
+    Empty conditions match any orders, so a rule without conditions matches all.
+    """
+
+    platforms: tuple[str, ...] = ()
+    product_pattern: str = ''
+    region_pattern: str = ''
+
+    @classmethod
+    def from_row(cls, row: pd.Series) -> "RoutingRule":
+        def _get(col: str) -> str:
+            value = row.get(col)
+            return '' if _is_empty_setting(value) else str(value).strip()
+
+        return cls(
+            platforms=tuple(
+                platform.strip()
+                for platform in _get(ROUTE_PLATFORMS_COLUMN_NAME).split(",")
+                if platform.strip()
+            ),
+            product_pattern=_get(ROUTE_PRODUCT_PATTERN_COLUMN_NAME),
+            region_pattern=_get(ROUTE_REGION_PATTERN_COLUMN_NAME),
+        )
+
+    def mask(self, orders: pd.DataFrame) -> pd.Series:
+        """Vectorized mask of the ``orders`` that match the rule."""
+        mask = pd.Series(True, index=orders.index)
+        if self.platforms:
+            mask &= orders[PLATFORM_NAME_COLUMN_NAME].isin(self.platforms)
+        for col, pattern in (
+            (ROUTE_PRODUCT_COLUMN_NAME, self.product_pattern),
+            (ROUTE_REGION_COLUMN_NAME, self.region_pattern),
+        ):
+            if pattern:
+                column = orders.get(col, pd.Series('', index=orders.index))
+                mask &= column.astype(str).str.contains(pattern, regex=True)
+        return mask
 
 
 @dataclass
@@ -37,67 +103,110 @@ class DeliveryFormat:
 
     delivery_agency: str
     templates: OrderedDict[str, Template]
+    routing_rule: RoutingRule = field(default_factory=RoutingRule)
 
     @classmethod
-    def from_dataframe(cls, df: pd.DataFrame) -> "DeliveryFormat":
-        """Dataframe should only have one row."""
-        delivery_agency = df.at[0, DELIVERY_AGENCY_NAME_COLUMN_NAME]
-        templates_df = df.drop(columns=[DELIVERY_AGENCY_NAME_COLUMN_NAME])
+    def from_row(cls, row: pd.Series) -> "DeliveryFormat":
+        """Build the format of an agency from a row of the settings.
+
+        Empty template cells are not part of the format of the agency,
+        so that agencies with different columns can share the settings.
+        """
         templates = OrderedDict()
-        for col in templates_df.columns:
-            templates[col] = Template(templates_df.at[0, col])
-        return cls(delivery_agency=delivery_agency, templates=templates)
+        for col, template in row.items():
+            if col in (DELIVERY_AGENCY_NAME_COLUMN_NAME, *ROUTING_RULE_COLUMN_NAMES):
+                continue
+            if not _is_empty_setting(template):
+                templates[col] = Template(template)
+        return cls(
+            delivery_agency=row[DELIVERY_AGENCY_NAME_COLUMN_NAME],
+            templates=templates,
+            routing_rule=RoutingRule.from_row(row),
+        )
+
+
+def delivery_formats_from_dataframe(df: pd.DataFrame) -> list[DeliveryFormat]:
+    """Build the format of each agency in the order of the settings rows."""
+    return [DeliveryFormat.from_row(row) for _, row in df.iterrows()]
 
 
 def order_to_delivery_format(
     target_df: pd.DataFrame, delivery_format: DeliveryFormat
 ) -> pd.DataFrame:
-    base_df = pd.DataFrame(columns=tuple(delivery_format.templates.keys()))
-    new_rows = [
-        _render_template(i_row, order_info_row, delivery_format.templates)
-        for i_row, order_info_row in target_df.iterrows()
-    ]
-    return pd.concat([base_df, *new_rows], verify_integrity=True)
+    return pd.DataFrame(
+        _render_templates(target_df, delivery_format.templates),
+        columns=list(delivery_format.templates.keys()),
+        index=target_df.index,
+        dtype=object,
+    )
 
 
-def delivery_format_fisrt_rows() -> Generator[tuple[str, pd.DataFrame]]:
-    delivery_format = load_delivery_format_from_local_storage()
-    for file_name, translated in translated_first_rows():
-        yield file_name, order_to_delivery_format(translated, delivery_format)
+def route_orders(
+    orders: pd.DataFrame, delivery_formats: list[DeliveryFormat]
+) -> tuple[list[tuple[DeliveryFormat, pd.DataFrame]], pd.DataFrame]:
+    """Partition the ``orders`` into the delivery agencies.
 
+    Each order goes to the first agency whose routing rule matches it.
+    Returns the orders of each agency and the orders that no agency matched.
+    """
+    remaining = pd.Series(True, index=orders.index)
+    partitions = []
+    for delivery_format in delivery_formats:
+        mask = remaining & delivery_format.routing_rule.mask(orders)
+        partitions.append((delivery_format, orders[mask]))
+        remaining &= ~mask
+    return partitions, orders[remaining]
 
-def render_delivery_format_preview() -> str:
-    delivery_format = load_delivery_format_from_local_storage()
 
-    delivery_format_headers = tuple(delivery_format.templates.keys())
-    rows = []
-    for file_name, translated in delivery_format_fisrt_rows():
-        row = [file_name]
-        for i_row, col in product(range(len(translated)), delivery_format_headers):
-            if col not in delivery_format_headers:
+def delivery_format_fisrt_rows() -> Generator[tuple[str, str, pd.DataFrame]]:
+    delivery_formats = load_delivery_formats_from_local_storage()
+    for file_name, translated in translated_first_rows():
+        partitions, _ = route_orders(translated, delivery_formats)
+        for delivery_format, orders in partitions:
+            if len(orders) > 0:
+                yield (
+                    file_name,
+                    delivery_format.delivery_agency,
+                    order_to_delivery_format(orders, delivery_format),
+                )
+
+
+def iter_delivery_format_preview_rows(
+    columns: tuple[str, ...],
+) -> Iterator[list[str]]:
+    for file_name, agency_name, rendered in delivery_format_fisrt_rows():
+        row = [file_name, agency_name]
+        for i_row, col in product(range(len(rendered)), columns):
+            if col not in rendered.columns:
                 row.append('')
             else:
-                cell = translated.at[i_row, col]
-                if (item_length := len(cell)) > 2:
-                    hidden_part = '-' * (item_length - 2)
-                    row.append(html.escape(cell[:2] + hidden_part))
-                else:
-                    row.append(html.escape(cell))
-        rows.append(row)
-
-    return delivery_format_preview_template.render(
-        header_items=["파일출처", *delivery_format.templates.keys()],
-        rows=rows,
+                row.append(mask_preview_cell(rendered[col].iat[i_row]))
+        yield row
+
+
+def render_delivery_format_preview(container) -> WindowedTable:
+    delivery_formats = load_delivery_formats_from_local_storage()
+    # Agencies may have different columns.
+    columns = tuple(
+        dict.fromkeys(
+            col
+            for delivery_format in delivery_formats
+            for col in delivery_format.templates
+        )
+    )
+    return WindowedTable(
+        container,
+        header_items=["파일출처", DELIVERY_AGENCY_NAME_COLUMN_NAME, *columns],
+        rows=iter_delivery_format_preview_rows(columns),
+        first_column_class="index-column",
     )
 
 
 def refresh_delivery_format_file_preview() -> None:
     preview = document.getElementById("delivery-format-render-preview-box")
-    table = document.createElement("div")
-    table.innerHTML = render_delivery_format_preview()
     for child in preview.children:
         child.remove()
-    preview.appendChild(table)
+    render_delivery_format_preview(preview)
 
 
 def _make_delivery_file_name(agency_name: str = '') -> str:
@@ -105,30 +214,44 @@ def _make_delivery_file_name(agency_name: str = '') -> str:
     return f"merged-{agency_name}-{today_as_str}.xlsx"
 
 
+def _make_delivery_archive_file_name() -> str:
+    today_as_str = pd.Timestamp.now().strftime("%Y-%m-%d")
+    return f"merged-delivery-{today_as_str}.zip"
+
+
 def download_orders_in_delivery_format(_):
     window.console.log("Transforming the merged files into delivery format...")
     merged = merge_orders()
-    delivery_form = load_delivery_format_from_local_storage()
-    delivery_format_merged = order_to_delivery_format(merged, delivery_form)
-    # Download the merged file.
-    bytes = io.BytesIO()
-    export_excel(delivery_format_merged, bytes)
-    bytes_buffer = bytes.getbuffer()
-    js_array = Uint8Array.new(bytes_buffer.nbytes)
-    js_array.assign(bytes_buffer)
-
-    file_name = _make_delivery_file_name(delivery_form.delivery_agency)
-    file = File.new([js_array], file_name, {type: "text/plain"})
-    url = URL.createObjectURL(file)
-
-    hidden_link = document.createElement("a")
-    hidden_link.setAttribute("download", file_name)
-    hidden_link.setAttribute("href", url)
-    hidden_link.click()
-    # Release the object URL and clean up.
-    URL.revokeObjectURL(url)
-    hidden_link.remove()
-    del hidden_link
+    delivery_formats = load_delivery_formats_from_local_storage()
+    # Orders are partitioned once and each partition is rendered by its agency.
+    partitions, unrouted = route_orders(merged, delivery_formats)
+    workbooks = [
+        (
+            _make_delivery_file_name(delivery_format.delivery_agency),
+            order_to_delivery_format(orders, delivery_format),
+            None,
+        )
+        for delivery_format, orders in partitions
+        if len(orders) > 0 or len(merged) == 0
+    ]
+    if len(unrouted) > 0:
+        alert(
+            f"배송사를 정할 수 없는 주문 {len(unrouted)}건은 "
+            f"'{UNROUTED_AGENCY_NAME}' 파일에 통합 양식으로 따로 담았습니다."
+        )
+        workbooks.append(
+            (_make_delivery_file_name(UNROUTED_AGENCY_NAME), unrouted, None)
+        )
+    if len(workbooks) == 1:
+        file_name, delivery_format_merged, _ = workbooks[0]
+        download_bytes(export_excel_bytes(delivery_format_merged), file_name)
+    else:
+        # Each agency's file comes out of the same run as one archive.
+        archive = io.BytesIO()
+        export_excel_archive(workbooks, archive)
+        download_bytes(
+            archive.getbuffer(), _make_delivery_archive_file_name(), ZIP_MIME_TYPE
+        )
 
 
 # Settings related.
@@ -173,9 +296,10 @@ def load_delivery_format_as_dataframe_from_local_storage() -> pd.DataFrame:
         delivery_format_dict = json.loads(
             local_storage.getItem(_DELIVERY_FORMAT_SETTING_LOCAL_SOTRAGE_KEY)
         )
-        return pd.DataFrame.from_dict(delivery_format_dict).set_index(pd.Series([0]))
+        return pd.DataFrame.from_dict(delivery_format_dict).reset_index(drop=True)
         # The row index is saved as string in the local storage.
         # So it should be converted to integer so that other methods can easily use it.
+        # Each row is the format of a delivery agency.
     except Exception as e:
         # TODO: Ask the user to reset the settings as well.
         window.console.log(
@@ -185,17 +309,17 @@ def load_delivery_format_as_dataframe_from_local_storage() -> pd.DataFrame:
         raise e
 
 
-def load_delivery_format_from_local_storage() -> DeliveryFormat:
+def load_delivery_formats_from_local_storage() -> list[DeliveryFormat]:
     try:
         df = load_delivery_format_as_dataframe_from_local_storage()
-        return DeliveryFormat.from_dataframe(df)
+        return delivery_formats_from_dataframe(df)
     except Exception:
         confirm_msg = "배송양식 설정을 불러오는 데에 문제가 생겼습니다.\n"
         confirm_msg += "설정을 초기화 한 뒤 다시 시도하시겠습니까?\n"
         if window.confirm(confirm_msg):
             _initialize_delivery_format_in_local_storage()
         df = load_delivery_format_as_dataframe_from_local_storage()
-        return DeliveryFormat.from_dataframe(df)
+        return delivery_formats_from_dataframe(df)
 
 
 def refresh_delivery_format_setting_view() -> None:
@@ -207,7 +331,11 @@ def refresh_delivery_format_setting_view() -> None:
         child.remove()
     # Append the table
     table.innerHTML = delivery_format_setting_template.render(
-        header_items=df.columns, templates=next(df.iterrows())[-1].to_list()
+        header_items=df.columns,
+        rows=[
+            ['' if _is_empty_setting(item) else item for item in row]
+            for row in df.itertuples(index=False, name=None)
+        ],
     )
     preview_box.appendChild(table)
 
@@ -215,45 +343,44 @@ def refresh_delivery_format_setting_view() -> None:
 def download_current_delivery_format_setting(_) -> None:
     window.console.log("Preparing the delivery format setting file.")
     df = load_delivery_format_as_dataframe_from_local_storage()
-    bytes = io.BytesIO()
-    export_excel(df, bytes)
-    bytes_buffer = bytes.getbuffer()
-    js_array = Uint8Array.new(bytes_buffer.nbytes)
-    js_array.assign(bytes_buffer)
-
-    file = File.new(
-        [js_array], LATEST_DELIVERY_FORMAT_FILE_PATH.name, {type: "text/plain"}
-    )
-    url = URL.createObjectURL(file)
-
-    hidden_link = document.createElement("a")
-    hidden_link.setAttribute("download", LATEST_DELIVERY_FORMAT_FILE_PATH.name)
-    hidden_link.setAttribute("href", url)
-    hidden_link.click()
-    # Release the object URL and clean up.
-    URL.revokeObjectURL(url)
-    hidden_link.remove()
-    del hidden_link
+    download_bytes(export_excel_bytes(df), LATEST_DELIVERY_FORMAT_FILE_PATH.name)
 
 
 def _has_new_delivery_format_mandatory_column(df: pd.DataFrame) -> bool:
     return DELIVERY_AGENCY_NAME_COLUMN_NAME in list(df.columns)
 
 
+def _collect_invalid_route_patterns(df: pd.DataFrame) -> list[str]:
+    invalid_patterns = []
+    for col in (ROUTE_PRODUCT_PATTERN_COLUMN_NAME, ROUTE_REGION_PATTERN_COLUMN_NAME):
+        for pattern in df.get(col, pd.Series(dtype=str)):
+            if _is_empty_setting(pattern):
+                continue
+            try:
+                re.compile(pattern)
+            except re.error:
+                invalid_patterns.append(f"- {col}: {pattern}")
+    return invalid_patterns
+
+
 async def upload_new_delivery_format_settings(e) -> None:
     if len(files := list(e.target.files)) == 0:
         window.console.log("No file selected.")
         return
     uploaded_file = next(iter(files))  # New setting file should be only 1.
     window.console.log(f"New delivery format file uploaded: {uploaded_file.name}")
-    array_buf = await uploaded_file.arrayBuffer()
-    bytes = io.BytesIO(array_buf.to_bytes())
-    df = load_excel(bytes)
+    df = load_excel(await read_file_bytes(uploaded_file))
     window.console.log(df.to_string())
     err_msg = ""
     if not _has_new_delivery_format_mandatory_column(df):
         err_msg = f"필수 항목인 '{DELIVERY_AGENCY_NAME_COLUMN_NAME}' "
         err_msg += "를 찾을 수 없습니다.\n파일을 확인 후 다시 등록해주세요.\n\n"
+    elif df[DELIVERY_AGENCY_NAME_COLUMN_NAME].duplicated().any():
+        err_msg = f"'{DELIVERY_AGENCY_NAME_COLUMN_NAME}' 항목에 같은 배송사가 "
+        err_msg += "두 번 이상 있습니다.\n배송사 이름은 한 번씩만 적어주세요.\n\n"
+    if invalid_patterns := _collect_invalid_route_patterns(df):
+        err_msg += "다음 경로 규칙을 정규표현식으로 읽을 수 없습니다.\n"
+        err_msg += "\n".join(invalid_patterns) + "\n\n"
 
     if len(err_msg) > 0:
         # Alert is done once here with all error messages
@@ -268,13 +395,13 @@ async def upload_new_delivery_format_settings(e) -> None:
 
 
 def reset_delivery_format_settings(_):
-    if confirm(
-        "설정을 초기화 하시면 현재 설정사항이 브라우저에서 삭제됩니다. \n"
-        "초기화를 진행하시겠습니까?"
-    ) and confirm(
-        "진짜 지워도 되는거죠?? 🤔"
-    ) and confirm(
-        "진짜 마지막으로 물어볼게요. 진짜, 진짜로 지웁니다??? 🤨"
+    if (
+        confirm(
+            "설정을 초기화 하시면 현재 설정사항이 브라우저에서 삭제됩니다. \n"
+            "초기화를 진행하시겠습니까?"
+        )
+        and confirm("진짜 지워도 되는거죠?? 🤔")
+        and confirm("진짜 마지막으로 물어볼게요. 진짜, 진짜로 지웁니다??? 🤨")
     ):
         _initialize_delivery_format_in_local_storage()
         refresh_delivery_format_setting_view()
@@ -1,12 +1,156 @@
+import hashlib
 import io
 import pathlib
+import zipfile
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Self
 
 import pandas as pd
 
+_SPREADSHEET_SIGNATURES = {
+    b"PK\x03\x04": "xlsx",  # zip archive
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1": "xls",  # xls or encrypted workbooks (OLE2)
+}
+# Encodings and chunking of text files are the same as the ones of ``merge-orders``,
+# ``src/krbiz/_text_files.py``. Please keep them in sync.
+TEXT_ENCODING_CANDIDATES = ("utf-8-sig", "cp949", "euc-kr")
+"""Encodings of csv/tsv files to try in order."""
+_TEXT_SAMPLE_SIZE = 64 * 1024
+_TEXT_CHUNK_THRESHOLD = 32 * 1024 * 1024
+"""Text files bigger than this are parsed chunk by chunk."""
+_TEXT_CHUNK_ROWS = 50_000
 
-def load_excel(
+
+def _read_head(file_path: pathlib.Path | io.BytesIO, size: int) -> bytes:
+    if isinstance(file_path, io.BytesIO):
+        return bytes(file_path.getbuffer()[:size])
+    with open(file_path, "rb") as f:
+        return f.read(size)
+
+
+def _file_size(file_path: pathlib.Path | io.BytesIO) -> int:
+    if isinstance(file_path, io.BytesIO):
+        return file_path.getbuffer().nbytes
+    return pathlib.Path(file_path).stat().st_size
+
+
+def is_delimited_text(file_path: pathlib.Path | io.BytesIO) -> bool:
+    """Check if the file is a csv/tsv file instead of a workbook."""
+    return spreadsheet_kind(file_path) is None
+
+
+def spreadsheet_kind(file_path: pathlib.Path | io.BytesIO) -> str | None:
+    """Return ``xlsx`` or ``xls`` from the file signature, ``None`` if not a workbook.
+
+    Encrypted workbooks are ``xls`` kind regardless of the original format.
+    """
+    head = _read_head(file_path, 8)
+    for signature, kind in _SPREADSHEET_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+def detect_text_encoding(sample: bytes) -> str:
+    import codecs
+
+    for encoding in TEXT_ENCODING_CANDIDATES:
+        try:
+            # Incremental decoder allows the sample to end in the middle of a letter.
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:  # noqa: PERF203
+            ...
+        else:
+            return encoding
+    raise ValueError(f"Could not decode the text file as {TEXT_ENCODING_CANDIDATES}.")
+
+
+_DELIMITER_SAMPLE_LINES = 20
+"""Number of lines from the top of a text file to detect the delimiter from."""
+
+
+def _delimiter_consistency(lines: list[str], delimiter: str) -> tuple[int, int]:
+    """Number of lines with the most common number of the ``delimiter`` and it."""
+    counts = Counter(line.count(delimiter) for line in lines if delimiter in line)
+    return max(((n_lines, count) for count, n_lines in counts.items()), default=(0, 0))
+
+
+def _detect_delimiter(lines: list[str]) -> str:
+    """Delimiter that splits the most of the first lines into the same number of cells.
+
+    Lines above the header, i.e. a title line, may not have any delimiters
+    and cells of tsv files may have commas,
+    so neither the first line nor the most delimiters of a line tell the delimiter.
+    """
+    lines = lines[:_DELIMITER_SAMPLE_LINES]
+    if _delimiter_consistency(lines, "\t") > _delimiter_consistency(lines, ","):
+        return "\t"
+    return ","
+
+
+def _sample_lines(sample: bytes, encoding: str) -> list[str]:
+    return sample.decode(encoding, errors="ignore").splitlines()
+
+
+def _text_parser_engine(chunked: bool, nrows: int | None) -> str:
+    import importlib.util
+
+    # pyarrow engine is the fastest but does not support ``nrows`` or ``chunksize``.
+    if not chunked and nrows is None and importlib.util.find_spec("pyarrow"):
+        return "pyarrow"
+    return "c"
+
+
+def load_delimited_text(
     file_path: pathlib.Path | io.BytesIO, header_row: int = 0, nrows: int | None = None
 ) -> pd.DataFrame:
+    """Load csv/tsv file in the same shape as ``load_excel``."""
+    sample = _read_head(file_path, _TEXT_SAMPLE_SIZE)
+    encoding = detect_text_encoding(sample)
+    chunked = nrows is None and _file_size(file_path) > _TEXT_CHUNK_THRESHOLD
+    if isinstance(file_path, io.BytesIO):
+        file_path.seek(0)
+    parsed = pd.read_csv(
+        file_path,
+        sep=_detect_delimiter(_sample_lines(sample, encoding)),
+        header=header_row,
+        dtype=str,
+        nrows=nrows,
+        encoding=encoding,
+        engine=_text_parser_engine(chunked, nrows),
+        skip_blank_lines=False,  # Header row is counted the same way as in workbooks.
+        chunksize=_TEXT_CHUNK_ROWS if chunked else None,
+    )
+    if chunked:
+        return pd.concat([chunk.dropna(how='all') for chunk in parsed]).fillna("")
+    return parsed.dropna(how='all').fillna("")
+
+
+def _load_raw_text_rows(
+    file_path: pathlib.Path | io.BytesIO, nrows: int
+) -> pd.DataFrame:
+    import csv
+
+    sample = _read_head(file_path, _TEXT_SAMPLE_SIZE)
+    lines = _sample_lines(sample, detect_text_encoding(sample))
+    if len(sample) == _TEXT_SAMPLE_SIZE:
+        lines = lines[:-1]  # The last line may be cut in the middle.
+    delimiter = _detect_delimiter(lines)
+    # Rows are read by ``csv`` module since the rows above the header,
+    # i.e. a title row, may have different number of cells.
+    rows = list(csv.reader(lines[:nrows], delimiter=delimiter))
+    return pd.DataFrame(rows, dtype=str).fillna("")
+
+
+def _drop_empty_rows(df: pd.DataFrame, keep_empty_rows: bool) -> pd.DataFrame:
+    return df if keep_empty_rows else df.dropna(how='all')
+
+
+@contextmanager
+def _ignore_style_warning() -> Iterator[None]:
     import warnings
 
     with warnings.catch_warnings():
@@ -15,18 +159,332 @@ def load_excel(
             message="Workbook contains no default style, apply openpyxl's default",
             category=UserWarning,
         )  # Filter warning about style.
+        yield
+
+
+@dataclass(frozen=True)
+class SpreadsheetReaderBackend:
+    """Parsing engines of ``pandas.read_excel`` per spreadsheet kind."""
+
+    name: str
+    engines: dict[str, str]
+    """Pandas engine name per spreadsheet kind. i.e. {'xlsx': 'openpyxl'}"""
+    required_module: str | None = None
+    """Module that should be installed to use the backend."""
+
+    @property
+    def is_available(self) -> bool:
+        import importlib.util
+
         return (
-            pd.read_excel(
-                file_path,
-                header=header_row,
-                dtype=str,
-                nrows=nrows,
+            self.required_module is None
+            or importlib.util.find_spec(self.required_module) is not None
+        )
+
+    def open(self, file_path: pathlib.Path | io.BytesIO, kind: str) -> pd.ExcelFile:
+        if isinstance(file_path, io.BytesIO):
+            file_path.seek(0)
+        with _ignore_style_warning():
+            return pd.ExcelFile(file_path, engine=self.engines[kind])
+
+    def read(
+        self,
+        file_path: pathlib.Path | io.BytesIO,
+        kind: str,
+        header_row: int | None = 0,
+        nrows: int | None = None,
+        keep_empty_rows: bool = False,
+    ) -> pd.DataFrame:
+        with self.open(file_path, kind) as excel_file:
+            return _parse_sheet(excel_file, 0, header_row, nrows, keep_empty_rows)
+
+
+def _parse_sheet(
+    excel_file: pd.ExcelFile,
+    sheet_name: str | int,
+    header_row: int | None = 0,
+    nrows: int | None = None,
+    keep_empty_rows: bool = False,
+) -> pd.DataFrame:
+    with _ignore_style_warning():
+        parsed = excel_file.parse(sheet_name, header=header_row, dtype=str, nrows=nrows)
+    return _drop_empty_rows(parsed, keep_empty_rows).fillna("")
+
+
+READER_BACKENDS = {
+    backend.name: backend
+    for backend in (
+        SpreadsheetReaderBackend(
+            name="calamine",
+            engines={"xlsx": "calamine", "xls": "calamine"},
+            required_module="python_calamine",
+        ),
+        SpreadsheetReaderBackend(
+            name="default", engines={"xlsx": "openpyxl", "xls": "xlrd"}
+        ),
+    )
+}
+_reader_backend_preference = ["calamine", "default"]
+# Fastest first, according to ``benchmarks/reader_backends.py``.
+# The ``default`` backend should always be the last one
+# since its errors are what the other modules expect,
+# i.e. ``xlrd.biffh.XLRDError`` for encrypted files.
+
+
+def set_reader_backend_preference(*names: str) -> None:
+    """Set the order of backends to try, i.e. from the benchmark results."""
+    if unknown := [name for name in names if name not in READER_BACKENDS]:
+        raise ValueError(f"Unknown spreadsheet reader backends: {unknown}")
+    _reader_backend_preference[:] = [*(n for n in names if n != "default"), "default"]
+
+
+def available_reader_backends() -> list[SpreadsheetReaderBackend]:
+    return [
+        READER_BACKENDS[name]
+        for name in _reader_backend_preference
+        if READER_BACKENDS[name].is_available
+    ]
+
+
+_STREAMING_ENGINES = frozenset({"openpyxl"})
+"""Engines that read only the rows that are asked for instead of the whole sheet."""
+
+
+def _backends_to_try(
+    kind: str, bounded_reads: bool
+) -> tuple[list[SpreadsheetReaderBackend], SpreadsheetReaderBackend]:
+    """Backends to try in order, split into the faster ones and the last one.
+
+    If only the first rows are read, ``bounded_reads``,
+    the default backend is used alone when it streams this kind of workbook,
+    since the faster backends load the whole sheet even for a single row.
+    """
+    *faster_backends, last_backend = available_reader_backends()
+    if bounded_reads and last_backend.engines[kind] in _STREAMING_ENGINES:
+        return [], last_backend
+    return faster_backends, last_backend
+
+
+def read_spreadsheet(
+    file_path: pathlib.Path | io.BytesIO,
+    header_row: int | None = 0,
+    nrows: int | None = None,
+    keep_empty_rows: bool = False,
+) -> tuple[pd.DataFrame, str]:
+    """Read the first sheet with the fastest working backend.
+
+    Returns the data frame and the name of the backend that handled the file.
+    Faster backends fall back to the next one on any error but ``ValueError``,
+    which means the header row does not work regardless of the backend.
+    """
+    kind = spreadsheet_kind(file_path) or "xlsx"
+    args = (file_path, kind, header_row, nrows, keep_empty_rows)
+    faster_backends, last_backend = _backends_to_try(kind, nrows is not None)
+    for backend in faster_backends:
+        try:
+            return backend.read(*args), backend.name
+        except ValueError:  # noqa: PERF203
+            raise
+        except Exception:
+            ...  # i.e. encrypted file. Fall back to the next backend.
+    return last_backend.read(*args), last_backend.name
+
+
+def open_spreadsheet(
+    file_path: pathlib.Path | io.BytesIO, bounded_reads: bool = False
+) -> tuple[pd.ExcelFile, str]:
+    """Open the workbook with the fastest working backend.
+
+    Returns the opened workbook and the name of the backend that opened it.
+    ``bounded_reads`` should be set if only the first rows of the sheets are read.
+    """
+    kind = spreadsheet_kind(file_path) or "xlsx"
+    faster_backends, last_backend = _backends_to_try(kind, bounded_reads)
+    for backend in faster_backends:
+        try:
+            return backend.open(file_path, kind), backend.name
+        except Exception:  # noqa: PERF203
+            ...  # i.e. encrypted file. Fall back to the next backend.
+    return last_backend.open(file_path, kind), last_backend.name
+
+
+TEXT_SHEET_NAME = ""
+"""Sheet name of csv/tsv files. They always have exactly one sheet."""
+
+
+def _count_text_rows(file_path: pathlib.Path | io.BytesIO) -> tuple[int, int]:
+    import csv
+
+    sample = _read_head(file_path, _TEXT_SAMPLE_SIZE)
+    encoding = detect_text_encoding(sample)
+    delimiter = _detect_delimiter(_sample_lines(sample, encoding))
+    with ExitStack() as stack:
+        if isinstance(file_path, io.BytesIO):
+            file_path.seek(0)
+            text = io.TextIOWrapper(file_path, encoding=encoding, newline="")
+            # The wrapper should not close the bytes of the store.
+            stack.callback(text.detach)
+        else:
+            text = stack.enter_context(open(file_path, encoding=encoding, newline=""))
+        n_rows = n_columns = 0
+        for row in csv.reader(text, delimiter=delimiter):
+            n_rows += 1
+            n_columns = max(n_columns, len(row))
+    return n_rows, n_columns
+
+
+def _recorded_dimensions(excel_file: pd.ExcelFile) -> dict[str, tuple[int, int]]:
+    """Dimensions of the sheets recorded in the xlsx metadata.
+
+    ``openpyxl`` reads them when the workbook is opened
+    and forgets them once a sheet is parsed, so they are kept from the start.
+    Writers that do not track the dimension record ``A1``, which is not trusted.
+    """
+    if excel_file.engine != "openpyxl":
+        return {}
+    return {
+        sheet.title: (sheet.max_row, sheet.max_column)
+        for sheet in excel_file.book.worksheets
+        if sheet.max_row is not None and (sheet.max_row, sheet.max_column) != (1, 1)
+    }
+
+
+@dataclass(frozen=True)
+class SheetInspection:
+    """Sheet described by its dimensions and the first rows, not the whole data."""
+
+    sheet_name: str
+    n_rows: int
+    """Number of rows including the rows above the header and the header itself."""
+    n_columns: int
+    header_row: int
+    first_rows: pd.DataFrame
+    """The first data rows below the header, parsed as in ``Workbook.read_sheet``."""
+
+    @property
+    def header(self) -> tuple[str, ...]:
+        return tuple(self.first_rows.columns)
+
+    @property
+    def n_data_rows(self) -> int:
+        """Number of rows below the header.
+
+        Empty rows in between are counted as well since the rows are not read.
+        """
+        return max(self.n_rows - self.header_row - 1, 0)
+
+
+class Workbook:
+    """Order file that is opened once and read sheet by sheet.
+
+    Some platforms split orders into multiple sheets
+    or put a summary sheet in front of the orders,
+    so every sheet of a workbook should be inspected from the same handle
+    instead of opening the file again for each sheet.
+    csv/tsv files are treated as a workbook with a single sheet.
+    ``bounded_reads`` should be set if only the first rows of the sheets are read,
+    i.e. for ``inspect``, so that the cost does not grow with the size of the file.
+    """
+
+    def __init__(
+        self, file_path: pathlib.Path | io.BytesIO, bounded_reads: bool = False
+    ) -> None:
+        self._file_path = file_path
+        self._excel_file: pd.ExcelFile | None = None
+        self._dimensions: dict[str, tuple[int, int]] = {}
+        self.backend_name: str | None = None
+        if is_delimited_text(file_path):
+            self.sheet_names = [TEXT_SHEET_NAME]
+        else:
+            self._excel_file, self.backend_name = open_spreadsheet(
+                file_path, bounded_reads
             )
-            .dropna(how='all')
-            .fillna("")
+            self.sheet_names = [str(name) for name in self._excel_file.sheet_names]
+            self._dimensions = _recorded_dimensions(self._excel_file)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._excel_file is not None:
+            self._excel_file.close()
+
+    def read_sheet(
+        self, sheet_name: str, header_row: int = 0, nrows: int | None = None
+    ) -> pd.DataFrame:
+        if self._excel_file is None:
+            return load_delimited_text(self._file_path, header_row, nrows)
+        return _parse_sheet(self._excel_file, sheet_name, header_row, nrows)
+
+    def raw_rows(self, sheet_name: str, nrows: int) -> pd.DataFrame:
+        """Load the first ``nrows`` rows of the sheet as in ``load_raw_rows``."""
+        if self._excel_file is None:
+            return _load_raw_text_rows(self._file_path, nrows)
+        return _parse_sheet(
+            self._excel_file, sheet_name, None, nrows, keep_empty_rows=True
+        )
+
+    def dimensions(self, sheet_name: str) -> tuple[int, int]:
+        """Number of rows and columns of the sheet, from the metadata if possible.
+
+        xls workbooks are already loaded when they are opened
+        and calamine loads a sheet much faster than it is parsed into a data frame.
+        Only csv/tsv files and xlsx files without the dimension are read row by row.
+        """
+        if (dimensions := self._dimensions.get(sheet_name)) is not None:
+            return dimensions
+        if self._excel_file is None:
+            dimensions = _count_text_rows(self._file_path)
+        elif self._excel_file.engine == "xlrd":
+            sheet = self._excel_file.book.sheet_by_name(sheet_name)
+            dimensions = (sheet.nrows, sheet.ncols)
+        elif self._excel_file.engine == "calamine":
+            end = self._excel_file.book.get_sheet_by_name(sheet_name).end
+            dimensions = (0, 0) if end is None else (end[0] + 1, end[1] + 1)
+        else:
+            dimensions = _parse_sheet(
+                self._excel_file, sheet_name, None, keep_empty_rows=True
+            ).shape
+        self._dimensions[sheet_name] = dimensions
+        return dimensions
+
+    def inspect(
+        self, sheet_name: str, header_row: int = 0, nrows: int = 1
+    ) -> SheetInspection:
+        """Inspect the sheet without parsing more than the first ``nrows`` rows."""
+        n_rows, n_columns = self.dimensions(sheet_name)
+        return SheetInspection(
+            sheet_name=sheet_name,
+            n_rows=n_rows,
+            n_columns=n_columns,
+            header_row=header_row,
+            first_rows=self.read_sheet(sheet_name, header_row, nrows),
         )
 
 
+def load_excel(
+    file_path: pathlib.Path | io.BytesIO, header_row: int = 0, nrows: int | None = None
+) -> pd.DataFrame:
+    if is_delimited_text(file_path):
+        return load_delimited_text(file_path, header_row=header_row, nrows=nrows)
+    return read_spreadsheet(file_path, header_row=header_row, nrows=nrows)[0]
+
+
+def load_raw_rows(file_path: pathlib.Path | io.BytesIO, nrows: int) -> pd.DataFrame:
+    """Load the first ``nrows`` rows as a grid of strings without a header.
+
+    Empty rows are kept so that the row positions are same as the header rows.
+    """
+    if is_delimited_text(file_path):
+        return _load_raw_text_rows(file_path, nrows)
+    return read_spreadsheet(
+        file_path, header_row=None, nrows=nrows, keep_empty_rows=True
+    )[0]
+
+
 def _adjust_column_width(sheet, ref_df: pd.DataFrame) -> None:
     for i_col, col in enumerate(ref_df.columns):
         max_length = max(
@@ -41,10 +499,99 @@ def export_excel(
     output_file_path: pathlib.Path | io.BytesIO,
     pretty: bool = True,
     export_sheet_name: str | None = "Sheet1",
+    extra_sheets: dict[str, pd.DataFrame] | None = None,
 ) -> None:
+    """Export the data frame and the ``extra_sheets`` after it, if any."""
     export_sheet_name = export_sheet_name or "Sheet1"
+    sheets = {export_sheet_name: df, **(extra_sheets or {})}
     with pd.ExcelWriter(output_file_path, engine="xlsxwriter") as writer:
-        df.to_excel(excel_writer=writer, index=False, sheet_name=export_sheet_name)
-        if pretty:
-            for sheet in writer.sheets.values():
-                _adjust_column_width(sheet, df)
+        for sheet_name, sheet_df in sheets.items():
+            sheet_df.to_excel(excel_writer=writer, index=False, sheet_name=sheet_name)
+            if pretty:
+                _adjust_column_width(writer.sheets[sheet_name], sheet_df)
+
+
+EXPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+"""Memory cap of the cached export bytes."""
+
+_export_cache: OrderedDict[str, bytes] = OrderedDict()
+# Exported bytes are cached by the fingerprint of the data frame and export options
+# so that downloading the same data again does not serialize it again.
+# The cache is least-recently-used ordered, i.e. the first item is evicted first.
+
+
+def _fingerprint(df: pd.DataFrame, **export_options) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    hasher.update(
+        repr(
+            (
+                tuple(df.columns),
+                tuple(str(dtype) for dtype in df.dtypes),
+                sorted(export_options.items()),
+            )
+        ).encode()
+    )
+    return hasher.hexdigest()
+
+
+def clear_export_cache() -> None:
+    _export_cache.clear()
+
+
+def export_excel_bytes(
+    df: pd.DataFrame,
+    pretty: bool = True,
+    export_sheet_name: str | None = "Sheet1",
+    extra_sheets: dict[str, pd.DataFrame] | None = None,
+) -> bytes:
+    """Export the data frame as xlsx bytes, reusing the cached bytes if possible."""
+    key = _fingerprint(
+        df,
+        pretty=pretty,
+        export_sheet_name=export_sheet_name,
+        extra_sheets=[
+            (sheet_name, _fingerprint(sheet_df))
+            for sheet_name, sheet_df in (extra_sheets or {}).items()
+        ],
+    )
+    if (cached := _export_cache.get(key)) is not None:
+        _export_cache.move_to_end(key)
+        return cached
+
+    output = io.BytesIO()
+    export_excel(
+        df,
+        output,
+        pretty=pretty,
+        export_sheet_name=export_sheet_name,
+        extra_sheets=extra_sheets,
+    )
+    exported = output.getvalue()
+    del output
+    if len(exported) <= EXPORT_CACHE_MAX_BYTES:
+        _export_cache[key] = exported
+        while sum(map(len, _export_cache.values())) > EXPORT_CACHE_MAX_BYTES:
+            _export_cache.popitem(last=False)
+    return exported
+
+
+def export_excel_archive(
+    workbooks: Iterable[tuple[str, pd.DataFrame, str | None]],
+    output_file_path: pathlib.Path | io.BytesIO,
+    pretty: bool = True,
+) -> None:
+    """Export each ``(file_name, data frame, sheet name)`` as a workbook in a zip.
+
+    Workbooks are written straight into the archive stream one by one.
+    They are stored without compression since xlsx files are already compressed.
+    """
+    with zipfile.ZipFile(output_file_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for file_name, df, export_sheet_name in workbooks:
+            with zf.open(file_name, "w") as workbook_file:
+                export_excel(
+                    df,
+                    workbook_file,
+                    pretty=pretty,
+                    export_sheet_name=export_sheet_name,
+                )
@@ -0,0 +1,61 @@
+"""Byte transfer between the browser and python.
+
+Bytes cross the javascript/python boundary only once per transfer.
+
+- Uploads: a file is copied from the javascript heap once
+  and the ``io.BytesIO`` shares the copied bytes.
+- Downloads: a ``Uint8Array`` view over the python buffer is handed to ``File``
+  so the only copy is the one made by the browser for the file itself.
+  The view and the buffer proxy are released right after the file is made.
+"""
+
+import io
+
+from js import URL, File, Object
+from pyodide.ffi import create_proxy, to_js
+from pyscript import document
+
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME_TYPE = "application/zip"
+
+
+async def read_file_bytes(file) -> io.BytesIO:
+    """Read the uploaded javascript ``File`` into python."""
+    array_buf = await file.arrayBuffer()
+    try:
+        # ``BytesIO`` does not copy the bytes until it is written.
+        return io.BytesIO(array_buf.to_bytes())
+    finally:
+        del array_buf  # Release the javascript buffer as soon as possible.
+
+
+def _make_js_file(data: bytes | memoryview, file_name: str, mime_type: str):
+    buffer_proxy = create_proxy(memoryview(data))
+    buffer = buffer_proxy.getBuffer("u8")
+    try:
+        # ``buffer.data`` is a view of the python memory, not a copy.
+        return File.new(
+            [buffer.data],
+            file_name,
+            to_js({"type": mime_type}, dict_converter=Object.fromEntries),
+        )
+    finally:
+        buffer.release()
+        buffer_proxy.destroy()
+
+
+def download_bytes(
+    data: bytes | memoryview, file_name: str, mime_type: str = XLSX_MIME_TYPE
+) -> None:
+    """Let the browser download ``data`` as ``file_name``."""
+    file = _make_js_file(data, file_name, mime_type)
+    url = URL.createObjectURL(file)
+
+    hidden_link = document.createElement("a")
+    hidden_link.setAttribute("download", file_name)
+    hidden_link.setAttribute("href", url)
+    hidden_link.click()
+    # Release the object URL and clean up.
+    URL.revokeObjectURL(url)
+    hidden_link.remove()
+    del hidden_link, file
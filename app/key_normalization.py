@@ -0,0 +1,68 @@
+"""Normalization of the columns that are used to match orders and deliveries.
+
+Each rule is a vectorized transformation of a string column.
+Normalized keys are computed once per data frame so that the matching
+only needs to compare the precomputed keys.
+"""
+
+from collections.abc import Callable, Iterable
+
+import pandas as pd
+
+_FULL_WIDTH_TO_HALF_WIDTH = str.maketrans(
+    {chr(code): chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)}
+    | {"\u3000": " "}  # Ideographic(full-width) space.
+)
+
+
+def _nfc(column: pd.Series) -> pd.Series:
+    return column.str.normalize("NFC")
+
+
+def _fold_width(column: pd.Series) -> pd.Series:
+    return column.str.translate(_FULL_WIDTH_TO_HALF_WIDTH)
+
+
+def _collapse_whitespace(column: pd.Series) -> pd.Series:
+    return column.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _digits_only(column: pd.Series) -> pd.Series:
+    return column.str.replace(r"\D", "", regex=True)
+
+
+NORMALIZATION_RULES: dict[str, Callable[[pd.Series], pd.Series]] = {
+    "nfc": _nfc,
+    "fold_width": _fold_width,
+    "collapse_whitespace": _collapse_whitespace,
+    "digits_only": _digits_only,
+}
+"""Normalization rules applied in the order they are listed in a key setting."""
+
+DEFAULT_NORMALIZATION_RULES = ("nfc", "fold_width", "collapse_whitespace")
+
+_KEY_SEPARATOR = "\x1f"  # Unit separator. It does not appear in excel cells.
+
+
+def normalize_column(column: pd.Series, rules: Iterable[str]) -> pd.Series:
+    normalized = column.fillna("").astype(str)
+    for rule in rules:
+        normalized = NORMALIZATION_RULES[rule](normalized)
+    return normalized
+
+
+def build_match_keys(
+    df: pd.DataFrame, columns_and_rules: Iterable[tuple[str, tuple[str, ...]]]
+) -> pd.Series:
+    """Build a normalized key per row from the ``columns``.
+
+    Rows of different data frames can be matched by comparing the keys
+    if the ``columns_and_rules`` have the same rules in the same order.
+    """
+    normalized = [
+        normalize_column(df[column], rules) for column, rules in columns_and_rules
+    ]
+    keys = pd.Series("", index=df.index, dtype=object)
+    for i_column, column in enumerate(normalized):
+        keys = column if i_column == 0 else keys + _KEY_SEPARATOR + column
+    return keys
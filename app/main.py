@@ -15,6 +15,7 @@ from order_settings import (
     reset_order_variable_settings,
     upload_new_order_variable_settings,
 )
+from pick_list import initialize_pick_list_keys_input, update_pick_list_keys
 from pyscript import document, when, window
 from split_delivery import refresh_delivery_split_result, upload_delivery_confirmation
 from split_delivery_settings import (
@@ -86,6 +87,10 @@ if __name__ == "__main__":
     # Merge order download button
     merged_download_button = document.getElementById("merged-orders-download-button")
     when("click", merged_download_button)(download_merged_orders)
+    # Pick list keys input
+    initialize_pick_list_keys_input()
+    pick_list_keys_input = document.getElementById("pick-list-keys-input")
+    when("change", pick_list_keys_input)(update_pick_list_keys)
     # Delivery format download button
     delivery_button_id = "delivery-format-orders-download-button"
     delivery_format_download_button = document.getElementById(delivery_button_id)
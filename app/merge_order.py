@@ -1,101 +1,175 @@
-import html
-import io
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from dataclasses import dataclass
 from itertools import product
 
+import numpy as np
 import pandas as pd
-from _templates import merge_preview_template
-from excel_helpers import export_excel, load_excel
-from js import URL, File, Uint8Array
-from order_file_io import load_order_file
+from excel_helpers import export_excel_bytes
+from file_transfer import download_bytes
+from order_file_io import inspect_order_sheets, load_order_sheets
 from order_settings import (
     PLATFORM_NAME_COLUMN_NAME,
+    SHEET_NAME_COLUMN_NAME,
     PlatformHeaderVariableMap,
-    find_matching_variable_map,
+    VariableMappings,
     load_order_variables_from_local_storage,
 )
+from pick_list import (
+    PICK_LIST_SHEET_NAME,
+    PickListAggregator,
+    load_pick_list_keys_from_local_storage,
+)
 from pyscript import document, window
+from windowed_table import WindowedTable
+
+
+@dataclass(frozen=True)
+class TranslationPlan:
+    """Column selection plan from a platform file to the unified schema.
+
+    The plan is compiled once per platform header variable map
+    and reused for every file.
+    Note that a platform column can be selected multiple times,
+    i.e. (reciepient_phone_number, buyer_phone_number) could be the same column.
+    """
+
+    platform: str
+    columns: tuple[str, ...]
+    """All columns of the translated data frame in order."""
+    source_columns: tuple[str, ...]
+    """Platform columns to select. The same column may appear more than once."""
+    target_positions: tuple[int, ...]
+    """Positions in ``columns`` of each of the ``source_columns``."""
+
+    @classmethod
+    def compile(
+        cls, variable_map: PlatformHeaderVariableMap, unified_header: tuple[str, ...]
+    ) -> "TranslationPlan":
+        columns = (*unified_header, PLATFORM_NAME_COLUMN_NAME, SHEET_NAME_COLUMN_NAME)
+        relevant_mappings = {
+            unified: platform_header
+            for unified, platform_header in variable_map.variable_mapping.items()
+            if len(platform_header) > 0 and unified in unified_header
+        }
+        return cls(
+            platform=variable_map.platform,
+            columns=columns,
+            source_columns=tuple(relevant_mappings.values()),
+            target_positions=tuple(columns.index(key) for key in relevant_mappings),
+        )
 
 
 def translate_df(
-    target_df: pd.DataFrame, variable_map: PlatformHeaderVariableMap
+    target_df: pd.DataFrame, plan: TranslationPlan, sheet_name: str = ''
 ) -> pd.DataFrame:
-    translated_df = pd.DataFrame()
-    relevant_mappings = {
-        key: value
-        for key, value in variable_map.variable_mapping.items()
-        if len(value) > 0
+    """Translate the platform data frame into the unified schema in one allocation.
+
+    Unified columns that the platform does not have are filled with empty strings
+    so that translated data frames can be concatenated without filling NaN.
+    The ``sheet_name`` is kept in the translated data frame
+    to tell where the orders came from in multi-sheet workbooks.
+    """
+    values = np.full((len(target_df), len(plan.columns)), "", dtype=object)
+    values[:, list(plan.target_positions)] = target_df[
+        list(plan.source_columns)
+    ].to_numpy(dtype=object)
+    values[:, -2] = plan.platform
+    values[:, -1] = sheet_name
+    return pd.DataFrame(values, columns=list(plan.columns), index=target_df.index)
+
+
+TranslationPlanKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def translation_plan_key(variable_map: PlatformHeaderVariableMap) -> TranslationPlanKey:
+    """Key of the plan of the ``variable_map``.
+
+    A platform may have more than one map, i.e. an old and a new file layout,
+    so the plans are keyed by the mapping as well as the platform.
+    """
+    return (variable_map.platform, tuple(variable_map.variable_mapping.items()))
+
+
+def compile_translation_plans(
+    variable_mapping: VariableMappings,
+) -> dict[TranslationPlanKey, TranslationPlan]:
+    unified_header = variable_mapping.unified_header
+    return {
+        translation_plan_key(variable_map): TranslationPlan.compile(
+            variable_map, unified_header
+        )
+        for variable_map in variable_mapping.platform_header_variable_maps
     }
-    # Note that pd.concat is not suitable here
-    # since it does not allow duplicating values.
-    # some platforms might use one column for multiple unified variables.
-    # or they can simply have the same values.
-    # i.e. (reciepient_phone_number, buyer_phone_number) could be the smae.
-    for unified_header, platform_header in relevant_mappings.items():
-        translated_df[unified_header] = target_df[platform_header]
-    translated_df[PLATFORM_NAME_COLUMN_NAME] = variable_map.platform
-    return translated_df
 
 
 def translated_first_rows() -> Generator[tuple[str, pd.DataFrame]]:
     from order_file_io import _order_files
 
     variable_mapping = load_order_variables_from_local_storage()
+    plans = compile_translation_plans(variable_mapping)
     for file_name in _order_files:
         try:
-            file_bytes = load_order_file(file_name)
-            variable_map = find_matching_variable_map(
-                file_bytes, variable_mapping.platform_header_variable_maps
+            order_sheets = inspect_order_sheets(
+                file_name, variable_mapping.platform_header_variable_maps
             )
-            if variable_map is None:
-                window.console.log("Could not find the matching platform.")
-            else:
-                original_df = load_excel(
-                    file_bytes, header_row=variable_map.header, nrows=1
-                )
-                yield file_name, translate_df(original_df, variable_map)
-        except KeyError:  # noqa: PERF203
+        except KeyError:
             # Skip the encrypted file with invalid password.
-            ...
+            continue
+        if not order_sheets:
+            window.console.log("Could not find the matching platform.")
+        for sheet_name, variable_map, inspection in order_sheets:
+            yield (
+                file_name,
+                translate_df(
+                    inspection.first_rows.head(1),
+                    plans[translation_plan_key(variable_map)],
+                    sheet_name,
+                ),
+            )
 
 
-def render_merge_preview() -> str:
-    variable_mapping = load_order_variables_from_local_storage()
-    rows = []
+def mask_preview_cell(cell: str) -> str:
+    """Hide all but the first two characters of the personal information."""
+    if (item_length := len(cell)) > 2:
+        return cell[:2] + '-' * (item_length - 2)
+    return cell
+
+
+def iter_merge_preview_rows(columns: tuple[str, ...]) -> Iterator[list[str]]:
+    """Yield a preview row per file.
+
+    Files are translated only when their row is about to be rendered.
+    """
     for file_name, translated in translated_first_rows():
         row = [file_name]
-        for i_row, col in product(
-            range(len(translated)),
-            (PLATFORM_NAME_COLUMN_NAME, *variable_mapping.unified_header),
-        ):
+        for i_row, col in product(range(len(translated)), columns):
             if col not in translated.columns:
                 row.append('')
             else:
-                cell = translated.at[i_row, col]
-                if (item_length := len(cell)) > 2:
-                    hidden_part = '-' * (item_length - 2)
-                    row.append(html.escape(cell[:2] + hidden_part))
-                else:
-                    row.append(html.escape(cell))
-        rows.append(row)
-
-    return merge_preview_template.render(
-        header_items=[
-            '통합변수',
-            PLATFORM_NAME_COLUMN_NAME,
-            *variable_mapping.unified_header,
-        ],
-        rows=rows,
+                row.append(mask_preview_cell(translated.at[i_row, col]))
+        yield row
+
+
+def render_merge_preview(container) -> WindowedTable:
+    variable_mapping = load_order_variables_from_local_storage()
+    columns = (
+        PLATFORM_NAME_COLUMN_NAME,
+        SHEET_NAME_COLUMN_NAME,
+        *variable_mapping.unified_header,
+    )
+    return WindowedTable(
+        container,
+        header_items=['통합변수', *columns],
+        rows=iter_merge_preview_rows(columns),
+        first_column_class="index-column",
     )
 
 
 def refresh_merge_file_preview() -> None:
     preview = document.getElementById("order-render-preview-box")
-    table = document.createElement("table")
-    table.innerHTML = render_merge_preview()
     for child in preview.children:
         child.remove()
-    preview.appendChild(table)
+    render_merge_preview(preview)
 
 
 def _make_merged_file_name() -> str:
@@ -103,50 +177,54 @@ def _make_merged_file_name() -> str:
     return f"merged-orders-{today_as_str}.xlsx"
 
 
-def merge_orders() -> pd.DataFrame:
+def merge_orders(pick_list: PickListAggregator | None = None) -> pd.DataFrame:
+    """Merge all valid order files into the unified schema.
+
+    Orders of each file are also added to the ``pick_list`` if it is given,
+    so that the pick list is computed in the same pass as the merge.
+    """
     from order_file_io import _order_files
 
     variable_mapping = load_order_variables_from_local_storage()
-    # Starts with an empty DataFrame.
-    dfs = [pd.DataFrame(columns=variable_mapping.unified_header)]
+    plans = compile_translation_plans(variable_mapping)
+    dfs = []
     for file_name in _order_files:
         try:
-            file_bytes = load_order_file(file_name)
-            variable_map = find_matching_variable_map(
-                file_bytes, variable_mapping.platform_header_variable_maps
+            order_sheets = load_order_sheets(
+                file_name, variable_mapping.platform_header_variable_maps
             )
-            if variable_map is None:
-                window.console.log("Could not find the matching platform.")
-            else:
-                original_df = load_excel(file_bytes, variable_map.header)
-                translated = translate_df(original_df, variable_map)
-                dfs.append(translated)
-        except KeyError:  # noqa: PERF203
+        except KeyError:
             # Skip the encrypted file with invalid password.
-            ...
-    # Fill empty string for nan values.
-    return pd.concat(dfs, ignore_index=True).fillna('')
+            continue
+        if not order_sheets:
+            window.console.log("Could not find the matching platform.")
+        for sheet_name, variable_map, original_df in order_sheets:
+            translated = translate_df(
+                original_df, plans[translation_plan_key(variable_map)], sheet_name
+            )
+            if pick_list is not None:
+                pick_list.add(translated)
+            dfs.append(translated)
+    if not dfs:
+        return pd.DataFrame(
+            columns=[
+                *variable_mapping.unified_header,
+                PLATFORM_NAME_COLUMN_NAME,
+                SHEET_NAME_COLUMN_NAME,
+            ]
+        )
+    # All translated data frames have the same columns and dtype.
+    return pd.concat(dfs, ignore_index=True)
 
 
 def download_merged_orders(_):
     window.console.log("Merging the order files.")
-    merged = merge_orders()
-    # Download the merged file.
-    bytes = io.BytesIO()
-    export_excel(merged, bytes)
-    bytes_buffer = bytes.getbuffer()
-    js_array = Uint8Array.new(bytes_buffer.nbytes)
-    js_array.assign(bytes_buffer)
-
-    file_name = _make_merged_file_name()
-    file = File.new([js_array], file_name, {type: "text/plain"})
-    url = URL.createObjectURL(file)
-
-    hidden_link = document.createElement("a")
-    hidden_link.setAttribute("download", file_name)
-    hidden_link.setAttribute("href", url)
-    hidden_link.click()
-    # Release the object URL and clean up.
-    URL.revokeObjectURL(url)
-    hidden_link.remove()
-    del hidden_link
+    pick_list = PickListAggregator(load_pick_list_keys_from_local_storage())
+    merged = merge_orders(pick_list)
+    # Download the merged file with the pick list as the second sheet.
+    download_bytes(
+        export_excel_bytes(
+            merged, extra_sheets={PICK_LIST_SHEET_NAME: pick_list.result()}
+        ),
+        _make_merged_file_name(),
+    )
@@ -1,33 +1,45 @@
+import hashlib
 import io
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from functools import partial
 
 import msoffcrypto
 import pandas as pd
 import xlrd
 from _templates import file_item_row_template, file_list_table_template
 from order_settings import (
-    find_matching_variable_map,
+    find_matching_sheets,
     load_order_variables_from_local_storage,
     PlatformHeaderVariableMap,
 )
-from excel_helpers import load_excel
+from excel_helpers import SheetInspection, Workbook, clear_export_cache, load_excel
+from order_file_store import OrderFileStore
+from file_transfer import read_file_bytes
 from pyscript import document, when, window
 
 # We are using ``when`` instead of ``create_proxy`` so that we don't have to handle
 # garbagae collections of proxies.
 # See https://docs.pyscript.net/2024.10.1/user-guide/ffi/#create_proxy for details.
 
-_order_files = {}  # Dictionary that carries uploaded files as bytes.
+PREVIEW_ROWS = 1
+"""Number of rows per sheet read for the file table and the previews."""
+
+_order_files = OrderFileStore()  # Store that carries uploaded files as bytes.
 # Reasons why files are stored as bytes here.
 # - Files carry personal information hence should not be saved in local storage
 #   or indexeddb or session storage.
 # - In-memory is also not the most secure way but it is not so much less secure than
 #   having the files in the file-system, which is inevitable for users.
 # - Virtual file system could also be an option but it is also just in-memory anyways.
-#   Dictionary is easier to use than the virtual file system and easier to clear.
-# Important aspects of using dictionary to carry files.
+#   Dictionary-like store is easier to use than the virtual file system
+#   and easier to clear.
+# Important aspects of using the store to carry files.
 # - The keys are name of the files so when a new file with a same name comes, it will
 #   overwrite the existing one, but that is what we want.
 #   TODO: Alert the user when this happens.
+# - Decrypted bytes, parsed data frames and detected platforms are cached
+#   in the store as well, and they are evicted first when it takes too much memory.
 
 
 def clear_order_table_container() -> None:
@@ -49,11 +61,6 @@ def initialize_order_list_table():
     container.appendChild(table)
 
 
-async def get_bytes_from_file(file):
-    array_buf = await file.arrayBuffer()
-    return io.BytesIO(array_buf.to_bytes())
-
-
 def _make_row_id(file_name: str) -> str:
     return f"order-{file_name}-row"
 
@@ -78,6 +85,8 @@ def delete_file(e) -> None:
     row = document.getElementById(_make_row_id(_file_name))
     row.remove()
     _order_files.pop(_file_name, None)
+    # Exported files may carry the personal information of the deleted file.
+    clear_export_cache()
     left_files = '\n'.join(_order_files.keys())
     window.console.log(f"Left order files: \n{left_files}")
 
@@ -87,11 +96,15 @@ def _is_file_encrypted(file_name: str) -> bool:
     if file_bytes is None:
         window.console.log(f"{file_name} not found to check if it is encrypted.")
         return False
-    try:
-        load_excel(file_bytes, nrows=1)  # Just first row to see if it succeeds.
-        return False
-    except xlrd.biffh.XLRDError:
-        return True
+
+    def _check_encrypted() -> bool:
+        try:
+            load_excel(file_bytes, nrows=1)  # Just first row to see if it succeeds.
+            return False
+        except xlrd.biffh.XLRDError:
+            return True
+
+    return _order_files.get_derived(file_name, "encrypted", None, _check_encrypted)
 
 
 def _make_password_id(file_name: str) -> str:
@@ -110,12 +123,12 @@ ORDER_FILE_VALIDITY_CLASS_MAP = {
 
 
 def _get_order_numbers(
-    file_bytes: io.BytesIO, variable_map: PlatformHeaderVariableMap | None
+    order_sheets: list[tuple[str, PlatformHeaderVariableMap, SheetInspection]],
 ) -> str:
-    if variable_map is None:
+    if not order_sheets:
         return ""
     else:
-        return str(len(load_excel(file_bytes, header_row=variable_map.header)))
+        return str(sum(inspection.n_data_rows for _, _, inspection in order_sheets))
 
 
 def get_file_item_row(file_name: str) -> str:
@@ -125,12 +138,14 @@ def get_file_item_row(file_name: str) -> str:
         num_orders = '?'
         platform_name = '?'
     else:
-        variable_map = find_matching_variable_map(
-            _order_files[file_name], variable_mappings.platform_header_variable_maps
+        order_sheets = inspect_order_sheets(
+            file_name, variable_mappings.platform_header_variable_maps
+        )
+        validity = len(order_sheets) > 0
+        num_orders = _get_order_numbers(order_sheets)
+        platform_name = ', '.join(
+            dict.fromkeys(variable_map.platform for _, variable_map, _ in order_sheets)
         )
-        validity = variable_map is not None
-        num_orders = _get_order_numbers(_order_files[file_name], variable_map)
-        platform_name = variable_map.platform if variable_map is not None else ''
     return file_item_row_template.render(
         validity_class=ORDER_FILE_VALIDITY_CLASS_MAP[validity],
         file_name=file_name,
@@ -154,30 +169,39 @@ def refresh_table_from_order_files() -> None:
     for file_name in _order_files:
         button = document.getElementById(_make_button_id(file_name))
         when("click", button)(delete_file)
+    window.console.log(f"Order file store: {_order_files.footprint()}")
 
 
 async def upload_order_file(e):
     file_list = e.target.files
     names = [f.name for f in file_list]
     window.console.log("Files uploaded: " + ','.join(names))
-    _order_files.update({f.name: await get_bytes_from_file(f) for f in file_list})
+    _order_files.update({f.name: await read_file_bytes(f) for f in file_list})
     refresh_table_from_order_files()
 
 
 def _decrypt_bytes(file_name: str) -> io.BytesIO:
     """Decrypt the bytes by the password.
-    Returns ``None`` if password is not valid.
+
+    Raises ``KeyError`` if password is not valid.
+    Decrypted bytes are cached per password so that the file is decrypted only once.
     """
-    password_input = document.getElementById(_make_password_id(file_name))
-    file = msoffcrypto.OfficeFile(_order_files[file_name])
-    try:
-        file.load_key(password=password_input.value or "")
-        decrypted = io.BytesIO()
-        file.decrypt(decrypted)
-        return decrypted
-    except Exception as e:
-        window.alert(f"{file_name} 비밀번호를 다시 한 번 확인해주세요.")
-        raise KeyError(f"Password for {file_name} is not valid.") from e
+    password = document.getElementById(_make_password_id(file_name)).value or ""
+
+    def _decrypt() -> io.BytesIO:
+        file = msoffcrypto.OfficeFile(_order_files[file_name])
+        try:
+            file.load_key(password=password)
+            decrypted = io.BytesIO()
+            file.decrypt(decrypted)
+            return decrypted
+        except Exception as e:
+            window.alert(f"{file_name} 비밀번호를 다시 한 번 확인해주세요.")
+            raise KeyError(f"Password for {file_name} is not valid.") from e
+
+    # Only the hash of the password is kept as a cache key.
+    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    return _order_files.get_derived(file_name, "decrypted", password_hash, _decrypt)
 
 
 def load_order_file(file_name: str) -> io.BytesIO:
@@ -186,3 +210,103 @@ def load_order_file(file_name: str) -> io.BytesIO:
         return _decrypt_bytes(file_name)
     else:
         return _order_files[file_name]
+
+
+def _variable_maps_key(variable_maps: list[PlatformHeaderVariableMap]) -> str:
+    return hashlib.sha256(repr(variable_maps).encode()).hexdigest()
+
+
+@contextmanager
+def _lazy_workbook(
+    file_bytes: io.BytesIO, bounded_reads: bool = False
+) -> Iterator[Callable[[], Workbook]]:
+    """Open the workbook only when the first cached item is missing."""
+    with ExitStack() as stack:
+        opened: list[Workbook] = []
+
+        def _workbook() -> Workbook:
+            if not opened:
+                opened.append(stack.enter_context(Workbook(file_bytes, bounded_reads)))
+            return opened[0]
+
+        yield _workbook
+
+
+def _matching_sheets(
+    file_name: str,
+    variable_maps: list[PlatformHeaderVariableMap],
+    workbook: Callable[[], Workbook],
+) -> list[tuple[str, PlatformHeaderVariableMap]]:
+    return _order_files.get_derived(
+        file_name,
+        "matching_sheets",
+        _variable_maps_key(variable_maps),
+        lambda: find_matching_sheets(workbook(), variable_maps),
+    )
+
+
+def load_order_sheets(
+    file_name: str, variable_maps: list[PlatformHeaderVariableMap]
+) -> list[tuple[str, PlatformHeaderVariableMap, pd.DataFrame]]:
+    """Load the sheets of the order file that match any platform.
+
+    Returns ``(sheet name, variable map, data frame)`` of each matching sheet.
+    Matching sheets and data frames are cached in the store
+    and the workbook is opened only if any of them is not cached.
+    Raises ``KeyError`` if the file is encrypted and the password is not valid.
+    The returned data frames are shared, so they should not be modified.
+    """
+    with _lazy_workbook(load_order_file(file_name)) as workbook:
+
+        def _read_sheet(sheet_name: str, header_row: int) -> pd.DataFrame:
+            return workbook().read_sheet(sheet_name, header_row)
+
+        return [
+            (
+                sheet_name,
+                variable_map,
+                _order_files.get_derived(
+                    file_name,
+                    "frame",
+                    (sheet_name, variable_map.header),
+                    partial(_read_sheet, sheet_name, variable_map.header),
+                ),
+            )
+            for sheet_name, variable_map in _matching_sheets(
+                file_name, variable_maps, workbook
+            )
+        ]
+
+
+def inspect_order_sheets(
+    file_name: str,
+    variable_maps: list[PlatformHeaderVariableMap],
+    nrows: int = PREVIEW_ROWS,
+) -> list[tuple[str, PlatformHeaderVariableMap, SheetInspection]]:
+    """Inspect the sheets of the order file that match any platform.
+
+    Same as ``load_order_sheets`` but only the dimensions and the first ``nrows``
+    rows of each sheet are read, so that the file table and the previews
+    do not take longer as the files get bigger.
+    """
+    file_bytes = load_order_file(file_name)
+    with _lazy_workbook(file_bytes, bounded_reads=True) as workbook:
+
+        def _inspect(sheet_name: str, header_row: int) -> SheetInspection:
+            return workbook().inspect(sheet_name, header_row, nrows)
+
+        return [
+            (
+                sheet_name,
+                variable_map,
+                _order_files.get_derived(
+                    file_name,
+                    "inspection",
+                    (sheet_name, variable_map.header, nrows),
+                    partial(_inspect, sheet_name, variable_map.header),
+                ),
+            )
+            for sheet_name, variable_map in _matching_sheets(
+                file_name, variable_maps, workbook
+            )
+        ]
@@ -0,0 +1,141 @@
+"""In-memory store of the uploaded order files and the data derived from them.
+
+The raw bytes of the uploaded files are kept until the files are deleted,
+since they can not be read again without asking the user to upload them again.
+Everything derived from the raw bytes, i.e. decrypted bytes, parsed data frames
+and platform detection results, is cached in the store as well,
+but it is evicted in least-recently-used order to stay within the memory budget
+and computed again when it is needed.
+"""
+
+import io
+import sys
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator, MutableMapping
+from dataclasses import dataclass
+from typing import TypeVar
+
+import pandas as pd
+
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+"""Memory budget of the raw bytes and the derived data all together."""
+
+_Derived = TypeVar("_Derived")
+_DerivedKey = tuple[str, str, Hashable]
+# (file name, kind of the derived data, details of the derived data)
+# i.e. ("orders.xlsx", "frame", ("Sheet1", 0))
+
+
+def estimate_size(item: object) -> int:
+    """Estimate the memory footprint of the ``item`` in bytes."""
+    if isinstance(item, io.BytesIO):
+        return item.getbuffer().nbytes
+    if isinstance(item, pd.DataFrame):
+        return int(item.memory_usage(index=True, deep=True).sum())
+    if isinstance(item, list | tuple):
+        return sys.getsizeof(item) + sum(estimate_size(sub) for sub in item)
+    return sys.getsizeof(item)
+
+
+@dataclass(frozen=True)
+class StoreFootprint:
+    raw_bytes: int
+    derived_bytes: int
+    budget_bytes: int
+    num_files: int
+    num_derived: int
+
+    @property
+    def total_bytes(self) -> int:
+        return self.raw_bytes + self.derived_bytes
+
+    def __str__(self) -> str:
+        mib = 1024 * 1024
+        return (
+            f"{self.num_files} files: {self.raw_bytes / mib:.1f} MiB, "
+            f"{self.num_derived} derived items: {self.derived_bytes / mib:.1f} MiB, "
+            f"budget: {self.budget_bytes / mib:.1f} MiB"
+        )
+
+
+class OrderFileStore(MutableMapping[str, io.BytesIO]):
+    """Raw bytes of the order files by file name and their derived data.
+
+    It can be used as a dictionary of the raw bytes.
+    Replacing or deleting a file also drops the data derived from it.
+    Only the derived data is evicted when the memory budget is exceeded.
+    """
+
+    def __init__(self, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self._raw: dict[str, io.BytesIO] = {}
+        self._derived: OrderedDict[_DerivedKey, tuple[object, int]] = OrderedDict()
+        # The first item is the least recently used one.
+
+    def __getitem__(self, file_name: str) -> io.BytesIO:
+        return self._raw[file_name]
+
+    def __setitem__(self, file_name: str, file_bytes: io.BytesIO) -> None:
+        self.drop_derived(file_name)
+        self._raw[file_name] = file_bytes
+        self._evict()
+
+    def __delitem__(self, file_name: str) -> None:
+        del self._raw[file_name]
+        self.drop_derived(file_name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def get_derived(
+        self,
+        file_name: str,
+        kind: str,
+        details: Hashable,
+        compute: Callable[[], _Derived],
+    ) -> _Derived:
+        """Return the cached derived data or ``compute`` and cache it.
+
+        Callers should not modify the returned object since it is shared.
+        Errors of ``compute`` are not cached.
+        """
+        key = (file_name, kind, details)
+        if (cached := self._derived.get(key)) is not None:
+            self._derived.move_to_end(key)
+            return cached[0]
+
+        derived = compute()
+        if file_name in self._raw:  # The file may be deleted in the meantime.
+            self._derived[key] = (derived, estimate_size(derived))
+            self._evict()
+        return derived
+
+    def drop_derived(self, file_name: str) -> None:
+        for key in [key for key in self._derived if key[0] == file_name]:
+            del self._derived[key]
+
+    def set_memory_budget(self, memory_budget_bytes: int) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self._evict()
+
+    def _raw_bytes(self) -> int:
+        return sum(estimate_size(file_bytes) for file_bytes in self._raw.values())
+
+    def _evict(self) -> None:
+        derived_budget = self.memory_budget_bytes - self._raw_bytes()
+        derived_bytes = sum(size for _, size in self._derived.values())
+        while self._derived and derived_bytes > derived_budget:
+            _, (_, size) = self._derived.popitem(last=False)
+            derived_bytes -= size
+
+    def footprint(self) -> StoreFootprint:
+        return StoreFootprint(
+            raw_bytes=self._raw_bytes(),
+            derived_bytes=sum(size for _, size in self._derived.values()),
+            budget_bytes=self.memory_budget_bytes,
+            num_files=len(self._raw),
+            num_derived=len(self._derived),
+        )
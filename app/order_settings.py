@@ -1,14 +1,15 @@
-import io
 import json
 import pathlib
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 import pandas as pd
-from excel_helpers import export_excel, load_excel
-from js import URL, File, Uint8Array, alert, confirm
+from excel_helpers import Workbook, export_excel_bytes, load_excel
+from file_transfer import download_bytes, read_file_bytes
+from js import alert, confirm
 from pyscript import document, window
 
 PLATFORM_NAME_COLUMN_NAME = "PlatformName"
+SHEET_NAME_COLUMN_NAME = "SheetName"
 HEADER_ROW_COLUMN_NAME = "HeaderRow"
 
 
@@ -166,22 +167,73 @@ def refresh_order_variable_setting_view() -> None:
     preview_box.appendChild(table)
 
 
-def find_matching_variable_map(
-    bytes: io.BytesIO, variable_maps: list[PlatformHeaderVariableMap]
+HEADER_DISCOVERY_ROWS = 20
+"""Number of rows from the top of a file to look for the header row."""
+
+
+def _required_platform_headers(variable_map: PlatformHeaderVariableMap) -> set[str]:
+    return {
+        platform_header
+        for platform_header in variable_map.variable_mapping.values()
+        if len(platform_header) > 0  # Skip empty cells
+    }
+
+
+def discover_header(
+    raw_rows: pd.DataFrame, variable_maps: list[PlatformHeaderVariableMap]
 ) -> PlatformHeaderVariableMap | None:
-    for variable_map in variable_maps:
+    """Find the platform and its header row from the raw rows of a file.
+
+    Each row is scored as a header candidate against the columns of each platform.
+    The configured header rows are tried first in the order of ``variable_maps``.
+    If none of them has all the columns, i.e. a platform added a banner row,
+    the row that has all the columns of a platform is used as the header row.
+    """
+    row_cells = [set(row) for row in raw_rows.itertuples(index=False)]
+    required_headers = [_required_platform_headers(vm) for vm in variable_maps]
+
+    def _score(i_row: int, required: set[str]) -> float:
+        if not required:
+            return 1.0
+        return len(required & row_cells[i_row]) / len(required)
+
+    for variable_map, required in zip(variable_maps, required_headers, strict=True):
+        if 0 <= variable_map.header < len(row_cells) and (
+            _score(variable_map.header, required) == 1.0
+        ):
+            return variable_map
+
+    candidates = [
+        (len(required), -i_map, -i_row)
+        for i_map, required in enumerate(required_headers)
+        for i_row in range(len(row_cells))
+        if _score(i_row, required) == 1.0
+    ]
+    if not candidates:
+        return None
+    # Platform with more columns is more specific. Earlier platform and row wins ties.
+    _, negative_i_map, negative_i_row = max(candidates)
+    return replace(variable_maps[-negative_i_map], header=-negative_i_row)
+
+
+def find_matching_sheets(
+    workbook: Workbook, variable_maps: list[PlatformHeaderVariableMap]
+) -> list[tuple[str, PlatformHeaderVariableMap]]:
+    """Find the matching platform of each sheet from one read of its top rows.
+
+    Sheets that do not match any platform, i.e. a summary sheet, are left out.
+    The header row of each returned map is where the columns were actually found.
+    """
+    n_rows = max((HEADER_DISCOVERY_ROWS, *(vm.header + 1 for vm in variable_maps)))
+    matching_sheets = []
+    for sheet_name in workbook.sheet_names:
         try:
-            df = load_excel(bytes, variable_map.header)
-        except ValueError:  # Header row does not work  # noqa: PERF203
-            ...
-        else:
-            if all(
-                platform_header in df.columns
-                for platform_header in variable_map.variable_mapping.values()
-                if len(platform_header) > 0  # Skip empty cells
-            ):
-                return variable_map
-    return None
+            raw_rows = workbook.raw_rows(sheet_name, nrows=n_rows)
+        except ValueError:  # i.e. Empty file
+            continue
+        if (variable_map := discover_header(raw_rows, variable_maps)) is not None:
+            matching_sheets.append((sheet_name, variable_map))
+    return matching_sheets
 
 
 def _has_new_order_variable_setting_mandatory_columns(df: pd.DataFrame) -> bool:
@@ -217,9 +269,7 @@ async def upload_new_order_variable_settings(e) -> None:
         return
     uploaded_file = next(iter(files))  # New setting file should be only 1.
     window.console.log(f"New setting file uploaded: {uploaded_file.name}")
-    array_buf = await uploaded_file.arrayBuffer()
-    bytes = io.BytesIO(array_buf.to_bytes())
-    df = load_excel(bytes)
+    df = load_excel(await read_file_bytes(uploaded_file))
     window.console.log(df.to_string())
     err_msg = ""
     if not _has_new_order_variable_setting_mandatory_columns(df):
@@ -253,25 +303,7 @@ async def upload_new_order_variable_settings(e) -> None:
 def download_current_order_variable_settings(e):
     window.console.log("Preparing the variable setting file.")
     df = load_order_variables_as_dataframe_from_local_storage()
-    bytes = io.BytesIO()
-    export_excel(df, bytes)
-    bytes_buffer = bytes.getbuffer()
-    js_array = Uint8Array.new(bytes_buffer.nbytes)
-    js_array.assign(bytes_buffer)
-
-    file = File.new(
-        [js_array], LATEST_ORDER_VARIABLE_CONFIG_FILE_PATH.name, {type: "text/plain"}
-    )
-    url = URL.createObjectURL(file)
-
-    hidden_link = document.createElement("a")
-    hidden_link.setAttribute("download", LATEST_ORDER_VARIABLE_CONFIG_FILE_PATH.name)
-    hidden_link.setAttribute("href", url)
-    hidden_link.click()
-    # Release the object URL and clean up.
-    URL.revokeObjectURL(url)
-    hidden_link.remove()
-    del hidden_link
+    download_bytes(export_excel_bytes(df), LATEST_ORDER_VARIABLE_CONFIG_FILE_PATH.name)
 
 
 def reset_order_variable_settings(_):
@@ -0,0 +1,103 @@
+"""Pick list of the merged orders.
+
+Quantities are summed per product and per platform while the order files are merged,
+so that the warehouse does not have to pivot the merged file by hand.
+Each translated order file is reduced to partial sums right away
+and only the partial sums are combined at the end.
+"""
+
+import json
+
+import pandas as pd
+from order_settings import (
+    PLATFORM_NAME_COLUMN_NAME,
+    load_order_variables_from_local_storage,
+)
+from pyscript import document, window
+
+PICK_LIST_QUANTITY_COLUMN_NAME = "product_counts"
+PICK_LIST_TOTAL_COLUMN_NAME = "합계"
+PICK_LIST_SHEET_NAME = "피킹리스트"
+DEFAULT_PICK_LIST_KEYS = ("product_name", "option_info")
+
+_PICK_LIST_KEYS_LOCAL_STORAGE_KEY = "PICK-LIST-KEYS"
+"""DO NOT CHANGE THIS VALUE. THIS IS A KEY TO THE LOCAL STORAGE."""
+
+PICK_LIST_KEYS_INPUT_ID = "pick-list-keys-input"
+
+
+def _parse_quantities(column: pd.Series) -> pd.Series:
+    # Quantities may have thousands separators, i.e. 1,000.
+    quantities = pd.to_numeric(column.str.replace(",", ""), errors="coerce")
+    return quantities.fillna(0).astype("int64")
+
+
+class PickListAggregator:
+    """Sum of the quantities grouped by the ``keys`` and the platform."""
+
+    def __init__(self, keys: tuple[str, ...] = DEFAULT_PICK_LIST_KEYS) -> None:
+        self.keys = keys
+        self._partial_sums: list[pd.Series] = []
+
+    def add(self, translated: pd.DataFrame) -> None:
+        """Reduce the translated orders of a file into partial sums."""
+        group_keys = [*self.keys, PLATFORM_NAME_COLUMN_NAME]
+        if PICK_LIST_QUANTITY_COLUMN_NAME in translated.columns:
+            quantities = _parse_quantities(translated[PICK_LIST_QUANTITY_COLUMN_NAME])
+        else:  # Each order is counted as one if there is no quantity column.
+            quantities = pd.Series(1, index=translated.index, dtype="int64")
+        self._partial_sums.append(
+            quantities.groupby(
+                [translated[key] for key in group_keys], sort=False
+            ).sum()
+        )
+
+    def result(self) -> pd.DataFrame:
+        """Pick list with a quantity column per platform and the total."""
+        if not self._partial_sums:
+            return pd.DataFrame(columns=[*self.keys, PICK_LIST_TOTAL_COLUMN_NAME])
+        sums = pd.concat(self._partial_sums)
+        sums = sums.groupby(level=list(range(sums.index.nlevels))).sum()
+        if not self.keys:  # Only the platform is left to group by.
+            pick_list = sums.to_frame().T.reset_index(drop=True)
+        else:
+            pick_list = sums.unstack(PLATFORM_NAME_COLUMN_NAME, fill_value=0)
+        pick_list.columns.name = None
+        pick_list[PICK_LIST_TOTAL_COLUMN_NAME] = pick_list.sum(axis=1)
+        return pick_list.reset_index() if self.keys else pick_list
+
+
+def load_pick_list_keys_from_local_storage() -> tuple[str, ...]:
+    """Load the pick list keys that still exist in the unified header.
+
+    The default keys are used if none of the stored keys exist anymore.
+    """
+    stored = window.localStorage.getItem(_PICK_LIST_KEYS_LOCAL_STORAGE_KEY)
+    keys = DEFAULT_PICK_LIST_KEYS if stored is None else tuple(json.loads(stored))
+    unified_header = load_order_variables_from_local_storage().unified_header
+    if existing_keys := tuple(key for key in keys if key in unified_header):
+        return existing_keys
+    return tuple(key for key in DEFAULT_PICK_LIST_KEYS if key in unified_header)
+
+
+def initialize_pick_list_keys_input() -> None:
+    keys_input = document.getElementById(PICK_LIST_KEYS_INPUT_ID)
+    keys_input.value = ", ".join(load_pick_list_keys_from_local_storage())
+
+
+def update_pick_list_keys(_) -> None:
+    keys_input = document.getElementById(PICK_LIST_KEYS_INPUT_ID)
+    keys = tuple(key.strip() for key in keys_input.value.split(",") if key.strip())
+    unified_header = load_order_variables_from_local_storage().unified_header
+    if unknown_keys := [key for key in keys if key not in unified_header]:
+        window.alert(
+            f"통합 열 이름 설정에 없는 열입니다: {', '.join(unknown_keys)}\n"
+            f"사용 가능한 열: {', '.join(unified_header)}"
+        )
+        initialize_pick_list_keys_input()
+        return
+    if not keys:
+        window.localStorage.removeItem(_PICK_LIST_KEYS_LOCAL_STORAGE_KEY)
+    else:
+        window.localStorage.setItem(_PICK_LIST_KEYS_LOCAL_STORAGE_KEY, json.dumps(keys))
+    initialize_pick_list_keys_input()
@@ -1,20 +1,23 @@
+import hashlib
 import io
-from collections.abc import Callable
-from dataclasses import dataclass
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from functools import cached_property
 
+import numpy as np
 import pandas as pd
 from _templates import (
-    delivery_left_over_table_template,
+    delivery_left_over_caption_template,
     delivery_split_row_template,
     delivery_split_table_template,
 )
-from excel_helpers import export_excel, load_excel
-from js import URL, File, Uint8Array
-from order_file_io import get_bytes_from_file, load_order_file
+from excel_helpers import export_excel_archive, export_excel_bytes, load_excel
+from file_transfer import ZIP_MIME_TYPE, download_bytes, read_file_bytes
+from key_normalization import build_match_keys
+from order_file_io import load_order_sheets
 from order_settings import (
     PlatformHeaderVariableMap,
     VariableMappings,
-    find_matching_variable_map,
     load_order_variables_from_local_storage,
 )
 from pyscript import document, when, window
@@ -24,11 +27,14 @@ from split_delivery_settings import (
     DeliveryInfoKeysRegistry,
     DeliveryInfoKey,
 )
+from windowed_table import WindowedTable, iter_frame_rows
 
-_delivery_confirmation = {}
+_delivery_confirmations: dict[str, "DeliveryConfirmationFileSpec"] = {}
+# Delivery confirmations in the order of uploads, by file name.
 
 _DELIVERY_SPLIT_RESULT_CONTAINER_ID = "delivery-split-result-container"
 _DELIVERY_SPLIT_RESULT_TABLE_ID = "delivery-split-result-table"
+_DELIVERY_SPLIT_DOWNLOAD_ALL_BUTTON_ID = "delivery-split-download-all-button"
 
 
 class DeliveryConfirmationFileSpec:
@@ -53,6 +59,7 @@ class ValidOrderFileSpec:
     file_name: str
     data_frame: pd.DataFrame
     variable_mapping: PlatformHeaderVariableMap
+    sheet_name: str = ''
 
 
 @dataclass
@@ -73,25 +80,24 @@ def collect_valid_orders() -> dict[str, ValidOrderFileSpec]:
 
     variable_mappings = load_order_variables_from_local_storage()
     variable_maps = variable_mappings.platform_header_variable_maps
-    # Filter encrypted files
-    files = {}
+    valid_orders = {}
     for file_name in _order_files:
         try:
-            file_bytes = load_order_file(file_name)
-            files[file_name] = file_bytes
-        except KeyError:  # noqa: PERF203
-            ...  # Skip the invalid password file.
-
-    return {
-        file_name: ValidOrderFileSpec(
-            file_name=file_name,
-            data_frame=load_excel(file_bytes, var_map.header),
-            variable_mapping=var_map,
-        )
-        for file_name, file_bytes in files.items()
-        if (var_map := find_matching_variable_map(file_bytes, variable_maps))
-        is not None
-    }
+            order_sheets = load_order_sheets(file_name, variable_maps)
+        except KeyError:
+            continue  # Skip the invalid password file.
+        for sheet_name, var_map, data_frame in order_sheets:
+            # Sheets are listed separately only if there are more than one.
+            order_name = (
+                file_name if len(order_sheets) == 1 else f"{file_name} [{sheet_name}]"
+            )
+            valid_orders[order_name] = ValidOrderFileSpec(
+                file_name=file_name,
+                data_frame=data_frame,
+                variable_mapping=var_map,
+                sheet_name=sheet_name,
+            )
+    return valid_orders
 
 
 def _get_download_button_id(platform_name: str) -> str:
@@ -114,56 +120,124 @@ def _generate_download_event_handler(
     def download_delivery_split(_):
         window.console.log("Downloading split files.")
         # Download the split file.
-        bytes = io.BytesIO()
-        export_excel(
-            file_spec.data_frame, bytes, export_sheet_name=file_spec.export_sheet_name
+        download_bytes(
+            export_excel_bytes(
+                file_spec.data_frame, export_sheet_name=file_spec.export_sheet_name
+            ),
+            _make_split_file_name(file_spec),
         )
-        bytes_buffer = bytes.getbuffer()
-        js_array = Uint8Array.new(bytes_buffer.nbytes)
-        js_array.assign(bytes_buffer)
-
-        file_name = _make_split_file_name(file_spec)
-        file = File.new([js_array], file_name, {type: "text/plain"})
-        url = URL.createObjectURL(file)
-
-        hidden_link = document.createElement("a")
-        hidden_link.setAttribute("download", file_name)
-        hidden_link.setAttribute("href", url)
-        hidden_link.click()
-        # Release the object URL and clean up.
-        URL.revokeObjectURL(url)
-        hidden_link.remove()
-        del hidden_link
 
     return download_delivery_split
 
 
-@dataclass
-class MatchedOrderDeliveryPair:
+def _make_split_archive_file_name() -> str:
+    today_as_str = pd.Timestamp.now().strftime("%Y-%m-%d")
+    return f"delivered-{today_as_str}.zip"
+
+
+def _make_leftover_file_name() -> str:
+    today_as_str = pd.Timestamp.now().strftime("%Y-%m-%d")
+    return f"cannot-be-matched-{today_as_str}.xlsx"
+
+
+def _generate_download_all_event_handler(
+    matching_results: "OrderDeliveryMatchingResults",
+) -> Callable:
+    def download_all_delivery_splits(_):
+        window.console.log("Downloading all split files as a zip file.")
+        workbooks = [
+            (
+                _make_split_file_name(file_spec),
+                file_spec.data_frame,
+                file_spec.export_sheet_name,
+            )
+            for file_spec in matching_results.file_specs.values()
+        ]
+        if len(matching_results.cannot_be_matched) > 0:
+            workbooks.append(
+                (_make_leftover_file_name(), matching_results.cannot_be_matched, None)
+            )
+        bytes = io.BytesIO()
+        export_excel_archive(workbooks, bytes)
+        download_bytes(
+            bytes.getbuffer(), _make_split_archive_file_name(), ZIP_MIME_TYPE
+        )
+
+    return download_all_delivery_splits
+
+
+def _render_download_all_button(container, matching_results) -> None:
+    button = document.createElement('button')
+    button.id = _DELIVERY_SPLIT_DOWNLOAD_ALL_BUTTON_ID
+    button.className = "small-button"
+    button.textContent = "💾 전체 내려받기 (zip)"
+    container.appendChild(button)
+    when("click", button)(_generate_download_all_event_handler(matching_results))
+
+
+OrderRowId = tuple[str, Hashable]
+"""(order name, row label) of an order row."""
+DeliveryRowId = tuple[str, Hashable]
+"""(delivery confirmation file name, row label) of a delivery row."""
+
+
+@dataclass(frozen=True)
+class MatchedOrderRows:
+    """Matches of the rows of an order file by positions, not by copies of the rows.
+
+    All order rows are kept, matched or not,
+    so that the cannot-be-matched part can be manually inserted.
+    """
+
     platform: str
-    original_order_row: pd.DataFrame | pd.Series
-    delivery_confirmation_row: pd.DataFrame | pd.Series | None
+    order_rows: pd.DataFrame
+    """Rows of the order file. It is the data frame of the order file, not a copy."""
+    confirmations: tuple[pd.DataFrame, ...]
+    """Delivery confirmations in the order of matching."""
+    confirmation_positions: np.ndarray
+    """Position in ``confirmations`` of the match of each order row, -1 if none."""
+    delivery_positions: np.ndarray
+    """Position of the matched row in its confirmation of each order row, -1 if none."""
+
+    def delivery_rows(self) -> pd.DataFrame:
+        """Matched delivery rows in the same positions as the order rows.
+
+        Unmatched order rows and the columns that a confirmation does not have
+        are filled with empty strings.
+        """
+        parts = []
+        for i_confirmation, confirmation in enumerate(self.confirmations):
+            positions = np.flatnonzero(self.confirmation_positions == i_confirmation)
+            if len(positions) > 0:
+                matched = confirmation.iloc[self.delivery_positions[positions]]
+                parts.append(matched.set_axis(positions))
+        if not parts:
+            return pd.DataFrame(index=range(len(self.order_rows)))
+        return pd.concat(parts).reindex(range(len(self.order_rows))).fillna("")
 
 
 @dataclass
 class OrderDeliveryMatchingResults:
-    matched: dict[str, list[MatchedOrderDeliveryPair]]
+    matched: dict[str, list[MatchedOrderRows]]
+    """Matches of each order file per platform."""
     cannot_be_matched: pd.DataFrame
 
-    @property
+    @cached_property
     def file_specs(self) -> dict[str, DeliveryInfoUpdatedFileSpec]:
+        """Delivery reports per platform, rendered when they are first accessed."""
         file_specs = {}
-        for platform, matched_pairs in self.matched.items():
+        for platform, matched_files in self.matched.items():
             if (report_setting := _delivery_report_registry.get(platform)) is not None:
-                if len(matched_pairs) > 0:
-                    rendered = [
-                        report_setting.render(
-                            order_row=matched_pair.original_order_row,
-                            delivery_row=matched_pair.delivery_confirmation_row,
-                        )
-                        for matched_pair in matched_pairs
-                    ]
-                    data_frame = pd.concat(rendered)
+                if sum(len(matched.order_rows) for matched in matched_files) > 0:
+                    data_frame = pd.concat(
+                        [
+                            report_setting.render(
+                                matched.order_rows, matched.delivery_rows()
+                            )
+                            for matched in matched_files
+                        ],
+                        ignore_index=True,
+                    )
                 else:  # If there is 0 orders.
                     data_frame = pd.DataFrame(
                         {col: [''] for col in report_setting.headers}
@@ -190,39 +264,9 @@ class _DeliveryInfoKeyPlatformVer(DeliveryInfoKey):
     """Header of the platform specific name. i.e. 수령인명"""
 
 
-def _match_orderrow_deliveryrow(
-    order_row: pd.Series,
-    delivery_row: pd.Series,
-    matching_keys: tuple[_DeliveryInfoKeyPlatformVer, ...],
-) -> bool:
-    return all(
-        order_row[key.platform_header] == delivery_row[key.delivery_info_header]
-        or order_row[key.platform_header].strip()
-        == delivery_row[key.delivery_info_header].strip()
-        for key in matching_keys
-    )
-
-
-def _find_matching_delivery_confirmation(
-    order_row: pd.DataFrame | pd.Series,
-    delivery_confirmation_df: pd.DataFrame,
-    matching_keys: tuple[_DeliveryInfoKeyPlatformVer, ...],
-) -> pd.Series | None:
-    matches = [
-        delivery_row
-        for _, delivery_row in delivery_confirmation_df.iterrows()
-        if _match_orderrow_deliveryrow(
-            order_row=order_row, delivery_row=delivery_row, matching_keys=matching_keys
-        )
-    ]
-    # Only return unique match
-    return next(iter(matches)) if len(matches) == 1 else None
-
-
-def _delivery_info_key_registry_to_platform_header_ver() -> (
-    dict[str, tuple[_DeliveryInfoKeyPlatformVer, ...]]
-):
-    registry = load_delivery_info_keys_from_local_storage()
+def _delivery_info_key_registry_to_platform_header_ver(
+    registry: DeliveryInfoKeysRegistry,
+) -> dict[str, tuple[_DeliveryInfoKeyPlatformVer, ...]]:
     unified_var_settings = load_order_variables_from_local_storage()
     var_mappings = unified_var_settings.platform_header_variable_maps
     return {
@@ -231,6 +275,7 @@ def _delivery_info_key_registry_to_platform_header_ver() -> (
                 unified_variable_name=key.unified_variable_name,
                 delivery_info_header=key.delivery_info_header,
                 platform_header=var_mapping.variable_mapping[key.unified_variable_name],
+                normalization_rules=key.normalization_rules,
             )
             for key in registry.keys
         )
@@ -238,64 +283,210 @@ def _delivery_info_key_registry_to_platform_header_ver() -> (
     }
 
 
-def split_delivery_info_per_platform(
-    orders: dict[str, ValidOrderFileSpec],
-    delivery_confirmation: DeliveryConfirmationFileSpec,
-) -> OrderDeliveryMatchingResults:
-    #  Load matching settings.
-    matching_keys = _delivery_info_key_registry_to_platform_header_ver()
-    #  Initialize the result.
-    matched: dict[str, list[MatchedOrderDeliveryPair]] = {
-        file_spec.variable_mapping.platform: [] for file_spec in orders.values()
-    }
+def _fingerprint_orders(
+    orders: dict[str, ValidOrderFileSpec], registry: DeliveryInfoKeysRegistry
+) -> str:
+    hasher = hashlib.sha256(repr(registry).encode())
+    for order_name, file_spec in orders.items():
+        hasher.update(repr((order_name, file_spec.variable_mapping)).encode())
+        hasher.update(
+            pd.util.hash_pandas_object(file_spec.data_frame, index=True)
+            .to_numpy()
+            .tobytes()
+        )
+    return hasher.hexdigest()
+
 
-    delivery_df = delivery_confirmation.data_frame.copy(deep=True)
-    for order_file_spec in orders.values():
-        platform = order_file_spec.variable_mapping.platform
-        # Using platform from here since we do not have to keep file name
-        # For example, if there are 2 files for Naver, we can simply merge them.
-        for _, order_row in order_file_spec.data_frame.iterrows():
+@dataclass
+class DeliveryMatchingState:
+    """Matching state that is kept between delivery confirmation uploads.
+
+    Order rows are identified by ``(order name, row label)``,
+    which stays the same as long as the order files and the settings are the same.
+    A new delivery confirmation is matched only against the unmatched order rows.
+    """
+
+    fingerprint: str
+    """Fingerprint of the order files and the matching settings of the state."""
+    order_keys: dict[str, pd.Series]
+    """Normalized match key of each order row per order name."""
+    assignments: dict[OrderRowId, DeliveryRowId] = field(default_factory=dict)
+    confirmations: dict[str, pd.DataFrame] = field(default_factory=dict)
+    """Delivery confirmations matched so far, by file name."""
+    leftovers: dict[str, pd.DataFrame] = field(default_factory=dict)
+    """Delivery rows that could not be matched, per confirmation file name."""
+
+    @classmethod
+    def from_orders(
+        cls,
+        orders: dict[str, ValidOrderFileSpec],
+        registry: DeliveryInfoKeysRegistry,
+    ) -> "DeliveryMatchingState":
+        matching_keys = _delivery_info_key_registry_to_platform_header_ver(registry)
+        # Normalized keys are computed once per data frame
+        # so that only the keys are compared while matching.
+        order_keys = {
+            order_name: build_match_keys(
+                file_spec.data_frame,
+                (
+                    (key.platform_header, key.normalization_rules)
+                    for key in matching_keys[file_spec.variable_mapping.platform]
+                ),
+            )
+            for order_name, file_spec in orders.items()
+        }
+        return cls(
+            fingerprint=_fingerprint_orders(orders, registry),
+            order_keys=order_keys,
+        )
+
+    def match(
+        self,
+        orders: dict[str, ValidOrderFileSpec],
+        delivery_confirmation: DeliveryConfirmationFileSpec,
+        registry: DeliveryInfoKeysRegistry,
+    ) -> None:
+        """Match the new delivery confirmation against the unmatched order rows."""
+        confirmation_name = delivery_confirmation.file_name
+        delivery_df = delivery_confirmation.data_frame
+        delivery_keys = build_match_keys(
+            delivery_df,
+            (
+                (key.delivery_info_header, key.normalization_rules)
+                for key in registry.keys
+            ),
+        )
+        unmatched_delivery_rows: dict[str, list[Hashable]] = {}
+        for i_delivery_row, delivery_key in delivery_keys.items():
+            unmatched_delivery_rows.setdefault(delivery_key, []).append(i_delivery_row)
+
+        matched_delivery_rows: list[Hashable] = []
+        for order_name, order_file_spec in orders.items():
             # We handle ``platform not in _delivery_report_registry`` here
             # So that we skip the platform if there is no delivery report format.
-            unique_match = _find_matching_delivery_confirmation(
-                order_row, delivery_df, matching_keys[platform]
+            platform = order_file_spec.variable_mapping.platform
+            if platform not in _delivery_report_registry:
+                continue
+            for i_order_row, order_key in self.order_keys[order_name].items():
+                if (order_name, i_order_row) in self.assignments:
+                    continue  # Already matched by the previous confirmations.
+                # Only unique match is accepted.
+                candidates = unmatched_delivery_rows.get(order_key, [])
+                if len(candidates) == 1:  # Matched!
+                    # Remove matched row so that only cannot-be-matched rows are left
+                    # And other rows can be matched faster
+                    i_delivery_row = candidates.pop()
+                    matched_delivery_rows.append(i_delivery_row)
+                    self.assignments[(order_name, i_order_row)] = (
+                        confirmation_name,
+                        i_delivery_row,
+                    )
+
+        self.confirmations[confirmation_name] = delivery_df
+        self.leftovers[confirmation_name] = delivery_df.drop(matched_delivery_rows)
+
+    def results(
+        self, orders: dict[str, ValidOrderFileSpec]
+    ) -> OrderDeliveryMatchingResults:
+        confirmations = tuple(self.confirmations.values())
+        # Row labels of the matches per order file and delivery confirmation.
+        assigned_labels: dict[tuple[str, str], list[tuple[Hashable, Hashable]]] = {}
+        for (order_name, i_order_row), delivery_row_id in self.assignments.items():
+            confirmation_name, i_delivery_row = delivery_row_id
+            assigned_labels.setdefault((order_name, confirmation_name), []).append(
+                (i_order_row, i_delivery_row)
             )
-            if (
-                unique_match is not None and platform in _delivery_report_registry
-            ):  # Matched!
-                # Remove matched row so that only cannot-be-matched rows are left
-                # And other rows can be matched faster
-                delivery_df.drop(unique_match.name, axis=0, inplace=True)
-
-            # Original order row should be appended no matter what
-            # so that the cannot-be-matched part can be manually inserted.
-            matched[platform].append(
-                MatchedOrderDeliveryPair(
-                    platform=platform,
-                    original_order_row=order_row,
-                    delivery_confirmation_row=unique_match
-                    if platform in _delivery_report_registry
-                    else None,
+
+        #  Initialize the result.
+        matched: dict[str, list[MatchedOrderRows]] = {
+            file_spec.variable_mapping.platform: [] for file_spec in orders.values()
+        }
+        for order_name, order_file_spec in orders.items():
+            order_rows = order_file_spec.data_frame
+            confirmation_positions = np.full(len(order_rows), -1, dtype=np.intp)
+            delivery_positions = np.full(len(order_rows), -1, dtype=np.intp)
+            for i_confirmation, confirmation_name in enumerate(self.confirmations):
+                if labels := assigned_labels.get((order_name, confirmation_name)):
+                    order_labels, delivery_labels = zip(*labels, strict=True)
+                    positions = order_rows.index.get_indexer(order_labels)
+                    confirmation_positions[positions] = i_confirmation
+                    delivery_positions[positions] = confirmations[
+                        i_confirmation
+                    ].index.get_indexer(delivery_labels)
+            # Using platform from here since we do not have to keep file name
+            # For example, if there are 2 files for Naver, we can simply merge them.
+            matched[order_file_spec.variable_mapping.platform].append(
+                MatchedOrderRows(
+                    platform=order_file_spec.variable_mapping.platform,
+                    order_rows=order_rows,
+                    confirmations=confirmations,
+                    confirmation_positions=confirmation_positions,
+                    delivery_positions=delivery_positions,
                 )
             )
 
-    return OrderDeliveryMatchingResults(matched=matched, cannot_be_matched=delivery_df)
+        leftovers = list(self.leftovers.values())
+        return OrderDeliveryMatchingResults(
+            matched=matched,
+            # Confirmations may have different columns, so missing cells are filled.
+            cannot_be_matched=pd.concat(leftovers).fillna("")
+            if leftovers
+            else pd.DataFrame(),
+        )
+
+
+def split_delivery_info_per_platform(
+    orders: dict[str, ValidOrderFileSpec],
+    delivery_confirmation: DeliveryConfirmationFileSpec,
+) -> OrderDeliveryMatchingResults:
+    """Match the orders and the delivery confirmation from scratch."""
+    registry = load_delivery_info_keys_from_local_storage()
+    state = DeliveryMatchingState.from_orders(orders, registry)
+    state.match(orders, delivery_confirmation, registry)
+    return state.results(orders)
+
+
+_matching_state: list[DeliveryMatchingState] = []
+# Matching state of the latest refresh. It is empty before the first refresh.
+
+
+def update_delivery_matching_state(
+    orders: dict[str, ValidOrderFileSpec],
+) -> DeliveryMatchingState:
+    """Match the delivery confirmations that are not matched yet.
+
+    The state is rebuilt from scratch, matching all the delivery confirmations
+    in the order of uploads, if the orders or the matching settings have changed.
+    """
+    registry = load_delivery_info_keys_from_local_storage()
+    fingerprint = _fingerprint_orders(orders, registry)
+    if not _matching_state or _matching_state[0].fingerprint != fingerprint:
+        window.console.log("Matching all delivery confirmations from scratch.")
+        _matching_state[:] = [DeliveryMatchingState.from_orders(orders, registry)]
+    state = _matching_state[0]
+    for file_name, delivery_confirmation in _delivery_confirmations.items():
+        if file_name not in state.confirmations:
+            window.console.log(f"Matching new delivery confirmation: {file_name}")
+            state.match(orders, delivery_confirmation, registry)
+    return state
 
 
 def render_leftover_delivery_info(container, left_over_df: pd.DataFrame) -> None:
-    table = document.createElement('div')
-    table.innerHTML = delivery_left_over_table_template.render(
-        headers=left_over_df.columns,
-        rows=[
-            [row[col] for col in left_over_df.columns]
-            for _, row in left_over_df.iterrows()
-        ],
+    wrapper = document.createElement('div')
+    wrapper.innerHTML = delivery_left_over_caption_template.render()
+    container.appendChild(wrapper)
+    WindowedTable(
+        wrapper,
+        header_items=left_over_df.columns,
+        rows=iter_frame_rows(left_over_df),
+        table_class="failure-compensation",
+        first_column_class="short-column",
+        column_class="short-column",
     )
-    container.appendChild(table)
 
 
 def refresh_delivery_split_result() -> None:
-    if not _delivery_confirmation:
+    if not _delivery_confirmations:
         window.alert("배송내역 파일을 먼저 올려주세요.")
         return
 
@@ -317,9 +508,7 @@ def refresh_delivery_split_result() -> None:
     container = document.getElementById(_DELIVERY_SPLIT_RESULT_CONTAINER_ID)
     container.appendChild(table)
 
-    matching_results = split_delivery_info_per_platform(
-        orders=orders, delivery_confirmation=_delivery_confirmation["latest"]
-    )
+    matching_results = update_delivery_matching_state(orders).results(orders)
     if len(matching_results.cannot_be_matched) > 0:
         window.alert(
             f"총 {len(matching_results.cannot_be_matched)}개의 운송장 정보를 입력할 수 없었습니다: \n"
@@ -332,22 +521,27 @@ def refresh_delivery_split_result() -> None:
             # TODO: Improve this logic to only include possible ones.
             button = document.getElementById(_get_download_button_id(platform))
             when("click", button)(_generate_download_event_handler(file_spec))
+    # One button to download all split files and leftovers at once.
+    _render_download_all_button(container, matching_results)
 
     # Render left over ones if needed
     render_leftover_delivery_info(container, matching_results.cannot_be_matched)
 
 
 async def save_delivery_confirmation_file(file_obj) -> None:
-    new_delivery_confirmation = load_excel(await get_bytes_from_file(file_obj))
-    _delivery_confirmation.update(
-        {
-            "latest": DeliveryConfirmationFileSpec(
-                file_name=file_obj.name, df=new_delivery_confirmation
-            )
-        }
+    new_delivery_confirmation = load_excel(await read_file_bytes(file_obj))
+    if _delivery_confirmations.pop(file_obj.name, None) is not None:
+        # The same file is uploaded again, possibly with changes.
+        # Previous matches may be based on the old one so matching starts over.
+        _matching_state.clear()
+    _delivery_confirmations[file_obj.name] = DeliveryConfirmationFileSpec(
+        file_name=file_obj.name, df=new_delivery_confirmation
     )
     file_name_display = document.getElementById("delivery_confirmation_file_name")
-    file_name_display.textContent = f"최근 업로드 된 파일: {file_obj.name}"
+    file_name_display.textContent = (
+        f"업로드 된 파일: {', '.join(_delivery_confirmations)} "
+        "(새 파일은 아직 짝을 찾지 못한 주문과만 맞춰봅니다.)"
+    )
 
 
 async def upload_delivery_confirmation(e):
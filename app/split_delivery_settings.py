@@ -1,9 +1,10 @@
 import json
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import pandas as pd
 from js import confirm
+from key_normalization import DEFAULT_NORMALIZATION_RULES, NORMALIZATION_RULES
 from order_settings import load_order_variables_from_local_storage
 from pyscript import document, when, window
 
@@ -16,6 +17,18 @@ class DeliveryInfoKey:
     """Unified variable name. i.e. receipients_name"""
     delivery_info_header: str
     """Header of the delivery information. i.e. 수하인명"""
+    normalization_rules: tuple[str, ...] = field(
+        default=DEFAULT_NORMALIZATION_RULES, kw_only=True
+    )
+    """Names of the normalization rules applied to both columns before matching."""
+
+
+NORMALIZATION_PRESETS: dict[str, tuple[str, ...]] = {
+    "기본 (공백/전각 문자 정리)": DEFAULT_NORMALIZATION_RULES,
+    "전화번호 (숫자만 비교)": ("nfc", "fold_width", "digits_only"),
+    "그대로 비교": (),
+}
+"""Normalization rule sets that can be selected when adding a new key."""
 
 
 @dataclass
@@ -24,10 +37,16 @@ class DeliveryInfoKeysRegistry:
 
     keys: tuple[DeliveryInfoKey, ...]
 
-    def add_key(self, delivery_info_header: str, unified_variable_name: str) -> None:
+    def add_key(
+        self,
+        delivery_info_header: str,
+        unified_variable_name: str,
+        normalization_rules: tuple[str, ...] = DEFAULT_NORMALIZATION_RULES,
+    ) -> None:
         new_key = DeliveryInfoKey(
             delivery_info_header=delivery_info_header,
             unified_variable_name=unified_variable_name,
+            normalization_rules=normalization_rules,
         )
         # Make sure same delivery info header does not exist.
         self.delete_key(delivery_info_header)
@@ -43,11 +62,47 @@ class DeliveryInfoKeysRegistry:
 
     def _save_to_local_storage(self) -> None:
         self_as_dict = {
-            key.delivery_info_header: key.unified_variable_name for key in self.keys
+            key.delivery_info_header: _key_to_local_storage_value(key)
+            for key in self.keys
         }
         _update_delivery_info_keys_in_local_storage(self_as_dict)
 
 
+def _key_to_local_storage_value(key: DeliveryInfoKey) -> str | dict:
+    # Keys with default rules are saved as a plain unified variable name
+    # so that the settings stay compatible with the older versions.
+    if key.normalization_rules == DEFAULT_NORMALIZATION_RULES:
+        return key.unified_variable_name
+    return {
+        "unified_variable_name": key.unified_variable_name,
+        "normalization_rules": list(key.normalization_rules),
+    }
+
+
+def _local_storage_value_to_key(
+    delivery_header: str, value: str | dict
+) -> DeliveryInfoKey:
+    if isinstance(value, str):
+        return DeliveryInfoKey(
+            unified_variable_name=value, delivery_info_header=delivery_header
+        )
+    rules = tuple(value.get("normalization_rules", DEFAULT_NORMALIZATION_RULES))
+    if unknown_rules := [rule for rule in rules if rule not in NORMALIZATION_RULES]:
+        raise ValueError(f"Unknown normalization rules: {unknown_rules}")
+    return DeliveryInfoKey(
+        unified_variable_name=value["unified_variable_name"],
+        delivery_info_header=delivery_header,
+        normalization_rules=rules,
+    )
+
+
+def _describe_normalization_rules(rules: tuple[str, ...]) -> str:
+    for preset_name, preset_rules in NORMALIZATION_PRESETS.items():
+        if preset_rules == rules:
+            return preset_name
+    return ", ".join(rules)
+
+
 def initialize_delivery_key_format() -> None:
     unified_variables = load_order_variables_from_local_storage()
     select_input = document.getElementById("unified-variable-key-selection")
@@ -57,6 +112,13 @@ def initialize_delivery_key_format() -> None:
         new_opt.value = var
         new_opt.innerHTML = var
         select_input.appendChild(new_opt)
+    normalization_input = document.getElementById("delivery-info-key-normalization")
+    normalization_input.replaceChildren()
+    for preset_name in NORMALIZATION_PRESETS:
+        new_opt = document.createElement('option')
+        new_opt.value = preset_name
+        new_opt.innerHTML = preset_name
+        normalization_input.appendChild(new_opt)
 
 
 def add_delivery_info_key(event=None) -> None:
@@ -69,10 +131,17 @@ def add_delivery_info_key(event=None) -> None:
             "unified-variable-key-selection"
         )
         unified_variable_val = unified_variable_input.value
+        normalization_input = document.getElementById("delivery-info-key-normalization")
+        normalization_rules = NORMALIZATION_PRESETS.get(
+            normalization_input.value, DEFAULT_NORMALIZATION_RULES
+        )
         key_registry = load_delivery_info_keys_from_local_storage()
-        key_registry.add_key(delivery_header_val, unified_variable_val)
+        key_registry.add_key(
+            delivery_header_val, unified_variable_val, normalization_rules
+        )
         window.console.log(
             f"New delivery info keys: {delivery_header_val} - {unified_variable_val}"
+            f" ({', '.join(normalization_rules)})"
         )
 
         # Reset input fields.
@@ -83,7 +152,7 @@ def add_delivery_info_key(event=None) -> None:
 
 
 def _update_delivery_info_keys_in_local_storage(
-    new_vars_to_header: dict[str, str],
+    new_vars_to_header: dict[str, str | dict],
 ) -> None:
     window.console.log("Updating delivery info keys in the local storage...")
     local_storage = window.localStorage
@@ -114,11 +183,8 @@ def load_delivery_info_keys_from_local_storage() -> DeliveryInfoKeysRegistry:
         window.console.log(str(order_variables_dict))
         return DeliveryInfoKeysRegistry(
             keys=tuple(
-                DeliveryInfoKey(
-                    unified_variable_name=unified_var,
-                    delivery_info_header=delivery_header,
-                )
-                for delivery_header, unified_var in order_variables_dict.items()
+                _local_storage_value_to_key(delivery_header, value)
+                for delivery_header, value in order_variables_dict.items()
             )
         )
     except Exception:
@@ -163,6 +229,8 @@ def refresh_delivery_info_keys_table(_=None) -> None:
         '<tr>'
         f'<td class="short-column">{key.delivery_info_header}</td>'
         f'<td class="short-column">{key.unified_variable_name}</td>'
+        '<td class="short-column">'
+        f'{_describe_normalization_rules(key.normalization_rules)}</td>'
         f'<td class="short-column">{_make_delete_button(key.delivery_info_header)}</td>'
         '</tr>'
         for key in key_registry.keys
@@ -172,6 +240,7 @@ def refresh_delivery_info_keys_table(_=None) -> None:
             <tr class="header-row">
                 <td> 배송정보 열 이름 </td>
                 <td> 통합 열 이름 </td>
+                <td> 비교 방식 </td>
                 <td> 삭제 </td>
             </tr>
             {'\n'.join(rows)}
@@ -223,32 +292,37 @@ class _PlatformDeliveryReportSetting:
     """
 
     def render(
-        self, order_row: pd.Series, delivery_row: pd.Series | None
+        self, order_rows: pd.DataFrame, delivery_rows: pd.DataFrame
     ) -> pd.DataFrame:
-        base = self.headers.copy(deep=True)
-        for col in base.columns:
+        """Render the report rows of all ``order_rows`` at once.
+
+        ``delivery_rows`` are the matched delivery rows in the same positions
+        as the ``order_rows``, with empty strings for the unmatched order rows.
+        """
+        n_rows = len(order_rows)
+        columns = {}
+        for col in self.headers.columns:
             mapping = self.mappings.get(
                 col,
                 FromOriginalOrderFile(target=col, column=col),  # Always fall back
             )
-            window.console.log(str(mapping))
             # Parse the value based on the mapping setting.
-            if isinstance(mapping, FromOriginalOrderFile):
-                value = order_row.get(
-                    mapping.column, default=""
-                )  # Leave it empty if not found.
-            elif isinstance(mapping, FromDeliveryConfirmation) and (
-                delivery_row is not None
+            if isinstance(mapping, HardcodedColumn):
+                values = [mapping.value] * n_rows
+            elif (
+                isinstance(mapping, FromOriginalOrderFile)
+                and mapping.column in order_rows.columns
             ):
-                value = delivery_row.get(mapping.column, default="")
-            elif isinstance(mapping, HardcodedColumn):
-                value = mapping.value
+                values = order_rows[mapping.column].to_numpy()
+            elif (
+                isinstance(mapping, FromDeliveryConfirmation)
+                and mapping.column in delivery_rows.columns
+            ):
+                values = delivery_rows[mapping.column].to_numpy()
             else:
-                value = ""
-
-            # Render - one row
-            base[col] = [value]
-        return base
+                values = [""] * n_rows  # Leave it empty if not found.
+            columns[col] = values
+        return pd.DataFrame(columns, columns=self.headers.columns)
 
 
 def _load_excel_file_as_platform_report_setting(
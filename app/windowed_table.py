@@ -0,0 +1,90 @@
+"""Tables that render their rows one page at a time.
+
+Large previews used to be rendered as a single html string,
+which blocks the page while the whole table is built and parsed.
+A windowed table renders only the header and the first page of rows,
+and the rest of the rows are rendered on demand by the "더 보기" button.
+Rows are pulled lazily from an iterator so rows that are never shown
+are never computed either.
+"""
+
+from collections.abc import Iterable, Iterator
+
+import pandas as pd
+from _templates import windowed_table_rows_template, windowed_table_template
+from pyscript import document, when
+
+ROWS_PER_PAGE = 50
+_NO_MORE_ROWS = object()
+"""Next row of a table that has rendered all of its rows."""
+
+
+def iter_frame_rows(df: pd.DataFrame) -> Iterator[list]:
+    """Iterate rows of ``df`` as lists without building a series per row."""
+    for row in df.itertuples(index=False, name=None):
+        yield list(row)
+
+
+class WindowedTable:
+    """Table in the ``container`` that renders ``rows`` page by page.
+
+    Cells are escaped by the templates so ``rows`` may carry any text.
+    """
+
+    def __init__(
+        self,
+        container,
+        header_items: Iterable,
+        rows: Iterable[Iterable],
+        *,
+        rows_per_page: int = ROWS_PER_PAGE,
+        table_class: str = '',
+        first_column_class: str = '',
+        column_class: str = '',
+    ) -> None:
+        self._rows = iter(rows)
+        # One row is pulled ahead to tell if the "더 보기" button is needed.
+        self._next_row = next(self._rows, _NO_MORE_ROWS)
+        self._rows_per_page = rows_per_page
+        self._cell_classes = {
+            "first_column_class": first_column_class,
+            "column_class": column_class,
+        }
+        self._wrapper = document.createElement("div")
+        self._wrapper.innerHTML = windowed_table_template.render(
+            header_items=list(header_items),
+            table_class=table_class,
+            **self._cell_classes,
+        )
+        self._body = self._wrapper.querySelector("tbody")
+        self._more_button = document.createElement("button")
+        self._more_button.classList.add("small-button")
+        self._more_button.innerText = "더 보기"
+        when("click", self._more_button)(self._render_next_page_handler)
+        container.appendChild(self._wrapper)
+        self.render_next_page()
+
+    def _has_more_rows(self) -> bool:
+        return self._next_row is not _NO_MORE_ROWS
+
+    def _next_page(self) -> list:
+        page = []
+        while self._has_more_rows() and len(page) < self._rows_per_page:
+            page.append(self._next_row)
+            self._next_row = next(self._rows, _NO_MORE_ROWS)
+        return page
+
+    def render_next_page(self) -> None:
+        page = self._next_page()
+        # The page is inserted at once since partial markup,
+        # i.e. half of a ``<td>`` tag, is not parsed as a part of the table.
+        rows_html = windowed_table_rows_template.render(rows=page, **self._cell_classes)
+        self._body.insertAdjacentHTML("beforeend", rows_html)
+
+        if not self._has_more_rows():
+            self._more_button.remove()
+        elif self._more_button.parentNode is None:
+            self._wrapper.appendChild(self._more_button)
+
+    def _render_next_page_handler(self, _) -> None:
+        self.render_next_page()
@@ -0,0 +1,189 @@
+"""Benchmark the user flows of the web application in plain CPython.
+
+The browser is replaced by ``benchmarks/headless_runtime``.
+Run from the repository root::
+
+    python benchmarks/app_flows.py [--repeat 5] [--output results.csv]
+
+Each repetition starts from an empty application state and runs the flows
+in the order a user would: upload, preview, merge download,
+delivery-format download and split.
+Timings are the median of the repetitions without memory tracing.
+Peak memory is measured in one more traced run
+since tracing slows down the flows.
+"""
+
+import argparse
+import asyncio
+import inspect
+import os
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+import pandas as pd
+
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+APP_DIR = REPOSITORY_ROOT / "app"
+DEFAULT_FIXTURE_DIR = REPOSITORY_ROOT / "tests" / "excel_examples"
+DEFAULT_DELIVERY_CONFIRMATION = DEFAULT_FIXTURE_DIR / "devliery_confirmations.xlsx"
+sys.path[:0] = [
+    (REPOSITORY_ROOT / "benchmarks" / "headless_runtime").as_posix(),
+    APP_DIR.as_posix(),
+]
+_INVOCATION_DIR = pathlib.Path.cwd()
+os.chdir(APP_DIR)  # The application loads its resources relative to ``app/``.
+
+import _dom  # noqa: E402
+import excel_helpers  # noqa: E402
+import order_file_io  # noqa: E402
+import split_delivery  # noqa: E402
+from delivery_form import (  # noqa: E402
+    download_orders_in_delivery_format,
+    refresh_delivery_format_file_preview,
+)
+from merge_order import download_merged_orders, refresh_merge_file_preview  # noqa: E402
+
+_MIB = 1024 * 1024
+
+
+def reset_app_state() -> None:
+    _dom.reset()
+    order_file_io._order_files.clear()
+    split_delivery._delivery_confirmations.clear()
+    split_delivery._matching_state.clear()
+    excel_helpers.clear_export_cache()
+
+
+def _make_file_event(files: list[_dom.File]) -> _dom.Event:
+    target = _dom.Element(_dom.document, "input")
+    target.files = files
+    return _dom.Event(target=target, currentTarget=target)
+
+
+def build_flows(
+    order_files: list[pathlib.Path], delivery_confirmation: pathlib.Path
+) -> dict[str, Callable]:
+    def upload() -> Awaitable[None]:
+        files = [_dom.File([path.read_bytes()], path.name) for path in order_files]
+        return order_file_io.upload_order_file(_make_file_event(files))
+
+    def preview() -> None:
+        refresh_merge_file_preview()
+        refresh_delivery_format_file_preview()
+
+    def split() -> Awaitable[None]:
+        async def _split() -> None:
+            file = _dom.File(
+                [delivery_confirmation.read_bytes()], delivery_confirmation.name
+            )
+            await split_delivery.upload_delivery_confirmation(_make_file_event([file]))
+            button_id = split_delivery._DELIVERY_SPLIT_DOWNLOAD_ALL_BUTTON_ID
+            _dom.document.getElementById(button_id).click()
+
+        return _split()
+
+    return {
+        "upload": upload,
+        "preview": preview,
+        "merge download": lambda: download_merged_orders(None),
+        "delivery-format download": lambda: download_orders_in_delivery_format(None),
+        "split": split,
+    }
+
+
+def _run(flow: Callable) -> None:
+    result = flow()
+    if inspect.iscoroutine(result):
+        asyncio.run(result)
+
+
+def run_flows(flows: dict[str, Callable], traced: bool) -> dict:
+    reset_app_state()
+    measurements = {}
+    for name, flow in flows.items():
+        n_downloads = len(_dom.document.downloads)
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        _run(flow)
+        seconds = time.perf_counter() - start
+        peak = None
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        downloads = _dom.document.downloads[n_downloads:]
+        measurements[name] = {
+            "seconds": seconds,
+            "peak_mib": None if peak is None else peak / _MIB,
+            "downloads": len(downloads),
+            "download_mib": sum(len(download.data) for download in downloads) / _MIB,
+        }
+    measurements["store_mib"] = (
+        order_file_io._order_files.footprint().total_bytes / _MIB
+    )
+    return measurements
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture-dir", type=pathlib.Path, default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument(
+        "--delivery-confirmation",
+        type=pathlib.Path,
+        default=DEFAULT_DELIVERY_CONFIRMATION,
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    return parser
+
+
+def _collect_order_files(
+    fixture_dir: pathlib.Path, delivery_confirmation: pathlib.Path
+) -> list[pathlib.Path]:
+    return sorted(
+        path
+        for path in fixture_dir.iterdir()
+        if path.suffix in (".xlsx", ".xls", ".csv", ".tsv")
+        and path.resolve() != delivery_confirmation.resolve()
+    )
+
+
+def main() -> None:
+    args = build_argparser().parse_args()
+    fixture_dir = _INVOCATION_DIR / args.fixture_dir
+    delivery_confirmation = _INVOCATION_DIR / args.delivery_confirmation
+    order_files = _collect_order_files(fixture_dir, delivery_confirmation)
+    flows = build_flows(order_files, delivery_confirmation)
+
+    runs = [run_flows(flows, traced=False) for _ in range(args.repeat)]
+    traced = run_flows(flows, traced=True)
+    results = pd.DataFrame(
+        [
+            {
+                "flow": name,
+                "median_seconds": statistics.median(
+                    run[name]["seconds"] for run in runs
+                ),
+                "peak_mib": traced[name]["peak_mib"],
+                "downloads": traced[name]["downloads"],
+                "download_mib": traced[name]["download_mib"],
+            }
+            for name in flows
+        ]
+    )
+    print(results.to_string(index=False))  # noqa: T201
+    print(  # noqa: T201
+        f"{len(order_files)} order files, "
+        f"order file store after the flows: {traced['store_mib']:.2f} MiB, "
+        f"alerts: {len(_dom.window.alerts)}"
+    )
+    if args.output is not None:
+        results.to_csv(_INVOCATION_DIR / args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Headless stand-in of the browser objects that the web application uses.
+
+Put this directory in front of ``sys.path`` to import the modules of ``app/``
+in plain CPython, i.e. to profile or benchmark them::
+
+    sys.path[:0] = ["benchmarks/headless_runtime", "app"]
+
+Only the parts of the browser API that the application calls are implemented.
+Nothing is rendered; html strings are kept as they are
+and downloads are recorded in ``downloads`` instead of being saved.
+"""
+
+import itertools
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+class ClassList:
+    def __init__(self) -> None:
+        self._classes: list[str] = []
+
+    def add(self, *names: str) -> None:
+        self._classes.extend(name for name in names if name not in self._classes)
+
+    def remove(self, *names: str) -> None:
+        self._classes = [name for name in self._classes if name not in names]
+
+    def contains(self, name: str) -> bool:
+        return name in self._classes
+
+
+class Element:
+    """Element that keeps its html as a string and its children as a list."""
+
+    def __init__(self, document: "Document", tag_name: str) -> None:
+        self._document = document
+        self._id = ""
+        self.tagName = tag_name.upper()
+        self.innerHTML = ""
+        self.textContent = ""
+        self.innerText = ""
+        self.value = ""
+        self.className = ""
+        self.classList = ClassList()
+        self.attributes: dict[str, str] = {}
+        self.listeners: dict[str, list[Callable]] = {}
+        self.parentNode: Element | None = None
+        self._children: list[Element] = []
+        self._selected: dict[str, Element] = {}
+        self.onsubmit = None
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @id.setter
+    def id(self, element_id: str) -> None:
+        self._id = element_id
+        self._document.register(self)
+
+    @property
+    def children(self) -> tuple["Element", ...]:
+        # A copy so that children can be removed while iterating them.
+        return tuple(self._children)
+
+    def appendChild(self, child: "Element") -> "Element":
+        if child.parentNode is not None:
+            child.remove()
+        child.parentNode = self
+        self._children.append(child)
+        return child
+
+    def removeChild(self, child: "Element") -> "Element":
+        self._children.remove(child)
+        child.parentNode = None
+        return child
+
+    def remove(self) -> None:
+        if self.parentNode is not None:
+            self.parentNode.removeChild(self)
+
+    def replaceChildren(self, *children: "Element") -> None:
+        for child in self.children:
+            child.remove()
+        for child in children:
+            self.appendChild(child)
+
+    def insertAdjacentHTML(self, position: str, html: str) -> None:
+        if position == "beforeend":
+            self.innerHTML += html
+        elif position == "afterbegin":
+            self.innerHTML = html + self.innerHTML
+        else:
+            raise NotImplementedError(f"Position {position} is not supported.")
+
+    def querySelector(self, selector: str) -> "Element":
+        """Return the same element for the same selector.
+
+        The html is not parsed so the element always exists.
+        """
+        if selector not in self._selected:
+            self._selected[selector] = self.appendChild(
+                self._document.createElement(selector)
+            )
+        return self._selected[selector]
+
+    def setAttribute(self, name: str, value: str) -> None:
+        self.attributes[name] = value
+
+    def getAttribute(self, name: str) -> str | None:
+        return self.attributes.get(name)
+
+    def addEventListener(self, event_type: str, listener: Callable) -> None:
+        self.listeners.setdefault(event_type, []).append(listener)
+
+    def click(self) -> None:
+        if self.tagName == "A" and "download" in self.attributes:
+            self._document.download(self.attributes["download"], self.attributes)
+        for listener in self.listeners.get("click", []):
+            listener(Event(target=self, currentTarget=self))
+
+
+@dataclass
+class Event:
+    target: object
+    currentTarget: object = None
+
+    def preventDefault(self) -> None: ...
+
+
+@dataclass
+class Download:
+    file_name: str
+    data: bytes
+    mime_type: str
+
+
+class Document:
+    """Document that creates any element that is looked up by id.
+
+    Elements of ``index.html`` are not loaded, so unknown ids are created
+    on demand as if they were in the page.
+    """
+
+    def __init__(self, object_urls: "ObjectURLs") -> None:
+        self._elements: dict[str, Element] = {}
+        self._object_urls = object_urls
+        self.downloads: list[Download] = []
+
+    def register(self, element: Element) -> None:
+        self._elements[element.id] = element
+
+    def createElement(self, tag_name: str) -> Element:
+        return Element(self, tag_name)
+
+    def getElementById(self, element_id: str) -> Element:
+        if element_id not in self._elements:
+            self.createElement("div").id = element_id
+        return self._elements[element_id]
+
+    def download(self, file_name: str, attributes: dict[str, str]) -> None:
+        file = self._object_urls.get(attributes["href"])
+        self.downloads.append(Download(file_name, file.data, file.type))
+
+
+class LocalStorage:
+    def __init__(self) -> None:
+        self._items: dict[str, str] = {}
+
+    def getItem(self, key: str) -> str | None:
+        return self._items.get(key)
+
+    def setItem(self, key: str, value: str) -> None:
+        self._items[key] = str(value)
+
+    def removeItem(self, key: str) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+class Console:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+
+    def log(self, *messages) -> None:
+        self.messages.append(" ".join(str(message) for message in messages))
+
+
+class Window:
+    def __init__(self, document: Document) -> None:
+        self.document = document
+        self.localStorage = LocalStorage()
+        self.console = Console()
+        self.alerts: list[str] = []
+        self.confirm_answer = True
+        self.onbeforeunload = None
+
+    def alert(self, message: str = "") -> None:
+        self.alerts.append(str(message))
+
+    def confirm(self, message: str = "") -> bool:
+        return self.confirm_answer
+
+
+class ArrayBuffer:
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+
+    @property
+    def byteLength(self) -> int:
+        return len(self._data)
+
+    def to_bytes(self) -> bytes:
+        return self._data
+
+
+class File:
+    """``File`` that is both uploaded by the user and made for downloads."""
+
+    def __init__(self, parts: list, name: str, options: dict | None = None) -> None:
+        self.data = b"".join(bytes(part) for part in parts)
+        self.name = name
+        self.type = (options or {}).get("type", "")
+
+    @classmethod
+    def new(cls, parts: list, name: str, options: dict | None = None) -> "File":
+        return cls(parts, name, options)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    async def arrayBuffer(self) -> ArrayBuffer:
+        return ArrayBuffer(self.data)
+
+
+class Uint8Array:
+    @staticmethod
+    def new(data) -> bytes:
+        return bytes(data)
+
+
+class ObjectURLs:
+    """``URL`` with object urls of the files."""
+
+    def __init__(self) -> None:
+        self._files: dict[str, File] = {}
+        self._counter = itertools.count()
+
+    def createObjectURL(self, file: File) -> str:
+        url = f"blob:headless/{next(self._counter)}"
+        self._files[url] = file
+        return url
+
+    def revokeObjectURL(self, url: str) -> None:
+        self._files.pop(url, None)
+
+    def get(self, url: str) -> File:
+        return self._files[url]
+
+
+class Object:
+    @staticmethod
+    def fromEntries(entries) -> dict:
+        return dict(entries)
+
+
+URL = ObjectURLs()
+document = Document(URL)
+window = Window(document)
+
+
+def when(event_type: str, element: Element) -> Callable:
+    """Register the decorated function as an event listener of the ``element``."""
+
+    def decorator(listener: Callable) -> Callable:
+        element.addEventListener(event_type, listener)
+        return listener
+
+    return decorator
+
+
+def reset() -> None:
+    """Forget all elements, local storage, alerts and downloads."""
+    document._elements.clear()
+    document.downloads.clear()
+    window.localStorage.clear()
+    window.console.messages.clear()
+    window.alerts.clear()
@@ -0,0 +1,17 @@
+"""Headless ``js`` module. See ``_dom.py``."""
+
+from _dom import URL, File, Object, Uint8Array, document, window
+
+alert = window.alert
+confirm = window.confirm
+
+__all__ = [
+    "URL",
+    "File",
+    "Object",
+    "Uint8Array",
+    "alert",
+    "confirm",
+    "document",
+    "window",
+]
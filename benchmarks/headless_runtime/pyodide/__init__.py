@@ -0,0 +1 @@
+"""Headless ``pyodide`` package. See ``_dom.py``."""
@@ -0,0 +1,33 @@
+"""Headless ``pyodide.ffi`` module.
+
+Python objects are handed over to the headless browser objects as they are.
+"""
+
+
+class _PyBuffer:
+    def __init__(self, data: memoryview) -> None:
+        self.data = data
+
+    def release(self) -> None:
+        self.data.release()
+
+
+class _PyProxy:
+    def __init__(self, obj) -> None:
+        self._obj = obj
+
+    def getBuffer(self, type: str = "u8") -> _PyBuffer:
+        return _PyBuffer(memoryview(self._obj).cast("B"))
+
+    def destroy(self) -> None:
+        self._obj = None
+
+
+def create_proxy(obj) -> _PyProxy:
+    return _PyProxy(obj)
+
+
+def to_js(obj, dict_converter=None):
+    if dict_converter is not None and isinstance(obj, dict):
+        return dict_converter(obj.items())
+    return obj
@@ -0,0 +1,5 @@
+"""Headless ``pyscript`` module. See ``_dom.py``."""
+
+from _dom import document, when, window
+
+__all__ = ["document", "when", "window"]
@@ -0,0 +1,83 @@
+"""Benchmark the spreadsheet reader backends of the web application.
+
+Run from the repository root::
+
+    python benchmarks/reader_backends.py [--repeat 5] [--output results.csv]
+
+It records how fast each available backend parses each fixture and which
+backend ``excel_helpers.load_excel`` actually uses for the fixture.
+"""
+
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+DEFAULT_FIXTURE_DIR = REPOSITORY_ROOT / "tests" / "excel_examples"
+sys.path.insert(0, (REPOSITORY_ROOT / "app").as_posix())
+
+from excel_helpers import (  # noqa: E402
+    available_reader_backends,
+    read_spreadsheet,
+    spreadsheet_kind,
+)
+
+
+def benchmark_fixture(fixture: pathlib.Path, repeat: int) -> list[dict]:
+    kind = spreadsheet_kind(fixture)
+    try:
+        handled_by = read_spreadsheet(fixture)[1]
+    except Exception as e:
+        handled_by = f"failed ({type(e).__name__})"
+
+    results = []
+    for backend in available_reader_backends():
+        timings, n_rows, error = [], None, ""
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                n_rows = len(backend.read(fixture, kind or "xlsx"))
+            except Exception as e:
+                error = type(e).__name__
+                break
+            timings.append(time.perf_counter() - start)
+        results.append(
+            {
+                "fixture": fixture.name,
+                "backend": backend.name,
+                "handled": backend.name == handled_by,
+                "median_seconds": statistics.median(timings) if timings else None,
+                "rows": n_rows,
+                "error": error,
+            }
+        )
+    return results
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture-dir", type=pathlib.Path, default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    return parser
+
+
+def main() -> None:
+    args = build_argparser().parse_args()
+    fixtures = sorted(
+        path for path in args.fixture_dir.iterdir() if path.suffix in (".xlsx", ".xls")
+    )
+    results = pd.DataFrame(
+        [row for fixture in fixtures for row in benchmark_fixture(fixture, args.repeat)]
+    )
+    print(results.to_string(index=False))  # noqa: T201
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
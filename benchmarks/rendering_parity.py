@@ -0,0 +1,112 @@
+"""Check that the delivery format is rendered the same in parallel as in serial.
+
+The fixtures are merged by ``merge-orders``, ``krbiz.executables.merge_orders``,
+and the merged orders are rendered into the delivery format
+in one process and then in chunks by worker processes.
+Run from the repository root::
+
+    python benchmarks/rendering_parity.py [--scale 100] [--workers 2 4]
+
+``--scale`` copies the merged orders that many times
+with a unique order id per copy, to compare the throughput as well.
+Every number of ``--workers`` is checked with the adaptive chunk size
+and with a small chunk size that does not divide the number of orders.
+It exits with an error if any of the parallel results differs from the serial one.
+"""
+
+import argparse
+import logging
+import pathlib
+import sys
+import time
+
+import pandas as pd
+
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+DEFAULT_FIXTURE_DIR = REPOSITORY_ROOT / "tests" / "excel_examples"
+sys.path.insert(0, (REPOSITORY_ROOT / "src").as_posix())
+
+from krbiz._decryption import is_encrypted  # noqa: E402
+from krbiz._rendering import render_templates  # noqa: E402
+from krbiz.executables.merge_orders import (  # noqa: E402
+    VariableMappings,
+    get_order_delivery_config_path,
+    merge_orders,
+)
+
+_ORDER_ID = "order_id"
+_ODD_CHUNK_ROWS = 997
+
+
+def load_merged_orders(fixture_dir: pathlib.Path, scale: int) -> pd.DataFrame:
+    order_files = [
+        path
+        for path in sorted(fixture_dir.glob("*.xls*"))
+        if "confirmation" not in path.name and not is_encrypted(path)
+    ]
+    merged = merge_orders(
+        order_files,
+        VariableMappings.load(get_order_delivery_config_path()),
+        logging.getLogger(__name__),
+    )
+    copies = []
+    for i_copy in range(scale):
+        copy = merged.copy()
+        copy[_ORDER_ID] = copy[_ORDER_ID].astype(str) + f"-{i_copy}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _render(
+    merged: pd.DataFrame,
+    templates: dict[str, str],
+    max_workers: int,
+    chunk_rows: int | None = None,
+) -> tuple[pd.DataFrame, float]:
+    start = time.perf_counter()
+    rendered = render_templates(merged, templates, max_workers, chunk_rows)
+    return pd.DataFrame(rendered), time.perf_counter() - start
+
+
+def compare(merged: pd.DataFrame, workers: list[int]) -> list[str]:
+    delivery_info_headers = VariableMappings.load(
+        get_order_delivery_config_path()
+    ).delivery_info_headers
+    templates = {
+        col: str(template)
+        for col, template in delivery_info_headers.templates.iloc[0].items()
+    }
+    serial, seconds = _render(merged, templates, max_workers=1)
+    print(f"{len(merged)} orders, serial: {seconds:.3f} s")  # noqa: T201
+
+    differences = []
+    for n_workers in workers:
+        for chunk_rows in (None, _ODD_CHUNK_ROWS):
+            parallel, seconds = _render(merged, templates, n_workers, chunk_rows)
+            label = f"{n_workers} workers, {chunk_rows or 'adaptive'} rows per chunk"
+            print(f"{label}: {seconds:.3f} s")  # noqa: T201
+            try:
+                pd.testing.assert_frame_equal(serial, parallel)
+            except AssertionError as e:
+                differences.append(f"{label}: {e}")
+    return differences
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture-dir", type=pathlib.Path, default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    return parser
+
+
+def main() -> None:
+    args = build_argparser().parse_args()
+    merged = load_merged_orders(args.fixture_dir, args.scale)
+    if differences := compare(merged, args.workers):
+        sys.exit("\n".join(["Results differ:", *differences]))
+    print("Results are the same.")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Check that ``split-deliveries`` splits deliveries the same as the web application.
+
+Both the delivery split of the web application, ``app/split_delivery.py``,
+and the engine of ``split-deliveries``, ``krbiz._delivery_split``,
+get the same order frames and delivery confirmation
+loaded by the web application in ``benchmarks/headless_runtime``.
+Run from the repository root::
+
+    python benchmarks/split_deliveries_parity.py [--scale 100]
+
+``--scale`` copies the orders and the delivery confirmation that many times
+with a unique recipient name per copy, to compare the throughput as well.
+It exits with an error if any delivery report or the leftover rows differ.
+The app modules need Python 3.12 or newer.
+``tests/test_delivery_split.py`` checks the same semantics without them.
+"""
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+import pandas as pd
+from app_flows import (
+    _INVOCATION_DIR,
+    DEFAULT_DELIVERY_CONFIRMATION,
+    DEFAULT_FIXTURE_DIR,
+    REPOSITORY_ROOT,
+    _collect_order_files,
+    _dom,
+    _make_file_event,
+    order_file_io,
+    reset_app_state,
+    split_delivery,
+)
+
+sys.path.insert(0, (REPOSITORY_ROOT / "src").as_posix())
+
+from excel_helpers import load_excel
+
+from krbiz._delivery_split import (
+    DeliveryConfirmation,
+    OrderFile,
+    load_delivery_info_keys,
+    split_deliveries,
+)
+
+_RECIPIENT_NAME = "receipients_name"
+_DELIVERY_RECIPIENT_NAME = "수하인명"
+
+
+def _scale(df: pd.DataFrame, column: str, scale: int) -> pd.DataFrame:
+    copies = []
+    for i_copy in range(scale):
+        copy = df.copy()
+        if i_copy > 0:  # Keep the first copy as it is.
+            copy[column] = copy[column] + str(i_copy)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def load_inputs(
+    order_files: list[pathlib.Path], delivery_confirmation: pathlib.Path, scale: int
+) -> tuple[dict, split_delivery.DeliveryConfirmationFileSpec]:
+    reset_app_state()
+    files = [_dom.File([path.read_bytes()], path.name) for path in order_files]
+    asyncio.run(order_file_io.upload_order_file(_make_file_event(files)))
+    orders = split_delivery.collect_valid_orders()
+    for file_spec in orders.values():
+        recipient_header = file_spec.variable_mapping.variable_mapping[_RECIPIENT_NAME]
+        file_spec.data_frame = _scale(file_spec.data_frame, recipient_header, scale)
+    confirmation = split_delivery.DeliveryConfirmationFileSpec(
+        file_name=delivery_confirmation.name,
+        df=_scale(load_excel(delivery_confirmation), _DELIVERY_RECIPIENT_NAME, scale),
+    )
+    return orders, confirmation
+
+
+def compare(orders: dict, confirmation) -> list[str]:
+    start = time.perf_counter()
+    app_results = split_delivery.split_delivery_info_per_platform(orders, confirmation)
+    app_reports = {
+        platform: file_spec.data_frame.reset_index(drop=True)
+        for platform, file_spec in app_results.file_specs.items()
+    }
+    app_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cli_results = split_deliveries(
+        [
+            OrderFile(
+                name=order_name,
+                platform=file_spec.variable_mapping.platform,
+                data_frame=file_spec.data_frame,
+                platform_headers=file_spec.variable_mapping.variable_mapping,
+            )
+            for order_name, file_spec in orders.items()
+        ],
+        [DeliveryConfirmation(confirmation.file_name, confirmation.data_frame)],
+        load_delivery_info_keys(),
+    )
+    cli_seconds = time.perf_counter() - start
+
+    differences = []
+    if app_reports.keys() != cli_results.reports.keys():
+        differences.append(
+            f"Platforms: {list(app_reports)} != {list(cli_results.reports)}"
+        )
+    for platform in app_reports.keys() & cli_results.reports.keys():
+        try:
+            pd.testing.assert_frame_equal(
+                app_reports[platform], cli_results.reports[platform]
+            )
+        except AssertionError as e:  # noqa: PERF203
+            differences.append(f"{platform}: {e}")
+    try:
+        pd.testing.assert_frame_equal(
+            app_results.cannot_be_matched, cli_results.cannot_be_matched
+        )
+    except AssertionError as e:
+        differences.append(f"Leftovers: {e}")
+
+    num_rows = cli_results.num_order_rows + cli_results.num_delivery_rows
+    print(  # noqa: T201
+        f"{cli_results.num_order_rows} order rows, "
+        f"{cli_results.num_delivery_rows} delivery rows, "
+        f"{cli_results.num_matched} matched\n"
+        f"web application: {app_seconds:.3f} s ({num_rows / app_seconds:.0f} rows/s)\n"
+        f"split-deliveries: {cli_seconds:.3f} s ({num_rows / cli_seconds:.0f} rows/s)"
+    )
+    return differences
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture-dir", type=pathlib.Path, default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument(
+        "--delivery-confirmation",
+        type=pathlib.Path,
+        default=DEFAULT_DELIVERY_CONFIRMATION,
+    )
+    parser.add_argument("--scale", type=int, default=1)
+    return parser
+
+
+def main() -> None:
+    args = build_argparser().parse_args()
+    fixture_dir = _INVOCATION_DIR / args.fixture_dir
+    delivery_confirmation = _INVOCATION_DIR / args.delivery_confirmation
+    order_files = _collect_order_files(fixture_dir, delivery_confirmation)
+    orders, confirmation = load_inputs(order_files, delivery_confirmation, args.scale)
+    if differences := compare(orders, confirmation):
+        sys.exit("\n".join(["Results differ:", *differences]))
+    print("Results are the same.")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cache of the configuration workbooks compiled into json.
+
+Parsing a configuration workbook takes much longer than loading its json.
+The compiled json is kept under ``~/.krbiz/cache`` per workbook path
+and it is used only if the modification time and the size of the workbook
+are the same as when it was compiled.
+Otherwise the workbook is parsed again and the cache is replaced.
+
+The cache is only an optimization, so any problem with it,
+i.e. a read-only home directory or a broken cache file,
+falls back to parsing the workbook.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from collections.abc import Callable
+from typing import TypeVar
+
+CACHE_VERSION = 1
+"""Version of the compiled format. Caches of the other versions are ignored."""
+CACHE_DIR_ENV_VAR = "KRBIZ_CACHE_DIR"
+"""Environment variable to use a different cache directory."""
+
+_Config = TypeVar("_Config")
+_logger = logging.getLogger(__name__)
+
+
+def get_cache_dir() -> pathlib.Path:
+    if (cache_dir := os.environ.get(CACHE_DIR_ENV_VAR)) is not None:
+        return pathlib.Path(cache_dir)
+    from .configurations import DEFAULT_DIR
+
+    return DEFAULT_DIR / "cache"
+
+
+def _cache_file_path(source: pathlib.Path, kind: str) -> pathlib.Path:
+    path_hash = hashlib.sha256(str(source).encode()).hexdigest()[:16]
+    return get_cache_dir() / f"{kind}-{path_hash}.json"
+
+
+def _source_stamp(source: pathlib.Path) -> dict:
+    stat = source.stat()
+    return {
+        "version": CACHE_VERSION,
+        "source": str(source),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def _read_cache(cache_file: pathlib.Path, stamp: dict) -> dict | None:
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("stamp") != stamp:
+        return None
+    return cached.get("compiled")
+
+
+def _write_cache(cache_file: pathlib.Path, stamp: dict, compiled: dict) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Written to a temporary file first so that other runs never read a partial one.
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=cache_file.parent, suffix=".tmp", delete=False
+    ) as f:
+        json.dump({"stamp": stamp, "compiled": compiled}, f, ensure_ascii=False)
+    os.replace(f.name, cache_file)
+
+
+def load_compiled(
+    source: str | pathlib.Path,
+    kind: str,
+    parse: Callable[[pathlib.Path], _Config],
+    compile_config: Callable[[_Config], dict],
+    load_config: Callable[[dict], _Config],
+) -> _Config:
+    """Load the config of the ``source`` workbook from the cache if it is valid.
+
+    ``parse`` reads the workbook, ``compile_config`` turns the config into json
+    and ``load_config`` turns the json back into the config.
+    ``kind`` distinguishes the caches of different configs of the same workbook.
+    """
+    source = pathlib.Path(source).resolve()
+    stamp = _source_stamp(source)
+    try:
+        cache_file = _cache_file_path(source, kind)
+    except OSError as e:
+        _logger.debug("Config cache is not available: %s", e)
+        return parse(source)
+
+    if (compiled := _read_cache(cache_file, stamp)) is not None:
+        try:
+            return load_config(compiled)
+        except (KeyError, TypeError, ValueError) as e:
+            _logger.debug("Ignoring the broken config cache %s: %s", cache_file, e)
+
+    config = parse(source)
+    try:
+        _write_cache(cache_file, stamp, compile_config(config))
+    except OSError as e:
+        _logger.debug("Could not write the config cache %s: %s", cache_file, e)
+    return config
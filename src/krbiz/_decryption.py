@@ -0,0 +1,299 @@
+"""Non-interactive decryption of encrypted order files.
+
+Passwords are supplied up front, either per file name pattern or per platform,
+from an environment variable or from a file that only its owner can read.
+
+Example of the password file (json)::
+
+    {
+        "files": {"*스마트스토어*.xlsx": ["first-try", "second-try"]},
+        "platforms": {"Naver": "naver-password"}
+    }
+
+"""
+
+import contextlib
+import fnmatch
+import io
+import json
+import mmap
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import msoffcrypto
+
+PASSWORDS_ENV_VAR = "KRBIZ_ORDER_PASSWORDS"
+"""Environment variable that carries the password json."""
+
+
+def _as_password_list(passwords: str | list[str]) -> list[str]:
+    return [passwords] if isinstance(passwords, str) else list(passwords)
+
+
+def _check_owner_only_permission(file_path: pathlib.Path) -> None:
+    if os.name != "posix":
+        return  # File modes are not meaningful on other platforms.
+    if file_path.stat().st_mode & 0o077:
+        raise PermissionError(
+            f"{file_path} can be accessed by other users. "
+            f"Please run 'chmod 600 {file_path}' and try again."
+        )
+
+
+@dataclass
+class PasswordBook:
+    """Passwords to try per file name pattern and per platform."""
+
+    file_patterns: dict[str, list[str]] = field(default_factory=dict)
+    platforms: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, passwords: dict) -> "PasswordBook":
+        return cls(
+            file_patterns={
+                pattern: _as_password_list(pws)
+                for pattern, pws in passwords.get("files", {}).items()
+            },
+            platforms={
+                platform: _as_password_list(pws)
+                for platform, pws in passwords.get("platforms", {}).items()
+            },
+        )
+
+    @classmethod
+    def from_file(cls, file_path: str | pathlib.Path) -> "PasswordBook":
+        file_path = pathlib.Path(file_path)
+        _check_owner_only_permission(file_path)
+        return cls.from_dict(json.loads(file_path.read_text(encoding="utf-8")))
+
+    @classmethod
+    def from_env(cls) -> "PasswordBook":
+        return cls.from_dict(json.loads(os.environ.get(PASSWORDS_ENV_VAR, "{}")))
+
+    def update(self, other: "PasswordBook") -> None:
+        for pattern, passwords in other.file_patterns.items():
+            self.file_patterns.setdefault(pattern, []).extend(passwords)
+        for platform, passwords in other.platforms.items():
+            self.platforms.setdefault(platform, []).extend(passwords)
+
+    def candidates(self, file_path: str | pathlib.Path) -> list[str]:
+        """Passwords to try in order.
+
+        Passwords of the matching file name patterns come first,
+        then the platform passwords since the platform of an encrypted file
+        is not known before it is decrypted.
+        """
+        file_name = pathlib.Path(file_path).name
+        passwords = [
+            password
+            for pattern, pattern_passwords in self.file_patterns.items()
+            if fnmatch.fnmatch(file_name, pattern)
+            for password in pattern_passwords
+        ]
+        passwords.extend(
+            password
+            for platform_passwords in self.platforms.values()
+            for password in platform_passwords
+        )
+        return list(dict.fromkeys(passwords))  # Remove duplicates, keep the order.
+
+
+def is_encrypted(file_path: str | pathlib.Path) -> bool:
+    with open(file_path, "rb") as f:
+        try:
+            return bool(msoffcrypto.OfficeFile(f).is_encrypted())
+        except Exception:
+            return False  # i.e. csv files.
+
+
+class MappedFile(io.RawIOBase):
+    """Read-only file object over a memory map. Closing it closes the map.
+
+    Parsers read the mapped pages directly,
+    so the decrypted contents are not copied into the memory of the process
+    and the pages can be dropped by the operating system under memory pressure.
+    """
+
+    def __init__(self, mapped: mmap.mmap) -> None:
+        self._mapped = mapped
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        return self._mapped.read(None if size is None or size < 0 else size)
+
+    def readall(self) -> bytes:
+        return self._mapped.read()
+
+    def readinto(self, buffer) -> int:
+        data = self._mapped.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mapped.seek(offset, whence)
+        return self._mapped.tell()
+
+    def tell(self) -> int:
+        return self._mapped.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._mapped.close()
+        super().close()
+
+
+DecryptedFile = io.BytesIO | MappedFile
+
+
+def _map_file(file_obj) -> DecryptedFile:
+    file_obj.flush()
+    if os.fstat(file_obj.fileno()).st_size == 0:
+        return io.BytesIO()  # Empty files can not be mapped.
+    # The map keeps its own handle of the file, so the file can be closed.
+    return MappedFile(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def decrypt_to_mapped_file(
+    office_file: msoffcrypto.OfficeFile, spool_dir: pathlib.Path | None = None
+) -> DecryptedFile:
+    """Decrypt into an anonymous temporary file and map it into memory.
+
+    The temporary file has no name on POSIX
+    and it is deleted on close on Windows,
+    so the decrypted contents are gone as soon as the map is closed
+    or the process exits, whichever happens first.
+    """
+    with tempfile.TemporaryFile(dir=spool_dir) as f:
+        office_file.decrypt(f)
+        return _map_file(f)
+
+
+@contextlib.contextmanager
+def decryption_spool() -> Iterator[pathlib.Path]:
+    """Private directory for the decrypted files of the decryption workers.
+
+    Only the owner can access it and it is removed with all files in it at exit.
+    """
+    spool_dir = pathlib.Path(tempfile.mkdtemp(prefix="krbiz-decrypted-"))
+    try:
+        yield spool_dir
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def _open_spooled_file(spooled_path: str) -> DecryptedFile:
+    try:
+        with open(spooled_path, "rb") as f:
+            if os.name == "posix":
+                return _map_file(f)
+            # Files that are mapped can not be deleted on the other platforms.
+            return io.BytesIO(f.read())
+    finally:
+        # Mapped pages stay readable until the map is closed.
+        os.unlink(spooled_path)
+
+
+@dataclass
+class DecryptionResult:
+    file_path: pathlib.Path
+    decrypted: DecryptedFile | None
+    seconds: float
+    error: str | None = None
+
+
+def _decrypt_once(
+    office_file: msoffcrypto.OfficeFile, spool_dir: pathlib.Path | None
+) -> bytes | str:
+    if spool_dir is None:
+        decrypted = io.BytesIO()
+        office_file.decrypt(decrypted)
+        return decrypted.getvalue()
+    fd, spooled_path = tempfile.mkstemp(dir=spool_dir, suffix=".decrypted")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            office_file.decrypt(f)
+    except BaseException:
+        os.unlink(spooled_path)  # Partially decrypted contents are not left.
+        raise
+    return spooled_path
+
+
+def _decrypt_with_candidates(
+    file_path: pathlib.Path,
+    passwords: list[str],
+    spool_dir: pathlib.Path | None = None,
+) -> tuple[bytes | str | None, float, str | None]:
+    """Worker of the process pool.
+
+    Returns bytes since ``BytesIO`` is not picklable,
+    or the path of the decrypted file in the ``spool_dir`` if it is given.
+    """
+    start = time.perf_counter()
+    with open(file_path, "rb") as f:
+        office_file = msoffcrypto.OfficeFile(f)
+        for password in passwords:
+            try:
+                office_file.load_key(password=password, verify_password=True)
+                decrypted = _decrypt_once(office_file, spool_dir)
+            except Exception:  # noqa: S112
+                continue
+            return decrypted, time.perf_counter() - start, None
+    if not passwords:
+        error = "No password is configured for the file."
+    else:
+        error = f"None of the {len(passwords)} configured passwords worked."
+    return None, time.perf_counter() - start, error
+
+
+def decrypt_files(
+    file_paths: list[pathlib.Path],
+    password_book: PasswordBook,
+    max_workers: int | None = None,
+    spool_dir: pathlib.Path | None = None,
+) -> dict[pathlib.Path, DecryptionResult]:
+    """Decrypt the files in a process pool, trying the candidate passwords in order.
+
+    Failures are returned in the results instead of being raised
+    so that they can be reported all together at the end of a run.
+    If ``spool_dir`` is given, i.e. from ``decryption_spool``,
+    files are decrypted into it and returned as memory-mapped files
+    instead of being kept in memory.
+    Callers should close the decrypted files when they are done with them.
+    """
+    if not file_paths:
+        return {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            file_path: pool.submit(
+                _decrypt_with_candidates,
+                file_path,
+                password_book.candidates(file_path),
+                spool_dir,
+            )
+            for file_path in file_paths
+        }
+        results = {}
+        for file_path, future in futures.items():
+            decrypted, seconds, error = future.result()
+            if isinstance(decrypted, str):
+                decrypted = _open_spooled_file(decrypted)
+            elif decrypted is not None:
+                decrypted = io.BytesIO(decrypted)
+            results[file_path] = DecryptionResult(
+                file_path=file_path,
+                decrypted=decrypted,
+                seconds=seconds,
+                error=error,
+            )
+    return results
@@ -0,0 +1,373 @@
+"""Split delivery confirmations into delivery reports per platform.
+
+It is the batch version of the delivery split of the web application,
+``app/split_delivery.py``, and it matches the same rows:
+
+- An order row is matched to a delivery row only if the delivery row is
+  the only unmatched one with the same normalized key.
+- Order rows are matched in the order of the order files and their rows,
+  so the first order row of a key takes the delivery row.
+- Delivery confirmations are matched one by one,
+  each only against the order rows that are not matched by the previous ones.
+- Orders of the platforms without a delivery report setting are not matched.
+
+Unlike the web application, rows are matched and rendered column by column
+instead of row by row.
+"""
+
+import functools
+import json
+import pathlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from ._key_normalization import (
+    DEFAULT_NORMALIZATION_RULES,
+    NORMALIZATION_RULES,
+    build_match_keys,
+)
+from ._resources import COUPANG_DELIVERY_REPORT_FORM_PATH
+
+DEFAULT_DELIVERY_INFO_KEYS: dict[str, str | dict] = {
+    "수하인명": "receipients_name",
+    "상품명": "option_info",
+}
+"""Default keys of the web application, by delivery information header."""
+
+
+@dataclass(frozen=True)
+class DeliveryInfoKey:
+    unified_variable_name: str
+    """Unified variable name. i.e. receipients_name"""
+    delivery_info_header: str
+    """Header of the delivery information. i.e. 수하인명"""
+    normalization_rules: tuple[str, ...] = DEFAULT_NORMALIZATION_RULES
+    """Names of the normalization rules applied to both columns before matching."""
+
+
+def _config_value_to_key(delivery_header: str, value: str | dict) -> DeliveryInfoKey:
+    if isinstance(value, str):
+        return DeliveryInfoKey(
+            unified_variable_name=value, delivery_info_header=delivery_header
+        )
+    rules = tuple(value.get("normalization_rules", DEFAULT_NORMALIZATION_RULES))
+    if unknown_rules := [rule for rule in rules if rule not in NORMALIZATION_RULES]:
+        raise ValueError(f"Unknown normalization rules: {unknown_rules}")
+    return DeliveryInfoKey(
+        unified_variable_name=value["unified_variable_name"],
+        delivery_info_header=delivery_header,
+        normalization_rules=rules,
+    )
+
+
+def load_delivery_info_keys(
+    file_path: str | pathlib.Path | None = None,
+) -> tuple[DeliveryInfoKey, ...]:
+    """Load the keys from a json file in the same format as the web application.
+
+    The json object maps a delivery information header to a unified variable name,
+    or to an object with ``unified_variable_name`` and ``normalization_rules``.
+    The default keys of the web application are used if ``file_path`` is None.
+    """
+    if file_path is None:
+        config = DEFAULT_DELIVERY_INFO_KEYS
+    else:
+        config = json.loads(pathlib.Path(file_path).read_text(encoding="utf-8"))
+    return tuple(
+        _config_value_to_key(delivery_header, value)
+        for delivery_header, value in config.items()
+    )
+
+
+@dataclass
+class DeliveryReportMapping:
+    target: str  # Target column to be replaced.
+
+
+@dataclass
+class FromDeliveryConfirmation(DeliveryReportMapping):
+    column: str  # Column from delivery confirmation that needs to be replaced.
+
+
+@dataclass
+class FromOriginalOrderFile(DeliveryReportMapping):
+    column: str  # Column from order file that needs to be replaced with.
+
+
+@dataclass
+class HardcodedColumn(DeliveryReportMapping):
+    value: str  # Hardcoded value for a column.
+
+
+@dataclass
+class PlatformDeliveryReportSetting:
+    headers: tuple[str, ...]  # The order is very important.
+    mappings: dict[str, DeliveryReportMapping]
+    export_sheet_name: str | None = None
+    """Sheet name is important for some platforms.
+
+    i.e. Naver requires the excel sheet name to be ``발송처리``.
+    """
+
+    def render(self, orders: pd.DataFrame, deliveries: pd.DataFrame) -> pd.DataFrame:
+        """Render the report of the ``orders``.
+
+        ``deliveries`` has the matched delivery row of each order row
+        with the same index, and empty strings if there is no match.
+        """
+        columns: dict[str, pd.Series | str] = {}
+        for col in self.headers:
+            mapping = self.mappings.get(
+                col,
+                FromOriginalOrderFile(target=col, column=col),  # Always fall back
+            )
+            if isinstance(mapping, HardcodedColumn):
+                columns[col] = mapping.value
+                continue
+            if isinstance(mapping, FromOriginalOrderFile):
+                source = orders
+            elif isinstance(mapping, FromDeliveryConfirmation):
+                source = deliveries
+            else:
+                columns[col] = ""
+                continue
+            # Leave it empty if not found.
+            columns[col] = source[mapping.column] if mapping.column in source else ""
+        return pd.DataFrame(columns, index=orders.index, columns=list(self.headers))
+
+    def render_empty(self) -> pd.DataFrame:
+        # Leave empty row so that headers are rendered.
+        # If it is completely empty, headers are not rendered in the file.
+        return pd.DataFrame({col: [""] for col in self.headers})
+
+
+def load_report_setting_from_excel(
+    file_path: str | pathlib.Path,
+) -> PlatformDeliveryReportSetting:
+    """Load the setting from the first 3 rows of the report form.
+
+    The 1st row is rendered from the delivery confirmation,
+    the 2nd row is hard-coded and the 3rd row is rendered from the order file.
+    Columns without any setting are copied from the order file.
+    """
+    df = pd.read_excel(file_path, nrows=3, dtype=str).fillna("")
+    mappings: dict[str, DeliveryReportMapping] = {}
+    mapping_types = (FromDeliveryConfirmation, HardcodedColumn, FromOriginalOrderFile)
+    for (_, row), mapping_type in zip(df.iterrows(), mapping_types, strict=False):
+        for col in df.columns:
+            if (setting_value := row[col]) != "":
+                mappings[col] = mapping_type(col, setting_value)
+    for col in df.columns:
+        if col not in mappings:
+            mappings[col] = FromOriginalOrderFile(target=col, column=col)
+
+    return PlatformDeliveryReportSetting(headers=tuple(df.columns), mappings=mappings)
+
+
+@functools.cache
+def default_delivery_report_settings() -> dict[str, PlatformDeliveryReportSetting]:
+    """Delivery report settings of the web application per platform."""
+    return {
+        'Naver': PlatformDeliveryReportSetting(
+            headers=('상품주문번호', '배송방법', '택배사', '송장번호', '이름', '주소'),
+            mappings={
+                '상품주문번호': FromOriginalOrderFile(
+                    '상품주문번호', column='상품주문번호'
+                ),
+                '배송방법': HardcodedColumn('배송방법', value='택배'),
+                '택배사': HardcodedColumn('택배사', value='롯데택배'),
+                '송장번호': FromDeliveryConfirmation('송장번호', column='운송장번호'),
+                '이름': FromOriginalOrderFile('이름', column='수취인명'),
+                '주소': FromDeliveryConfirmation('주소', column='수하인기본주소'),
+            },
+            export_sheet_name="발송처리",
+        ),
+        'Gmarket': PlatformDeliveryReportSetting(
+            headers=('계정', '주문번호', '택배사', '송장번호', '수취인명'),
+            mappings={
+                '계정': FromOriginalOrderFile(target='계정', column='판매아이디'),
+                '주문번호': FromOriginalOrderFile(target='주문번호', column='주문번호'),
+                '택배사': HardcodedColumn('택배사', value='롯데택배'),
+                '송장번호': FromDeliveryConfirmation('송장번호', column='운송장번호'),
+                '수취인명': FromOriginalOrderFile('이름', column='수령인명'),
+            },
+        ),
+        'Coupang': load_report_setting_from_excel(COUPANG_DELIVERY_REPORT_FORM_PATH),
+    }
+
+
+@dataclass
+class OrderFile:
+    name: str
+    platform: str
+    data_frame: pd.DataFrame
+    """Order rows with the platform specific headers."""
+    platform_headers: dict[str, str]
+    """Platform specific header by unified variable name."""
+
+
+@dataclass
+class DeliveryConfirmation:
+    name: str
+    data_frame: pd.DataFrame
+
+
+@dataclass
+class DeliverySplitResults:
+    reports: dict[str, pd.DataFrame]
+    """Rendered delivery report per platform."""
+    export_sheet_names: dict[str, str | None]
+    cannot_be_matched: pd.DataFrame
+    """Delivery rows that could not be matched to any order row."""
+    num_order_rows: int = 0
+    num_delivery_rows: int = 0
+    num_matched: int = 0
+    skipped_platforms: list[str] = field(default_factory=list)
+    """Platforms of the orders that do not have any delivery report settings."""
+
+
+_ORDER_ROW_INDEX_NAMES = ["order", "row"]
+_EMPTY_ORDER_ROW_INDEX = pd.MultiIndex.from_tuples([], names=_ORDER_ROW_INDEX_NAMES)
+
+
+def _build_order_keys(
+    orders: list[OrderFile],
+    keys: tuple[DeliveryInfoKey, ...],
+    platforms: Iterable[str],
+) -> pd.Series:
+    """Normalized key of the order rows of the ``platforms``.
+
+    It is indexed by ``(position of the order file, row label)``
+    in the order that the rows are matched.
+    """
+    order_keys = {}
+    for i_order, order in enumerate(orders):
+        if order.platform not in platforms:
+            continue
+        columns_and_rules = []
+        for key in keys:
+            platform_header = order.platform_headers.get(key.unified_variable_name)
+            if not platform_header or platform_header not in order.data_frame:
+                raise ValueError(
+                    f"{order.name} does not have a column "
+                    f"for {key.unified_variable_name}."
+                )
+            columns_and_rules.append((platform_header, key.normalization_rules))
+        order_keys[i_order] = build_match_keys(order.data_frame, columns_and_rules)
+    if not order_keys:
+        return pd.Series([], dtype=object, index=_EMPTY_ORDER_ROW_INDEX)
+    return pd.concat(order_keys, names=_ORDER_ROW_INDEX_NAMES)
+
+
+def match_deliveries(
+    orders: list[OrderFile],
+    confirmations: list[DeliveryConfirmation],
+    keys: tuple[DeliveryInfoKey, ...],
+    platforms: Iterable[str],
+) -> tuple[pd.DataFrame, list[pd.DataFrame]]:
+    """Match the delivery rows to the order rows of the ``platforms``.
+
+    Returns the assignments and the unmatched delivery rows per confirmation.
+    The assignments are indexed by ``(position of the order file, row label)``
+    of the matched order rows and have the ``confirmation`` position
+    and the ``delivery_row`` label of the matched delivery rows.
+    """
+    order_keys = _build_order_keys(orders, keys, set(platforms))
+    unmatched = pd.Series(True, index=order_keys.index)
+    assignments = []
+    leftovers = []
+    for i_confirmation, confirmation in enumerate(confirmations):
+        delivery_keys = build_match_keys(
+            confirmation.data_frame,
+            ((key.delivery_info_header, key.normalization_rules) for key in keys),
+        )
+        # Only unique match is accepted.
+        unique_keys = delivery_keys[~delivery_keys.duplicated(keep=False)]
+        delivery_row_by_key = pd.Series(unique_keys.index, index=unique_keys.array)
+        candidates = order_keys[unmatched]
+        candidates = candidates[candidates.isin(delivery_row_by_key.index)]
+        # The first order row of a key takes the delivery row.
+        matched = candidates[~candidates.duplicated(keep="first")]
+        delivery_rows = delivery_row_by_key.loc[matched.array].array
+        assignments.append(
+            pd.DataFrame(
+                {"confirmation": i_confirmation, "delivery_row": delivery_rows},
+                index=matched.index,
+            )
+        )
+        unmatched.loc[matched.index] = False
+        leftovers.append(confirmation.data_frame.drop(delivery_rows))
+
+    if not assignments:
+        empty = pd.DataFrame(
+            columns=["confirmation", "delivery_row"], index=_EMPTY_ORDER_ROW_INDEX
+        )
+        return empty, leftovers
+    return pd.concat(assignments), leftovers
+
+
+def _align_deliveries(
+    order: pd.DataFrame,
+    assignments: pd.DataFrame,
+    confirmations: list[DeliveryConfirmation],
+) -> pd.DataFrame:
+    """Matched delivery row of each order row, empty strings if not matched."""
+    aligned = []
+    by_confirmation = assignments.groupby("confirmation").groups
+    for i_confirmation, order_rows in by_confirmation.items():
+        delivery_df = confirmations[i_confirmation].data_frame
+        delivery_rows = assignments.loc[order_rows, "delivery_row"].array
+        aligned.append(delivery_df.loc[delivery_rows].set_axis(order_rows))
+    if not aligned:
+        return pd.DataFrame(index=order.index)
+    return pd.concat(aligned).reindex(order.index).fillna("")
+
+
+def split_deliveries(
+    orders: list[OrderFile],
+    confirmations: list[DeliveryConfirmation],
+    keys: tuple[DeliveryInfoKey, ...],
+    report_settings: dict[str, PlatformDeliveryReportSetting] | None = None,
+) -> DeliverySplitResults:
+    """Match the ``confirmations`` to the ``orders`` and render the reports."""
+    report_settings = report_settings or default_delivery_report_settings()
+    assignments, leftovers = match_deliveries(
+        orders, confirmations, keys, report_settings
+    )
+
+    rendered: dict[str, list[pd.DataFrame]] = {}
+    for i_order, order in enumerate(orders):
+        if (report_setting := report_settings.get(order.platform)) is None:
+            continue  # Skip if report setting is not found.
+        order_assignments = assignments[
+            assignments.index.get_level_values("order") == i_order
+        ].droplevel("order")
+        deliveries = _align_deliveries(
+            order.data_frame, order_assignments, confirmations
+        )
+        rendered.setdefault(order.platform, []).append(
+            report_setting.render(order.data_frame, deliveries)
+        )
+
+    reports = {
+        platform: pd.concat(frames, ignore_index=True)
+        if sum(len(frame) for frame in frames) > 0
+        else report_settings[platform].render_empty()
+        for platform, frames in rendered.items()
+    }
+    return DeliverySplitResults(
+        reports=reports,
+        export_sheet_names={
+            platform: report_settings[platform].export_sheet_name
+            for platform in reports
+        },
+        cannot_be_matched=pd.concat(leftovers) if leftovers else pd.DataFrame(),
+        num_order_rows=sum(len(order.data_frame) for order in orders),
+        num_delivery_rows=sum(len(conf.data_frame) for conf in confirmations),
+        num_matched=len(assignments),
+        skipped_platforms=sorted(
+            {order.platform for order in orders} - set(report_settings)
+        ),
+    )
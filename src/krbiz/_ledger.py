@@ -0,0 +1,112 @@
+"""Ledger of the order files that are already processed.
+
+Files are identified by the hash of their contents,
+so a file that is downloaded again under a different name is still skipped
+and a file that is exported again with new orders is processed again.
+Hashes are reused while the path, size and modification time of a file
+stay the same, so that unchanged files are not read again on every run.
+
+Example of the ledger (json)::
+
+    {
+        "version": 1,
+        "files": {
+            "<sha256>": {
+                "path": "/home/.../orders.xlsx",
+                "size": 1024,
+                "mtime_ns": 1733117930000000000,
+                "processed_at": "2024-12-02T09:00:00+09:00"
+            }
+        }
+    }
+
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from dataclasses import dataclass, field
+
+LEDGER_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str | pathlib.Path) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_default_ledger_path() -> pathlib.Path:
+    from .configurations import DEFAULT_DIR
+
+    return DEFAULT_DIR / "processed-order-files.json"
+
+
+@dataclass
+class ProcessedFileLedger:
+    """Processed files by the hash of their contents."""
+
+    file_path: pathlib.Path
+    entries: dict[str, dict] = field(default_factory=dict)
+    _hash_by_stamp: dict[tuple[str, int, int], str] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        self._hash_by_stamp = {
+            (entry["path"], entry["size"], entry["mtime_ns"]): content_hash
+            for content_hash, entry in self.entries.items()
+        }
+
+    @classmethod
+    def load(cls, file_path: str | pathlib.Path) -> "ProcessedFileLedger":
+        file_path = pathlib.Path(file_path)
+        if not file_path.exists():
+            return cls(file_path=file_path)
+        ledger = json.loads(file_path.read_text(encoding="utf-8"))
+        if ledger.get("version") != LEDGER_VERSION:
+            raise ValueError(
+                f"{file_path} is not a ledger of version {LEDGER_VERSION}. "
+                "Please move it away to start a new ledger."
+            )
+        return cls(file_path=file_path, entries=ledger["files"])
+
+    def content_hash(self, file_path: pathlib.Path) -> str:
+        """Hash of the file, reused if the file did not change since it was hashed."""
+        stat = file_path.stat()
+        stamp = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if (content_hash := self._hash_by_stamp.get(stamp)) is None:
+            content_hash = self._hash_by_stamp[stamp] = hash_file(file_path)
+        return content_hash
+
+    def is_processed(self, file_path: pathlib.Path) -> bool:
+        return self.content_hash(file_path) in self.entries
+
+    def mark_processed(self, file_path: pathlib.Path) -> None:
+        stat = file_path.stat()
+        self.entries[self.content_hash(file_path)] = {
+            "path": str(file_path.resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "processed_at": datetime.datetime.now().astimezone().isoformat(),
+        }
+
+    def save(self) -> None:
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first so that a failed run never breaks it.
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.file_path.parent, delete=False
+        ) as f:
+            json.dump(
+                {"version": LEDGER_VERSION, "files": self.entries},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        os.replace(f.name, self.file_path)
@@ -1,10 +1,15 @@
 import logging
 
 
-def build_logger() -> logging.Logger:
+def build_logger(level: str = "INFO", stderr: bool = False) -> logging.Logger:
+    import rich.console
     import rich.logging
 
     logger = logging.getLogger("merge-oders")
-    logger.addHandler(rich.logging.RichHandler(level="DEBUG"))
-    logger.setLevel("DEBUG")
+    logger.addHandler(
+        rich.logging.RichHandler(
+            level=level, console=rich.console.Console(stderr=stderr)
+        )
+    )
+    logger.setLevel(level)
     return logger
@@ -0,0 +1,71 @@
+"""Machine readable summary of a ``merge-orders`` run.
+
+The manifest is meant to be scraped by monitoring, i.e. to alert on slow or
+failed runs, so it only carries numbers and short messages, never order data.
+"""
+
+import contextlib
+import datetime
+import json
+import pathlib
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+
+
+@contextlib.contextmanager
+def _measure(timings: dict[str, float], stage: str) -> Iterator[None]:
+    """Accumulate the elapsed seconds of the ``stage`` in ``timings``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+@dataclass
+class FileRecord:
+    """Processing record of one input file."""
+
+    path: str
+    size_bytes: int
+    platform: str | None = None
+    header_row: int | None = None
+    rows: int | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    """Seconds spent per stage, i.e. ``decrypt``, ``parse`` and ``translate``."""
+    error: str | None = None
+
+    def measure(self, stage: str) -> contextlib.AbstractContextManager[None]:
+        return _measure(self.timings, stage)
+
+
+@dataclass
+class RunManifest:
+    """Processing records of all input files and the total timings of a run."""
+
+    started_at: str = field(
+        default_factory=lambda: datetime.datetime.now().astimezone().isoformat()
+    )
+    files: list[FileRecord] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+    """Seconds spent per stage of the whole run, i.e. ``render`` and ``export``."""
+
+    def measure(self, stage: str) -> contextlib.AbstractContextManager[None]:
+        return _measure(self.timings, stage)
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "totals": {
+                "files": len(self.files),
+                "failed_files": sum(record.error is not None for record in self.files),
+                "rows": sum(record.rows or 0 for record in self.files),
+                "bytes": sum(record.size_bytes for record in self.files),
+            },
+        }
+
+    def save(self, file_path: str | pathlib.Path) -> None:
+        pathlib.Path(file_path).write_text(
+            json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
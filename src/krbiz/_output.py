@@ -0,0 +1,144 @@
+"""Writers of the ``merge-orders`` outputs.
+
+Text formats are written chunk by chunk so that only one chunk
+is serialized in memory at a time.
+``-`` as the output path means the standard output.
+"""
+
+import contextlib
+import io
+import pathlib
+import sys
+from collections.abc import Iterator
+from typing import IO
+
+import pandas as pd
+
+STDOUT = "-"
+OUTPUT_FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+CHUNK_ROWS = 10_000
+"""Number of rows serialized at a time for the streaming formats."""
+CSV_FILE_ENCODING = "utf-8-sig"
+"""Encoding of csv files. Byte order mark lets Excel read Korean correctly."""
+
+
+def infer_output_format(output: str) -> str:
+    """Infer the format from the suffix of the ``output``, ``xlsx`` if unknown."""
+    suffix = pathlib.Path(output).suffix.lower().lstrip(".")
+    return suffix if suffix in OUTPUT_FORMATS else "xlsx"
+
+
+def _iter_chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start : start + chunk_rows]
+
+
+@contextlib.contextmanager
+def _open_text(output: str, encoding: str) -> Iterator[IO[str]]:
+    if output == STDOUT:
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with open(output, "w", encoding=encoding, newline="") as f:
+            yield f
+
+
+@contextlib.contextmanager
+def _open_binary(output: str) -> Iterator[IO[bytes]]:
+    if output == STDOUT:
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+    else:
+        with open(output, "wb") as f:
+            yield f
+
+
+def write_csv(df: pd.DataFrame, output: str, chunk_rows: int = CHUNK_ROWS) -> None:
+    # The standard output is usually piped to another program, so no byte order mark.
+    encoding = "utf-8" if output == STDOUT else CSV_FILE_ENCODING
+    with _open_text(output, encoding) as f:
+        f.write(",".join(_quote_csv_header(col) for col in df.columns) + "\n")
+        for chunk in _iter_chunks(df, chunk_rows):
+            chunk.to_csv(f, header=False, index=False, lineterminator="\n")
+
+
+def _quote_csv_header(col: object) -> str:
+    text = str(col)
+    if any(char in text for char in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def write_jsonl(df: pd.DataFrame, output: str, chunk_rows: int = CHUNK_ROWS) -> None:
+    with _open_text(output, "utf-8") as f:
+        for chunk in _iter_chunks(df, chunk_rows):
+            # Each record, including the last one, ends with a newline.
+            f.write(chunk.to_json(orient="records", lines=True, force_ascii=False))
+
+
+def write_parquet(df: pd.DataFrame, output: str, chunk_rows: int = CHUNK_ROWS) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet output requires pyarrow. Please install it: pip install pyarrow"
+        ) from e
+
+    # Every column is written as string so that chunks always have the same schema.
+    df = df.astype(str)
+    schema = pa.schema([(str(col), pa.string()) for col in df.columns])
+    with _open_binary(output) as f, pq.ParquetWriter(f, schema) as writer:
+        for chunk in _iter_chunks(df, chunk_rows):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
+
+
+def _adjust_column_width(sheet, ref_df: pd.DataFrame) -> None:
+    for i_col, col in enumerate(ref_df.columns):
+        max_length = max(
+            int(ref_df[col].astype(str).map(len).max()) if len(ref_df) > 0 else 0,
+            len(col),
+        )
+        sheet.set_column(i_col, i_col, min(max_length * 2 + 1, 50))
+
+
+def export_excel(
+    df: pd.DataFrame,
+    output_file_path: pathlib.Path | IO[bytes],
+    pretty: bool = True,
+    sheet_name: str | None = None,
+) -> None:
+    with pd.ExcelWriter(output_file_path, engine="xlsxwriter") as writer:
+        df.to_excel(excel_writer=writer, index=False, sheet_name=sheet_name or "Sheet1")
+        if pretty:
+            for sheet in writer.sheets.values():
+                _adjust_column_width(sheet, df)
+
+
+def write_xlsx(df: pd.DataFrame, output: str) -> None:
+    if output != STDOUT:
+        export_excel(df, pathlib.Path(output))
+        return
+    # xlsx is a zip archive that can not be written to a stream that is not seekable.
+    buffer = io.BytesIO()
+    export_excel(df, buffer)
+    with _open_binary(output) as f:
+        f.write(buffer.getbuffer())
+
+
+def write_output(df: pd.DataFrame, output: str, output_format: str) -> None:
+    """Write ``df`` to the ``output`` path, or the standard output if ``-``."""
+    if output_format == "csv":
+        write_csv(df, output)
+    elif output_format == "jsonl":
+        write_jsonl(df, output)
+    elif output_format == "parquet":
+        write_parquet(df, output)
+    elif output_format == "xlsx":
+        write_xlsx(df, output)
+    else:
+        raise ValueError(
+            f"Unknown output format: {output_format}. Choose from {OUTPUT_FORMATS}."
+        )
@@ -0,0 +1,133 @@
+"""Rendering of the merged orders into the delivery information templates.
+
+A template is a text with the order columns as variables,
+i.e. ``"{receipients_name} ({order_id})"``.
+Each template is compiled once into its literal texts and variable names
+and the orders are rendered column by column instead of cell by cell.
+
+Big merges are split into chunks and rendered in a process pool.
+Each worker compiles the templates once when it starts
+and the rendered chunks are put back together in the order of the chunks,
+so the result is the same as rendering all orders in one go.
+"""
+
+import math
+import os
+import re
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PARALLEL_MIN_ROWS = 200_000
+"""Orders fewer than this are rendered in the process unless workers are given,
+since starting the workers takes longer than rendering them."""
+MIN_CHUNK_ROWS = 10_000
+"""Chunks smaller than this spend more time on pickling than on rendering."""
+CHUNKS_PER_WORKER = 4
+"""Chunks per worker, so that a slow chunk does not keep the other workers idle."""
+
+CompiledTemplate = tuple[str, ...]
+# Literal texts at the even positions and variable names at the odd positions,
+# i.e. ("Dear ", "name", "!") for "Dear {name}!".
+
+_worker_templates: dict[str, CompiledTemplate] = {}
+# Compiled templates of the worker process, set by ``_initialize_worker``.
+
+
+def compile_template(template: str, variables: Iterable[str]) -> CompiledTemplate:
+    """Split the ``template`` into literal texts and the ``variables`` in it.
+
+    Braces that do not enclose any of the ``variables`` are kept as they are.
+    """
+    if not (variables := list(variables)):
+        return (template,)
+    pattern = "|".join(re.escape(variable) for variable in variables)
+    return tuple(re.split(rf"\{{({pattern})\}}", template))
+
+
+def compile_templates(
+    templates: dict[str, str], variables: Iterable[str]
+) -> dict[str, CompiledTemplate]:
+    variables = tuple(variables)
+    return {
+        column: compile_template(template, variables)
+        for column, template in templates.items()
+    }
+
+
+def render_compiled(
+    order_info: pd.DataFrame, compiled_templates: dict[str, CompiledTemplate]
+) -> dict[str, np.ndarray]:
+    """Render each template for all rows of the ``order_info`` at once."""
+    n_rows = len(order_info)
+    as_text: dict[str, np.ndarray] = {}  # Each column is converted only once.
+
+    def _text_column(variable: str) -> np.ndarray:
+        if variable not in as_text:
+            as_text[variable] = order_info[variable].map(str).to_numpy(dtype=object)
+        return as_text[variable]
+
+    rendered = {}
+    for column, parts in compiled_templates.items():
+        values = np.full(n_rows, parts[0], dtype=object)
+        for i_part in range(1, len(parts), 2):
+            values = values + _text_column(parts[i_part]) + parts[i_part + 1]
+        rendered[column] = values
+    return rendered
+
+
+def _initialize_worker(templates: dict[str, str], variables: tuple[str, ...]) -> None:
+    _worker_templates.clear()
+    _worker_templates.update(compile_templates(templates, variables))
+
+
+def _render_chunk(chunk: pd.DataFrame) -> dict[str, np.ndarray]:
+    return render_compiled(chunk, _worker_templates)
+
+
+def adaptive_chunk_rows(n_rows: int, n_workers: int) -> int:
+    """Rows per chunk to give every worker a few chunks of a reasonable size."""
+    return max(MIN_CHUNK_ROWS, math.ceil(n_rows / (n_workers * CHUNKS_PER_WORKER)))
+
+
+def render_templates(
+    order_info: pd.DataFrame,
+    templates: dict[str, str],
+    max_workers: int | None = None,
+    chunk_rows: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Render the ``templates`` per column for every row of the ``order_info``.
+
+    ``max_workers`` is the number of worker processes.
+    If it is not given, all cpus are used but only for ``PARALLEL_MIN_ROWS`` or more.
+    ``chunk_rows`` is the number of rows per chunk,
+    ``adaptive_chunk_rows`` of the number of rows and workers if not given.
+    """
+    variables = tuple(order_info.columns)
+    n_workers = max_workers or os.cpu_count() or 1
+    chunk_rows = chunk_rows or adaptive_chunk_rows(len(order_info), n_workers)
+    n_chunks = math.ceil(len(order_info) / chunk_rows)
+    if (
+        n_workers == 1
+        or n_chunks <= 1
+        or (max_workers is None and len(order_info) < PARALLEL_MIN_ROWS)
+    ):
+        return render_compiled(order_info, compile_templates(templates, variables))
+
+    chunks = (
+        order_info.iloc[start : start + chunk_rows]
+        for start in range(0, len(order_info), chunk_rows)
+    )
+    with ProcessPoolExecutor(
+        max_workers=min(n_workers, n_chunks),
+        initializer=_initialize_worker,
+        initargs=(templates, variables),
+    ) as pool:
+        # ``map`` returns the rendered chunks in the order of the chunks.
+        rendered_chunks = list(pool.map(_render_chunk, chunks))
+    return {
+        column: np.concatenate([rendered[column] for rendered in rendered_chunks])
+        for column in templates
+    }
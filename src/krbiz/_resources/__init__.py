@@ -17,16 +17,23 @@ import pandas as pd
 
 
 def load_excel_file(
-    file_path: str | pathlib.Path, header_row: int = 0, password: str | None = None
+    file_path: str | pathlib.Path,
+    header_row: int = 0,
+    password: str | None = None,
+    decrypt_to_disk: bool = False,
 ) -> pd.DataFrame:
     if password is None:
         return pd.read_excel(file_path, header=header_row)
     else:
-        decrypted = io.BytesIO()
+        from .._decryption import decrypt_to_mapped_file
 
         with open(file_path, "rb") as f:
             file = msoffcrypto.OfficeFile(f)
             file.load_key(password=password)
+            if decrypt_to_disk:
+                with decrypt_to_mapped_file(file) as decrypted:
+                    return pd.read_excel(decrypted, header=header_row)
+            decrypted = io.BytesIO()
             file.decrypt(decrypted)
             return pd.read_excel(decrypted, header=header_row)
 
@@ -41,3 +48,6 @@ def save_excel_file(
 ORDER_DELIVERY_CONFIG_TEMPLATE_PATH = (
     pathlib.Path(__file__).parent / "_order_delivery_config_template.xlsx"
 )
+COUPANG_DELIVERY_REPORT_FORM_PATH = (
+    pathlib.Path(__file__).parent / "_default_coupang_delivery_report_form.xlsx"
+)
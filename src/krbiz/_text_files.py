@@ -0,0 +1,65 @@
+"""Loading of csv/tsv order files.
+
+Korean platforms export text files in utf-8 or in cp949/euc-kr,
+so the encoding is detected from a sample of the file.
+The encodings and the chunking are the same as the ones of the web application,
+``app/excel_helpers.py``, so that both read the same rows.
+Please keep them in sync.
+"""
+
+import codecs
+import importlib.util
+import os
+import pathlib
+
+import pandas as pd
+
+from ._decryption import DecryptedFile
+
+TEXT_FILE_SUFFIXES = (".csv", ".tsv")
+TEXT_ENCODING_CANDIDATES = ("utf-8-sig", "cp949", "euc-kr")
+"""Encodings of csv/tsv files to try in order."""
+_TEXT_SAMPLE_SIZE = 64 * 1024
+_TEXT_CHUNK_THRESHOLD = 32 * 1024 * 1024
+"""Text files bigger than this are parsed chunk by chunk."""
+_TEXT_CHUNK_ROWS = 50_000
+
+
+def is_text_file(file_path: str | pathlib.Path | DecryptedFile) -> bool:
+    if not isinstance(file_path, str | pathlib.Path):
+        return False  # Only decrypted workbooks are passed as file objects.
+    return pathlib.Path(file_path).suffix.lower() in TEXT_FILE_SUFFIXES
+
+
+def detect_text_encoding(sample: bytes) -> str:
+    for encoding in TEXT_ENCODING_CANDIDATES:
+        try:
+            # Incremental decoder allows the sample to end in the middle of a letter.
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:  # noqa: PERF203
+            ...
+        else:
+            return encoding
+    raise ValueError(f"Could not decode the text file as {TEXT_ENCODING_CANDIDATES}.")
+
+
+def load_text_file(file_path: str | pathlib.Path, header_row: int = 0) -> pd.DataFrame:
+    """Load csv/tsv file in the same shape as ``load_excel_file``."""
+    with open(file_path, "rb") as f:
+        sample = f.read(_TEXT_SAMPLE_SIZE)
+    chunked = os.path.getsize(file_path) > _TEXT_CHUNK_THRESHOLD
+    # pyarrow engine is the fastest but does not support ``chunksize``.
+    use_pyarrow = not chunked and importlib.util.find_spec("pyarrow") is not None
+    parsed = pd.read_csv(
+        file_path,
+        sep="\t" if pathlib.Path(file_path).suffix.lower() == ".tsv" else ",",
+        header=header_row,
+        dtype=str,
+        encoding=detect_text_encoding(sample),
+        engine="pyarrow" if use_pyarrow else "c",
+        skip_blank_lines=False,  # Header row is counted the same way as in workbooks.
+        chunksize=_TEXT_CHUNK_ROWS if chunked else None,
+    )
+    if chunked:
+        return pd.concat([chunk.dropna(how='all') for chunk in parsed]).fillna("")
+    return parsed.dropna(how='all').fillna("")
@@ -2,15 +2,38 @@ import argparse
 import datetime
 import io
 import logging
+import math
 import os
 import pathlib
-from dataclasses import dataclass
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
 
 import msoffcrypto
 import pandas as pd
-import xlrd
 
+from .._config_cache import load_compiled
+from .._decryption import (
+    PASSWORDS_ENV_VAR,
+    DecryptedFile,
+    DecryptionResult,
+    PasswordBook,
+    decrypt_files,
+    decrypt_to_mapped_file,
+    decryption_spool,
+    is_encrypted,
+)
+from .._ledger import ProcessedFileLedger, get_default_ledger_path
+from .._manifest import FileRecord, RunManifest
+from .._output import (
+    OUTPUT_FORMATS,
+    STDOUT,
+    export_excel,  # noqa: F401 - Kept importable from here.
+    infer_output_format,
+    write_output,
+)
+from .._rendering import PARALLEL_MIN_ROWS, render_templates
 from .._resources import ORDER_DELIVERY_CONFIG_TEMPLATE_PATH
+from .._text_files import TEXT_FILE_SUFFIXES, is_text_file, load_text_file
 
 ORDER_DELIVERY_CONFIG_FILE_NAME = "order_delivery_config.xlsx"
 ORDER_DELIVERY_CONFIG_FILE_PATH = ORDER_DELIVERY_CONFIG_TEMPLATE_PATH
@@ -25,16 +48,6 @@ class PlatformHeaderVariableMap:
     variable_mapping: dict[str, str]
 
 
-def _replace_single_variable(text: str, variable: str, value: str) -> str:
-    return text.replace("{" + variable + "}", value)
-
-
-def _render_variable(text: str, variable_mapping: dict[str, str]) -> str:
-    for variable, value in variable_mapping.items():
-        text = _replace_single_variable(text, variable, value)
-    return text
-
-
 @dataclass
 class DeliveryInfoSchema:
     """Delivery information schema."""
@@ -44,7 +57,7 @@ class DeliveryInfoSchema:
 
     @classmethod
     def from_excel(
-        cls, file_path: str | pathlib.Path, sheet_name: str
+        cls, file_path: str | pathlib.Path | pd.ExcelFile, sheet_name: str
     ) -> "DeliveryInfoSchema":
         return cls(
             delivery_agency=sheet_name,
@@ -53,21 +66,26 @@ class DeliveryInfoSchema:
             ),
         )
 
-    def order_info_to_delivery_info(self, order_info: pd.DataFrame) -> pd.DataFrame:
-        new_df = pd.concat(
-            [self.templates.copy(deep=True)] * len(order_info), ignore_index=True
+    def order_info_to_delivery_info(
+        self, order_info: pd.DataFrame, max_workers: int | None = None
+    ) -> pd.DataFrame:
+        """Render the templates for each order.
+
+        Big merges are rendered in chunks by ``max_workers`` processes.
+        See ``krbiz._rendering.render_templates`` for details.
+        """
+        if len(self.templates) != 1:
+            raise ValueError(
+                f"Delivery information schema of {self.delivery_agency} "
+                f"should have exactly one row of templates, not {len(self.templates)}."
+            )
+        templates = {
+            col: str(template) for col, template in self.templates.iloc[0].items()
+        }
+        return pd.DataFrame(
+            render_templates(order_info, templates, max_workers),
+            columns=self.templates.columns,
         )
-        for i_new_df_row in range(len(new_df)):
-            variable_mapping = {
-                col: str(order_info.at[i_new_df_row, col]) for col in order_info.columns
-            }
-            for new_df_col in new_df.columns:
-                new_df.at[i_new_df_row, new_df_col] = _render_variable(
-                    new_df.at[i_new_df_row, new_df_col],
-                    variable_mapping,
-                )
-
-        return new_df
 
 
 @dataclass
@@ -89,24 +107,69 @@ class VariableMappings:
 
     @classmethod
     def from_excel(cls, file_path: str | pathlib.Path) -> "VariableMappings":
-        mapping_df = pd.read_excel(
-            file_path, sheet_name="variable_mapping", header=0
-        ).fillna("")
+        # The workbook is opened only once for all the sheets.
+        with pd.ExcelFile(file_path) as excel_file:
+            mapping_df = pd.read_excel(
+                excel_file, sheet_name="variable_mapping", header=0
+            ).fillna("")
+            delivery_info_headers = DeliveryInfoSchema.from_excel(
+                excel_file, str(excel_file.sheet_names[1])
+            )
 
+        variable_columns = mapping_df.columns[2:]
         return cls(
             platform_header_variable_maps=[
                 PlatformHeaderVariableMap(
                     platform=row["Platform Name"],
-                    header=row["Header Row"],
-                    variable_mapping={col: row[col] for col in mapping_df.columns[2:]},
+                    header=int(row["Header Row"]),
+                    variable_mapping={col: row[col] for col in variable_columns},
                 )
-                for _, row in mapping_df.iterrows()
+                for row in mapping_df.to_dict(orient="records")
+            ],
+            delivery_info_headers=delivery_info_headers,
+        )
+
+    def to_dict(self) -> dict:
+        templates = self.delivery_info_headers.templates
+        return {
+            "platform_header_variable_maps": [
+                asdict(mapping) for mapping in self.platform_header_variable_maps
+            ],
+            "delivery_info_headers": {
+                "delivery_agency": self.delivery_info_headers.delivery_agency,
+                "columns": templates.columns.tolist(),
+                "rows": templates.to_numpy().tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, compiled: dict) -> "VariableMappings":
+        delivery_info_headers = compiled["delivery_info_headers"]
+        return cls(
+            platform_header_variable_maps=[
+                PlatformHeaderVariableMap(**mapping)
+                for mapping in compiled["platform_header_variable_maps"]
             ],
-            delivery_info_headers=DeliveryInfoSchema.from_excel(
-                file_path, str(pd.ExcelFile(file_path).sheet_names[1])
+            delivery_info_headers=DeliveryInfoSchema(
+                delivery_agency=delivery_info_headers["delivery_agency"],
+                templates=pd.DataFrame(
+                    delivery_info_headers["rows"],
+                    columns=delivery_info_headers["columns"],
+                ),
             ),
         )
 
+    @classmethod
+    def load(cls, file_path: str | pathlib.Path) -> "VariableMappings":
+        """Load the mappings from the compiled cache, or from the workbook."""
+        return load_compiled(
+            file_path,
+            "variable-mappings",
+            parse=cls.from_excel,
+            compile_config=cls.to_dict,
+            load_config=cls.from_dict,
+        )
+
 
 def get_order_delivery_config_path() -> pathlib.Path:
     return ORDER_DELIVERY_CONFIG_FILE_PATH
@@ -129,56 +192,231 @@ def _build_default_download_dir() -> pathlib.Path:
     return working_dir / today_directory
 
 
-def build_argparser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser()
+def add_order_file_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments to collect, decrypt and log the order files."""
     default_input_dir = _build_default_download_dir().as_posix()
     parser.add_argument(
         "--input-dir",
         dest="input_dir",
-        help="Directory path that contains all the devliery excel files.\n"
+        help="Directory path that contains all the devliery excel or csv/tsv files.\n"
         "Default is '{YY-mm-dd}-orders' in Downloads directory.\n"
         f"{default_input_dir}.",
         default=default_input_dir,
         type=str,
     )
     parser.add_argument(
-        "--output", help="Output file path.", type=str, default="merged.xlsx"
+        "--all",
+        help="Process all the files in the input directory. "
+        "If not, it will only process files that were modified today.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--since",
+        help="Only process files modified on or after this date, i.e. 2024-12-01.",
+        type=datetime.date.fromisoformat,
+        default=None,
     )
     parser.add_argument(
-        "--all",
-        help="Merge all the files in the input directory. "
-        "If not, it will only merge files that were created today.",
+        "--until",
+        help="Only process files modified on or before this date, i.e. 2024-12-31.",
+        type=datetime.date.fromisoformat,
+        default=None,
+    )
+    parser.add_argument(
+        "--recursive",
+        help="Collect files in the subdirectories of the input directory as well.",
+        action="store_true",
+        default=False,
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "--quiet",
+        help="Only log warnings and errors.",
         action="store_true",
         default=False,
     )
+    verbosity.add_argument(
+        "--verbose",
+        help="Log debugging information.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--passwords-file",
+        dest="passwords_file",
+        help="Json file of passwords per file name pattern or platform "
+        "to decrypt encrypted order files. Only its owner should be able to read it. "
+        f"Passwords can also be given as json in '{PASSWORDS_ENV_VAR}' variable.",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--ask-passwords",
+        dest="ask_passwords",
+        help="Ask passwords of encrypted files that do not have any passwords "
+        "configured before processing the files.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--decrypt-to-disk",
+        dest="decrypt_to_disk",
+        help="Decrypt encrypted files into private temporary files "
+        "and read them through memory maps instead of keeping them in memory. "
+        "The temporary files are deleted as soon as they are mapped.",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--decrypt-workers",
+        dest="decrypt_workers",
+        help="Number of processes to decrypt encrypted files. Default is cpu count.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--manifest",
+        help="File path to write a json manifest of the run, "
+        "i.e. sizes, platforms, row counts, timings and errors of each file.",
+        type=str,
+        default=None,
+    )
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    add_order_file_arguments(parser)
+    parser.add_argument(
+        "--output",
+        help="Output file path of the orders in the delivery format. "
+        f"'{STDOUT}' writes it to the standard output.",
+        type=str,
+        default="merged.xlsx",
+    )
+    parser.add_argument(
+        "--merged-output",
+        dest="merged_output",
+        help="Output file path of the merged orders before rendering them "
+        f"in the delivery format. '{STDOUT}' writes it to the standard output. "
+        "Not written if not given.",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        help="Format of the outputs. "
+        "Default is inferred from the suffix of each output file path, "
+        "or xlsx if it is not known. csv and jsonl are written in chunks "
+        "and parquet needs pyarrow to be installed.",
+        choices=OUTPUT_FORMATS,
+        default=None,
+    )
+    parser.add_argument(
+        "--render-workers",
+        dest="render_workers",
+        help="Number of processes to render big merges in the delivery format. "
+        f"Default is cpu count for {PARALLEL_MIN_ROWS} or more orders, "
+        "otherwise they are rendered in one process.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--ledger",
+        help="Skip the order files that are already merged by the previous runs "
+        "and add the newly merged ones to the ledger after the run. "
+        "Files are identified by their contents, not by their names. "
+        f"Default ledger is {get_default_ledger_path()}.",
+        nargs="?",
+        const=get_default_ledger_path(),
+        default=None,
+        type=pathlib.Path,
+    )
     return parser
 
 
+SPREADSHEET_FILE_SUFFIXES = (".xlsx", ".xls")
+
+
+def _day_start_timestamp(day: datetime.date) -> float:
+    return datetime.datetime.combine(day, datetime.time.min).astimezone().timestamp()
+
+
+def _iter_candidate_files(
+    dir_path: pathlib.Path, recursive: bool
+) -> Iterator[os.DirEntry]:
+    suffixes = (*SPREADSHEET_FILE_SUFFIXES, *TEXT_FILE_SUFFIXES)
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.name.startswith(("~", ".")):
+                continue  # Lock files of excel and hidden files.
+            if entry.is_dir():
+                if recursive:
+                    yield from _iter_candidate_files(pathlib.Path(entry.path), True)
+            elif pathlib.Path(entry.name).suffix.lower() in suffixes:
+                yield entry
+
+
 def collect_files(
-    input_dir: str | pathlib.Path, only_today: bool = True
+    input_dir: str | pathlib.Path,
+    only_today: bool = True,
+    *,
+    since: datetime.date | None = None,
+    until: datetime.date | None = None,
+    recursive: bool = False,
 ) -> list[pathlib.Path]:
-    dir_path = pathlib.Path(input_dir)
-    cands = [*dir_path.glob("*.xlsx"), *dir_path.glob("*.xls")]
-    if not only_today:
-        return [file for file in cands if not file.name.startswith("~")]
-    else:
-        today = datetime.datetime.today()  # noqa: DTZ002
-        return [file for file in cands if os.path.getmtime(file) > today.timestamp()]
+    """Collect the order files modified in the date window, sorted by path.
+
+    ``since`` and ``until`` are inclusive local dates.
+    If neither is given, ``only_today`` collects the files modified since
+    the midnight of today, and all the files otherwise.
+    """
+    if since is None and until is None and only_today:
+        since = datetime.date.today()  # noqa: DTZ011
+    start = -math.inf if since is None else _day_start_timestamp(since)
+    end = (
+        math.inf
+        if until is None
+        else _day_start_timestamp(until + datetime.timedelta(days=1))
+    )
+    # ``DirEntry.stat`` is cached, so each file is stat-ed only once.
+    return sorted(
+        pathlib.Path(entry.path)
+        for entry in _iter_candidate_files(pathlib.Path(input_dir), recursive)
+        if start <= entry.stat().st_mtime < end
+    )
+
+
+def decrypt_excel_file(
+    file_path: str | pathlib.Path, password: str, to_disk: bool = False
+) -> DecryptedFile:
+    """Decrypt the file in memory, or into a memory-mapped temporary file."""
+    with open(file_path, "rb") as f:
+        file = msoffcrypto.OfficeFile(f)
+        file.load_key(password=password)
+        if to_disk:
+            return decrypt_to_mapped_file(file)
+        decrypted = io.BytesIO()
+        file.decrypt(decrypted)
+    return decrypted
 
 
 def load_excel_file(
-    file_path: str | pathlib.Path, header_row: int = 0, password: str | None = None
+    file_path: str | pathlib.Path | DecryptedFile,
+    header_row: int = 0,
+    password: str | None = None,
+    dtype: type | None = None,
+    decrypt_to_disk: bool = False,
 ) -> pd.DataFrame:
+    """Load the order file. Text files are always loaded as strings."""
+    if is_text_file(file_path):
+        return load_text_file(file_path, header_row)
     if password is None:
-        return pd.read_excel(file_path, header=header_row).fillna("")
+        return pd.read_excel(file_path, header=header_row, dtype=dtype).fillna("")
     else:
-        decrypted = io.BytesIO()
-
-        with open(file_path, "rb") as f:
-            file = msoffcrypto.OfficeFile(f)
-            file.load_key(password=password)
-            file.decrypt(decrypted)
-            return pd.read_excel(decrypted, header=header_row).fillna("")
+        with decrypt_excel_file(file_path, password, decrypt_to_disk) as decrypted:
+            return pd.read_excel(decrypted, header=header_row, dtype=dtype).fillna("")
 
 
 def match_column_names(df: pd.DataFrame, mappings: dict[str, str]) -> bool:
@@ -206,109 +444,266 @@ def _collect_relevant_columns(
     )
 
 
-def file_to_dataframe(
+def load_order_file(
     file_path: str | pathlib.Path,
     mappings: list[PlatformHeaderVariableMap],
     logger: logging.Logger,
-) -> pd.DataFrame | None:
+    record: FileRecord | None = None,
+    decrypted: DecryptedFile | None = None,
+    dtype: type | None = None,
+) -> tuple[PlatformHeaderVariableMap, pd.DataFrame] | None:
+    """Find the platform of the order file and load it with the platform headers."""
     logger.info("Loading %s ...", file_path)
+    record = record or FileRecord(path=str(file_path), size_bytes=0)
 
-    try:
-        pd.read_excel(file_path)
-    except xlrd.biffh.XLRDError:
-        import rich
-
-        password = rich.console.Console().input(
-            f"\n[PASSWORD REQUIRED]\n{file_path} seems to be "
-            "encrypted with password. Please enter the password: ",
-            password=True,
-        )
-    else:
-        password = None
+    source: str | pathlib.Path | DecryptedFile = file_path
+    if decrypted is not None:
+        # Decrypted only once and the decrypted bytes are parsed per mapping.
+        source = decrypted
 
     # Iterate throw rows
     for mapping in mappings:
-        df = load_excel_file(file_path, mapping.header - 1, password)
+        try:
+            with record.measure("parse"):
+                df = load_excel_file(source, mapping.header - 1, dtype=dtype)
+        except ValueError as e:
+            # Text files can not be parsed from a wrong header row,
+            # i.e. a banner line above the header, while workbooks can.
+            # ``pd.errors.ParserError`` is also a ``ValueError``.
+            logger.debug("%s is not a %s file: %s", file_path, mapping.platform, e)
+            continue
         if not match_column_names(df, mapping.variable_mapping):
             continue
         logger.info("Matched platform: %s", mapping.platform)
+        record.platform = mapping.platform
+        record.header_row = int(mapping.header)
+        record.rows = len(df)
+        return mapping, df
+    logger.error("Failed to load %s. Please check the column names.", file_path)
+    record.error = "No matching platform. Please check the column names."
+    return None
+
+
+def file_to_dataframe(
+    file_path: str | pathlib.Path,
+    mappings: list[PlatformHeaderVariableMap],
+    logger: logging.Logger,
+    record: FileRecord | None = None,
+    decrypted: DecryptedFile | None = None,
+) -> pd.DataFrame | None:
+    record = record or FileRecord(path=str(file_path), size_bytes=0)
+    loaded = load_order_file(file_path, mappings, logger, record, decrypted)
+    if loaded is None:
+        return None
+    mapping, df = loaded
+    with record.measure("translate"):
         loaded_df = _collect_relevant_columns(df, mapping)
         # Add platform column
         loaded_df["PlatformName"] = mapping.platform
-        return loaded_df.dropna(how='all')
-    logger.error("Failed to load %s. Please check the column names.", file_path)
-    return None
+        loaded_df = loaded_df.dropna(how='all')
+    record.rows = len(loaded_df)
+    return loaded_df
 
 
 def merge_orders(
     order_files: list[pathlib.Path],
     variable_mappings: VariableMappings,
     logger: logging.Logger,
+    manifest: RunManifest | None = None,
+    decryption_results: dict[pathlib.Path, DecryptionResult] | None = None,
 ) -> pd.DataFrame:
-    order_dfs = [
-        df
-        for order_file in order_files
-        if (
-            df := file_to_dataframe(
-                order_file, variable_mappings.platform_header_variable_maps, logger
-            )
+    manifest = manifest or RunManifest()
+    decryption_results = decryption_results or {}
+    order_dfs = []
+    for order_file in order_files:
+        record = FileRecord(
+            path=str(order_file), size_bytes=os.path.getsize(order_file)
         )
-        is not None
-    ]
+        manifest.files.append(record)
+        if (decryption := decryption_results.get(order_file)) is not None:
+            record.timings["decrypt"] = decryption.seconds
+            if decryption.decrypted is None:
+                logger.warning("Skipping %s: %s", order_file, decryption.error)
+                record.error = f"Decryption failed. {decryption.error}"
+                continue
+        try:
+            df = file_to_dataframe(
+                order_file,
+                variable_mappings.platform_header_variable_maps,
+                logger,
+                record,
+                decryption.decrypted if decryption is not None else None,
+            )
+        except Exception as e:
+            logger.error("Failed to load %s: %s", order_file, e)
+            record.error = f"{type(e).__name__}: {e}"
+        else:
+            if df is not None:
+                order_dfs.append(df)
+    if not order_dfs:
+        return pd.DataFrame()
     return pd.concat(order_dfs, ignore_index=True).fillna("")
 
 
-def _adjust_column_width(sheet, ref_df: pd.DataFrame) -> None:
-    for i_col, col in enumerate(ref_df.columns):
-        max_length = max(
-            int(ref_df[col].astype(str).map(len).max()),
-            len(col),
+def _ask_missing_passwords(
+    encrypted_files: list[pathlib.Path], password_book: PasswordBook
+) -> None:
+    """Ask passwords up front for the files that do not have any candidates."""
+    import rich.console
+
+    console = rich.console.Console(stderr=True)  # Not mixed into the output in stdout.
+    for file_path in encrypted_files:
+        if not password_book.candidates(file_path):
+            password = console.input(
+                f"\n[PASSWORD REQUIRED]\n{file_path} seems to be "
+                "encrypted with password. Please enter the password: ",
+                password=True,
+            )
+            password_book.file_patterns[file_path.name] = [password]
+
+
+def collect_order_files(
+    args: argparse.Namespace, logger: logging.Logger
+) -> list[pathlib.Path]:
+    logger.info("Collecting order files from: %s ...", args.input_dir)
+    order_files = collect_files(
+        args.input_dir,
+        only_today=not args.all,
+        since=args.since,
+        until=args.until,
+        recursive=args.recursive,
+    )
+    order_file_names = [file.name for file in order_files]
+    logger.info("Found %d order files. %s", len(order_files), order_file_names)
+    return order_files
+
+
+def decrypt_order_files(
+    order_files: list[pathlib.Path], args: argparse.Namespace, logger: logging.Logger
+) -> dict[pathlib.Path, DecryptionResult]:
+    password_book = PasswordBook.from_env()
+    if args.passwords_file is not None:
+        password_book.update(PasswordBook.from_file(args.passwords_file))
+    encrypted_files = [file for file in order_files if is_encrypted(file)]
+    if args.ask_passwords:
+        _ask_missing_passwords(encrypted_files, password_book)
+    logger.info("Decrypting %d encrypted files ...", len(encrypted_files))
+    if not args.decrypt_to_disk:
+        return decrypt_files(
+            encrypted_files, password_book, max_workers=args.decrypt_workers
+        )
+    # The spool only holds the files until they are mapped.
+    with decryption_spool() as spool_dir:
+        return decrypt_files(
+            encrypted_files,
+            password_book,
+            max_workers=args.decrypt_workers,
+            spool_dir=spool_dir,
         )
-        sheet.set_column(i_col, i_col, min(max_length * 2 + 1, 50))
 
 
-def export_excel(
-    df: pd.DataFrame, output_file_path: pathlib.Path, pretty: bool = True
+def close_decrypted_files(
+    decryption_results: dict[pathlib.Path, DecryptionResult],
+) -> None:
+    for result in decryption_results.values():
+        if result.decrypted is not None:
+            result.decrypted.close()
+
+
+def log_decryption_failures(
+    decryption_results: dict[pathlib.Path, DecryptionResult], logger: logging.Logger
 ) -> None:
-    with pd.ExcelWriter(output_file_path, engine="xlsxwriter") as writer:
-        df.to_excel(excel_writer=writer, index=False)
-        if pretty:
-            for sheet in writer.sheets.values():
-                _adjust_column_width(sheet, df)
+    if failures := [result for result in decryption_results.values() if result.error]:
+        logger.error(
+            "Could not decrypt %d files:\n%s",
+            len(failures),
+            "\n".join(f"- {r.file_path}: {r.error}" for r in failures),
+        )
 
 
 def main():
     from .._logging import build_logger
 
-    logger = build_logger()
     parser = build_argparser()
     args = parser.parse_args()
+    if args.output == args.merged_output == STDOUT:
+        parser.error("Only one of the outputs can be written to the standard output.")
+    # Logs must not be mixed into the output written to the standard output.
+    to_stdout = STDOUT in (args.output, args.merged_output)
+    if args.quiet:
+        logger = build_logger("WARNING", stderr=to_stdout)
+    else:
+        logger = build_logger("DEBUG" if args.verbose else "INFO", stderr=to_stdout)
+    manifest = RunManifest()
 
     logger.info(
         "Parsing order-delivery column mapping from ... %s",
         ORDER_DELIVERY_CONFIG_FILE_PATH,
     )
-    variable_mappings = VariableMappings.from_excel(get_order_delivery_config_path())
-    logger.info("Processing files using variable mappings: \n%s", variable_mappings)
-
-    logger.info("Collecting order files from: %s ...", args.input_dir)
-    if args.all:
-        order_files = collect_files(args.input_dir, only_today=False)
-    else:
-        order_files = collect_files(args.input_dir, only_today=True)
-
-    order_file_names = [file.name for file in order_files]
-    logger.info("Found %d order files. %s", len(order_files), order_file_names)
+    variable_mappings = VariableMappings.load(get_order_delivery_config_path())
+    logger.debug("Processing files using variable mappings: \n%s", variable_mappings)
+
+    order_files = collect_order_files(args, logger)
+    ledger = None
+    if args.ledger is not None:
+        ledger = ProcessedFileLedger.load(args.ledger)
+        new_files = [file for file in order_files if not ledger.is_processed(file)]
+        logger.info(
+            "Skipping %d files already merged according to %s.",
+            len(order_files) - len(new_files),
+            args.ledger,
+        )
+        order_files = new_files
+    if not order_files:
+        logger.warning("No order files to merge.")
+        return
+    decryption_results = decrypt_order_files(order_files, args, logger)
 
-    logger.info("Processing orders %s...", order_files)
-    merged_df = merge_orders(order_files, variable_mappings, logger)
+    try:
+        logger.info("Processing orders %s...", order_files)
+        merged_df = merge_orders(
+            order_files, variable_mappings, logger, manifest, decryption_results
+        )
 
-    logger.debug("Merged orders: %s", merged_df)
-    rendered_orders = (
-        variable_mappings.delivery_info_headers.order_info_to_delivery_info(merged_df)
-    )
+        if merged_df.empty:
+            # Nothing is exported so that the previous outputs are not overwritten.
+            logger.error("None of the order files could be merged.")
+            return
+        # Frames are only rendered in the log if ``--verbose`` is set.
+        logger.debug("Merged orders: %s", merged_df)
+        if args.merged_output is not None:
+            logger.info("Exporting merged orders to: %s ...", args.merged_output)
+            with manifest.measure("export-merged"):
+                write_output(
+                    merged_df,
+                    args.merged_output,
+                    args.output_format or infer_output_format(args.merged_output),
+                )
+        with manifest.measure("render"):
+            delivery_info_headers = variable_mappings.delivery_info_headers
+            rendered_orders = delivery_info_headers.order_info_to_delivery_info(
+                merged_df, max_workers=args.render_workers
+            )
 
-    logger.debug("Total orders: %s", rendered_orders)
-    logger.info("Exporting delivery information to: %s ...", args.output)
-    export_excel(rendered_orders, args.output)
-    logger.info("Exporting done. Check the file: %s", args.output)
+        logger.debug("Total orders: %s", rendered_orders)
+        logger.info("Exporting delivery information to: %s ...", args.output)
+        with manifest.measure("export"):
+            write_output(
+                rendered_orders,
+                args.output,
+                args.output_format or infer_output_format(args.output),
+            )
+        logger.info("Exporting done. Check the file: %s", args.output)
+        if ledger is not None:
+            # Only the files that are merged without errors are marked.
+            for record in manifest.files:
+                if record.error is None and record.platform is not None:
+                    ledger.mark_processed(pathlib.Path(record.path))
+            ledger.save()
+    finally:
+        close_decrypted_files(decryption_results)
+        # Decryption failures are reported all together at the end.
+        log_decryption_failures(decryption_results, logger)
+        if args.manifest is not None:
+            manifest.save(args.manifest)
+            logger.info("Manifest of the run is saved in: %s", args.manifest)
@@ -0,0 +1,218 @@
+import argparse
+import logging
+import os
+import pathlib
+import time
+
+import pandas as pd
+
+from .._decryption import DecryptionResult
+from .._delivery_split import (
+    DeliveryConfirmation,
+    DeliverySplitResults,
+    OrderFile,
+    load_delivery_info_keys,
+    split_deliveries,
+)
+from .._manifest import FileRecord, RunManifest
+from .._output import export_excel
+from .merge_orders import (
+    ORDER_DELIVERY_CONFIG_FILE_PATH,
+    VariableMappings,
+    add_order_file_arguments,
+    close_decrypted_files,
+    collect_order_files,
+    decrypt_order_files,
+    get_order_delivery_config_path,
+    load_excel_file,
+    load_order_file,
+    log_decryption_failures,
+)
+
+
+def build_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    add_order_file_arguments(parser)
+    parser.add_argument(
+        "--confirmation",
+        dest="confirmations",
+        help="Delivery confirmation files from the delivery agency. "
+        "If there are more than one, they are matched in the given order, "
+        "each only against the orders that are not matched yet.",
+        nargs="+",
+        required=True,
+        type=str,
+    )
+    parser.add_argument(
+        "--keys-file",
+        dest="keys_file",
+        help="Json file of the keys to match the delivery confirmations and orders, "
+        "i.e. {\"수하인명\": \"receipients_name\", \"상품명\": \"option_info\"}. "
+        "It has the same format as the setting of the web application. "
+        "Default is the default setting of the web application.",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--output-dir",
+        dest="output_dir",
+        help="Directory to write the delivery report per platform "
+        "and the delivery rows that could not be matched.",
+        type=str,
+        default=".",
+    )
+    return parser
+
+
+def _drop_empty_rows(df: pd.DataFrame) -> pd.DataFrame:
+    return df[~(df == "").all(axis=1)]
+
+
+def load_orders(
+    order_files: list[pathlib.Path],
+    variable_mappings: VariableMappings,
+    logger: logging.Logger,
+    manifest: RunManifest,
+    decryption_results: dict[pathlib.Path, DecryptionResult],
+) -> list[OrderFile]:
+    """Load the order files as strings with the platform specific headers."""
+    orders = []
+    for order_file in order_files:
+        record = FileRecord(
+            path=str(order_file), size_bytes=os.path.getsize(order_file)
+        )
+        manifest.files.append(record)
+        if (decryption := decryption_results.get(order_file)) is not None:
+            record.timings["decrypt"] = decryption.seconds
+            if decryption.decrypted is None:
+                logger.warning("Skipping %s: %s", order_file, decryption.error)
+                record.error = f"Decryption failed. {decryption.error}"
+                continue
+        try:
+            loaded = load_order_file(
+                order_file,
+                variable_mappings.platform_header_variable_maps,
+                logger,
+                record,
+                decryption.decrypted if decryption is not None else None,
+                dtype=str,
+            )
+        except Exception as e:
+            logger.error("Failed to load %s: %s", order_file, e)
+            record.error = f"{type(e).__name__}: {e}"
+            continue
+        if loaded is not None:
+            mapping, df = loaded
+            orders.append(
+                OrderFile(
+                    name=order_file.name,
+                    platform=mapping.platform,
+                    data_frame=_drop_empty_rows(df),
+                    platform_headers=mapping.variable_mapping,
+                )
+            )
+    return orders
+
+
+def load_confirmations(
+    confirmation_files: list[str], logger: logging.Logger
+) -> list[DeliveryConfirmation]:
+    confirmations = []
+    for confirmation_file in confirmation_files:
+        logger.info("Loading delivery confirmation %s ...", confirmation_file)
+        df = load_excel_file(confirmation_file, dtype=str)
+        confirmations.append(
+            DeliveryConfirmation(
+                name=pathlib.Path(confirmation_file).name,
+                data_frame=_drop_empty_rows(df),
+            )
+        )
+    return confirmations
+
+
+def export_results(
+    results: DeliverySplitResults, output_dir: pathlib.Path, logger: logging.Logger
+) -> list[pathlib.Path]:
+    today_as_str = pd.Timestamp.now().strftime("%Y-%m-%d")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    exported = []
+    for platform, report in results.reports.items():
+        file_path = output_dir / f"{platform}-delivered-{today_as_str}.xlsx"
+        export_excel(report, file_path, sheet_name=results.export_sheet_names[platform])
+        exported.append(file_path)
+    if len(results.cannot_be_matched) > 0:
+        file_path = output_dir / f"cannot-be-matched-{today_as_str}.xlsx"
+        export_excel(results.cannot_be_matched, file_path)
+        logger.warning(
+            "%d delivery rows could not be matched. Check the file: %s",
+            len(results.cannot_be_matched),
+            file_path,
+        )
+        exported.append(file_path)
+    return exported
+
+
+def _log_throughput(
+    results: DeliverySplitResults, seconds: float, logger: logging.Logger
+) -> None:
+    num_rows = results.num_order_rows + results.num_delivery_rows
+    logger.info(
+        "Matched %d of %d order rows with %d delivery rows "
+        "in %.3f seconds (%.0f rows per second).",
+        results.num_matched,
+        results.num_order_rows,
+        results.num_delivery_rows,
+        seconds,
+        num_rows / seconds if seconds > 0 else float("inf"),
+    )
+
+
+def main():
+    from .._logging import build_logger
+
+    parser = build_argparser()
+    args = parser.parse_args()
+    if args.quiet:
+        logger = build_logger("WARNING")
+    else:
+        logger = build_logger("DEBUG" if args.verbose else "INFO")
+    manifest = RunManifest()
+
+    logger.info(
+        "Parsing order-delivery column mapping from ... %s",
+        ORDER_DELIVERY_CONFIG_FILE_PATH,
+    )
+    variable_mappings = VariableMappings.load(get_order_delivery_config_path())
+    keys = load_delivery_info_keys(args.keys_file)
+    logger.debug("Matching deliveries using keys: \n%s", keys)
+
+    order_files = collect_order_files(args, logger)
+    decryption_results = decrypt_order_files(order_files, args, logger)
+
+    try:
+        with manifest.measure("parse"):
+            orders = load_orders(
+                order_files, variable_mappings, logger, manifest, decryption_results
+            )
+            confirmations = load_confirmations(args.confirmations, logger)
+
+        start = time.perf_counter()
+        with manifest.measure("match"):
+            results = split_deliveries(orders, confirmations, keys)
+        _log_throughput(results, time.perf_counter() - start, logger)
+        if results.skipped_platforms:
+            logger.warning(
+                "No delivery report settings for: %s", results.skipped_platforms
+            )
+
+        logger.info("Exporting delivery reports to: %s ...", args.output_dir)
+        with manifest.measure("export"):
+            exported = export_results(results, pathlib.Path(args.output_dir), logger)
+        logger.info("Exporting done. Check the files: %s", [p.name for p in exported])
+    finally:
+        close_decrypted_files(decryption_results)
+        # Decryption failures are reported all together at the end.
+        log_decryption_failures(decryption_results, logger)
+        if args.manifest is not None:
+            manifest.save(args.manifest)
+            logger.info("Manifest of the run is saved in: %s", args.manifest)
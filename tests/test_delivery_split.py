@@ -0,0 +1,208 @@
+"""Delivery split of ``split-deliveries`` against the matching of the web application.
+
+The expected results are matched row by row
+in the same way as ``DeliveryMatchingState.match`` of ``app/split_delivery.py``
+and rendered cell by cell, so that the app modules are not needed.
+"""
+
+import logging
+import pathlib
+from collections.abc import Hashable
+
+import pandas as pd
+import pytest
+
+from krbiz._decryption import is_encrypted
+from krbiz._delivery_split import (
+    DeliveryConfirmation,
+    DeliveryInfoKey,
+    FromDeliveryConfirmation,
+    FromOriginalOrderFile,
+    HardcodedColumn,
+    OrderFile,
+    default_delivery_report_settings,
+    load_delivery_info_keys,
+    split_deliveries,
+)
+from krbiz._key_normalization import build_match_keys
+from krbiz._manifest import RunManifest
+from krbiz.executables.merge_orders import (
+    VariableMappings,
+    get_order_delivery_config_path,
+)
+from krbiz.executables.split_deliveries import load_confirmations, load_orders
+
+_FIXTURE_DIR = pathlib.Path(__file__).parent / "excel_examples"
+_CONFIRMATION_FILE = _FIXTURE_DIR / "devliery_confirmations.xlsx"
+
+OrderRowId = tuple[int, Hashable]
+DeliveryRowId = tuple[int, Hashable]
+
+
+@pytest.fixture(scope="module")
+def orders() -> list[OrderFile]:
+    order_files = [
+        path
+        for path in sorted(_FIXTURE_DIR.glob("*.xls*"))
+        if path != _CONFIRMATION_FILE and not is_encrypted(path)
+    ]
+    return load_orders(
+        order_files,
+        VariableMappings.load(get_order_delivery_config_path()),
+        logging.getLogger(__name__),
+        RunManifest(),
+        {},
+    )
+
+
+@pytest.fixture(scope="module")
+def confirmation() -> DeliveryConfirmation:
+    (confirmation,) = load_confirmations(
+        [_CONFIRMATION_FILE.as_posix()], logging.getLogger(__name__)
+    )
+    return confirmation
+
+
+def _match_row_by_row(
+    orders: list[OrderFile],
+    confirmations: list[DeliveryConfirmation],
+    keys: tuple[DeliveryInfoKey, ...],
+) -> tuple[dict[OrderRowId, DeliveryRowId], list[pd.DataFrame]]:
+    report_settings = default_delivery_report_settings()
+    order_keys = {
+        i_order: build_match_keys(
+            order.data_frame,
+            (
+                (
+                    order.platform_headers[key.unified_variable_name],
+                    key.normalization_rules,
+                )
+                for key in keys
+            ),
+        )
+        for i_order, order in enumerate(orders)
+        if order.platform in report_settings
+    }
+    assignments: dict[OrderRowId, DeliveryRowId] = {}
+    leftovers = []
+    for i_confirmation, confirmation in enumerate(confirmations):
+        delivery_keys = build_match_keys(
+            confirmation.data_frame,
+            ((key.delivery_info_header, key.normalization_rules) for key in keys),
+        )
+        unmatched_delivery_rows: dict[str, list[Hashable]] = {}
+        for i_delivery_row, delivery_key in delivery_keys.items():
+            unmatched_delivery_rows.setdefault(delivery_key, []).append(i_delivery_row)
+        matched_delivery_rows = []
+        for i_order, keys_of_order in order_keys.items():
+            for i_order_row, order_key in keys_of_order.items():
+                if (i_order, i_order_row) in assignments:
+                    continue
+                candidates = unmatched_delivery_rows.get(order_key, [])
+                if len(candidates) == 1:
+                    i_delivery_row = candidates.pop()
+                    matched_delivery_rows.append(i_delivery_row)
+                    assignments[(i_order, i_order_row)] = (
+                        i_confirmation,
+                        i_delivery_row,
+                    )
+        leftovers.append(confirmation.data_frame.drop(matched_delivery_rows))
+    return assignments, leftovers
+
+
+def _render_cell_by_cell(
+    orders: list[OrderFile],
+    confirmations: list[DeliveryConfirmation],
+    assignments: dict[OrderRowId, DeliveryRowId],
+) -> dict[str, pd.DataFrame]:
+    report_settings = default_delivery_report_settings()
+    rows: dict[str, list[list[str]]] = {}
+    for i_order, order in enumerate(orders):
+        if (report_setting := report_settings.get(order.platform)) is None:
+            continue
+        for i_order_row, order_row in order.data_frame.iterrows():
+            delivery_row = pd.Series(dtype=object)
+            if (delivery_row_id := assignments.get((i_order, i_order_row))) is not None:
+                i_confirmation, i_delivery_row = delivery_row_id
+                delivery_row = confirmations[i_confirmation].data_frame.loc[
+                    i_delivery_row
+                ]
+            row = []
+            for col in report_setting.headers:
+                mapping = report_setting.mappings.get(
+                    col, FromOriginalOrderFile(target=col, column=col)
+                )
+                if isinstance(mapping, HardcodedColumn):
+                    row.append(mapping.value)
+                elif isinstance(mapping, FromDeliveryConfirmation):
+                    row.append(delivery_row.get(mapping.column, ""))
+                else:
+                    row.append(order_row.get(mapping.column, ""))
+            rows.setdefault(order.platform, []).append(row)
+    return {
+        platform: pd.DataFrame(
+            platform_rows, columns=list(report_settings[platform].headers), dtype=object
+        )
+        for platform, platform_rows in rows.items()
+    }
+
+
+_MATCHED_DELIVERY_ROWS = [8, 9, 10, 11]
+"""Rows of the delivery confirmation fixture that match the order fixtures."""
+
+
+def _duplicated(confirmation: DeliveryConfirmation) -> DeliveryConfirmation:
+    """The first matching row is duplicated so that it can not be matched."""
+    df = confirmation.data_frame
+    return DeliveryConfirmation(
+        name="duplicated.xlsx",
+        data_frame=pd.concat(
+            [df, df.loc[_MATCHED_DELIVERY_ROWS[:1]]], ignore_index=True
+        ),
+    )
+
+
+def _split(confirmation: DeliveryConfirmation) -> list[DeliveryConfirmation]:
+    """The first file has half of the matching rows and the second has all rows."""
+    df = confirmation.data_frame
+    return [
+        DeliveryConfirmation(
+            name="first-half.xlsx", data_frame=df.loc[: _MATCHED_DELIVERY_ROWS[1]]
+        ),
+        DeliveryConfirmation(name="all.xlsx", data_frame=df),
+    ]
+
+
+@pytest.mark.parametrize(
+    "make_confirmations",
+    [
+        pytest.param(lambda confirmation: [confirmation], id="one confirmation"),
+        pytest.param(lambda confirmation: [_duplicated(confirmation)], id="duplicated"),
+        pytest.param(_split, id="two confirmations"),
+    ],
+)
+def test_split_deliveries_is_same_as_web_application(
+    orders, confirmation, make_confirmations
+) -> None:
+    confirmations = make_confirmations(confirmation)
+    keys = load_delivery_info_keys()
+    assignments, leftovers = _match_row_by_row(orders, confirmations, keys)
+    expected_reports = _render_cell_by_cell(orders, confirmations, assignments)
+
+    results = split_deliveries(orders, confirmations, keys)
+
+    assert results.num_matched == len(assignments)
+    assert results.reports.keys() == expected_reports.keys()
+    for platform, expected_report in expected_reports.items():
+        pd.testing.assert_frame_equal(
+            results.reports[platform].astype(object), expected_report
+        )
+    pd.testing.assert_frame_equal(results.cannot_be_matched, pd.concat(leftovers))
+
+
+def test_split_deliveries_matches_the_fixtures(orders, confirmation) -> None:
+    results = split_deliveries(orders, [confirmation], load_delivery_info_keys())
+    assert results.num_matched == len(_MATCHED_DELIVERY_ROWS)
+    assert results.skipped_platforms == ["11TH", "Kakao", "Wadiz"]
+    assert len(results.cannot_be_matched) == len(confirmation.data_frame) - 4
+    assert not results.cannot_be_matched.index.isin(_MATCHED_DELIVERY_ROWS).any()
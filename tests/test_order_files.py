@@ -0,0 +1,67 @@
+import logging
+import pathlib
+
+import pytest
+
+from krbiz.executables.merge_orders import (
+    PlatformHeaderVariableMap,
+    VariableMappings,
+    get_order_delivery_config_path,
+    load_order_file,
+)
+
+
+@pytest.fixture(scope="module")
+def variable_maps() -> list[PlatformHeaderVariableMap]:
+    return VariableMappings.load(
+        get_order_delivery_config_path()
+    ).platform_header_variable_maps
+
+
+def _naver_map(
+    variable_maps: list[PlatformHeaderVariableMap],
+) -> PlatformHeaderVariableMap:
+    (naver_map,) = (vm for vm in variable_maps if vm.platform == "Naver")
+    return naver_map
+
+
+@pytest.mark.parametrize(
+    ("suffix", "separator", "encoding"),
+    [(".csv", ",", "utf-8-sig"), (".csv", ",", "cp949"), (".tsv", "\t", "utf-8")],
+)
+def test_load_order_file_text_with_banner_line(
+    tmp_path: pathlib.Path,
+    variable_maps: list[PlatformHeaderVariableMap],
+    suffix: str,
+    separator: str,
+    encoding: str,
+) -> None:
+    naver_map = _naver_map(variable_maps)
+    assert naver_map.header == 2  # The banner line comes first.
+    # Platforms with the header on the first line are tried before Naver.
+    assert variable_maps.index(naver_map) > 0
+    assert variable_maps[0].header == 1
+    header = list(
+        dict.fromkeys(col for col in naver_map.variable_mapping.values() if col)
+    )
+    rows = [[f"{col}-{i_row}" for col in header] for i_row in range(3)]
+    file_path = tmp_path / f"naver{suffix}"
+    file_path.write_text(
+        "\n".join(
+            [
+                "주문 내역",
+                separator.join(header),
+                *(separator.join(row) for row in rows),
+            ]
+        )
+        + "\n",
+        encoding=encoding,
+    )
+
+    loaded = load_order_file(file_path, variable_maps, logging.getLogger(__name__))
+
+    assert loaded is not None
+    mapping, df = loaded
+    assert mapping.platform == "Naver"
+    assert list(df.columns) == header
+    assert df.values.tolist() == rows
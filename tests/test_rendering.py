@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from krbiz._rendering import render_templates
+from krbiz.executables.merge_orders import (
+    VariableMappings,
+    get_order_delivery_config_path,
+)
+
+_N_ROWS = 2_500
+_EVEN_CHUNK_ROWS = 500
+_ODD_CHUNK_ROWS = 97  # Does not divide the number of rows.
+
+
+def _as_bytes(rendered: dict[str, np.ndarray]) -> dict[str, bytes]:
+    return {
+        column: "\n".join(values).encode("utf-8") for column, values in rendered.items()
+    }
+
+
+def _order_info(columns: tuple[str, ...]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            column: [f"{column}-{i_row}-가나다" for i_row in range(_N_ROWS)]
+            for column in columns
+        }
+    )
+
+
+@pytest.fixture(scope="module")
+def configured_templates() -> tuple[tuple[str, ...], dict[str, str]]:
+    variable_mappings = VariableMappings.load(get_order_delivery_config_path())
+    templates = variable_mappings.delivery_info_headers.templates.iloc[0]
+    return (
+        variable_mappings.platform_header_variables,
+        {col: str(template) for col, template in templates.items()},
+    )
+
+
+@pytest.mark.parametrize("max_workers", [2, 3])
+@pytest.mark.parametrize("chunk_rows", [_EVEN_CHUNK_ROWS, _ODD_CHUNK_ROWS])
+def test_parallel_rendering_is_same_as_serial_rendering(
+    configured_templates, max_workers: int, chunk_rows: int
+) -> None:
+    variables, templates = configured_templates
+    order_info = _order_info(variables)
+    serial = render_templates(order_info, templates, max_workers=1)
+    parallel = render_templates(order_info, templates, max_workers, chunk_rows)
+    assert _as_bytes(parallel) == _as_bytes(serial)
+
+
+def test_parallel_rendering_keeps_literal_braces_and_non_text_values() -> None:
+    order_info = pd.DataFrame(
+        {
+            "name": [f"이름{i_row}" for i_row in range(_N_ROWS)],
+            "count": range(_N_ROWS),
+            "memo": [None if i_row % 7 else "memo" for i_row in range(_N_ROWS)],
+        }
+    )
+    templates = {
+        "literal": "{not_a_variable}",
+        "repeated": "{name} ({name}) x {count}",
+        "missing": "{memo}",
+    }
+    serial = render_templates(order_info, templates, max_workers=1)
+    parallel = render_templates(
+        order_info, templates, max_workers=2, chunk_rows=_ODD_CHUNK_ROWS
+    )
+    assert _as_bytes(parallel) == _as_bytes(serial)
+    assert serial["literal"][0] == "{not_a_variable}"
+    assert serial["repeated"][1] == "이름1 (이름1) x 1"